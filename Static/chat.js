@@ -104,60 +104,310 @@ async function sendMessage() {
 }
 
 async function sendToServer(msg, lat, lon) {
+  const payload = {
+      message: msg,
+      restaurant: restaurant_key,
+      mode: "chat",
+      session_id: session_id,
+      latitude: lat,
+      longitude: lon
+  };
+
+  // Prefer the live socket, then the streaming endpoint; fall back to /ask
+  let streamed = null;
+  try {
+      streamed = await sendOverSocket(payload);
+  } catch (e) {
+      console.warn("WebSocket unavailable:", e);
+  }
+  if (!streamed) {
+      try {
+          streamed = await streamFromServer(payload);
+      } catch (e) {
+          console.warn("Streaming unavailable, falling back to /ask:", e);
+      }
+  }
+  if (streamed) {
+      finishBotReply(streamed.botReply, streamed.bubble, streamed.order);
+      return;
+  }
+
   try {
       const response = await fetch("/ask", {
           method: "POST",
           headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({
-              message: msg,
-              restaurant: restaurant_key,
-              mode: "chat",
-              session_id: session_id,
-              latitude: lat,
-              longitude: lon
-          })
+          body: JSON.stringify(payload)
       });
 
       const data = await response.json();
-      let botReply = data.response;
-
-      // ---------------- JSON Extraction -----------------
-      const start = botReply.indexOf("---ORDER_JSON_START---");
-      const end = botReply.indexOf("---ORDER_JSON_END---");
+      finishBotReply(data.response, null, data.order);
 
-      let cleanText = botReply;
-      let orderJson = null;
+  } catch (e) {
+      hideTyping();
+      appendMessage("Error: Could not reach server", "bot");
+  }
+}
 
-      if (start !== -1 && end !== -1) {
-          const jsonString = botReply.substring(
-              start + "---ORDER_JSON_START---".length,
-              end
-          ).trim();
+// 4. Live chat over /ws/chat: the socket binds once to this restaurant and session,
+// and the server keeps the session in memory between turns. After a drop we
+// reconnect with the last turn we saw, and the server replays a reply we missed.
+const WS_URL = (location.protocol === "https:" ? "wss://" : "ws://") + location.host + "/ws/chat";
+let ws = null;         // bound socket
+let wsOpening = null;  // promise while connecting
+let wsPending = null;  // turn in flight: { resolve, botReply, bubble, order }
+let wsFailures = 0;
+let lastTurn = Number(localStorage.getItem("chat_last_turn") || 0);
+
+function rememberTurn(turn) {
+  if (typeof turn !== "number") return;
+  lastTurn = turn;
+  localStorage.setItem("chat_last_turn", String(turn));
+}
 
+// Resolves to a bound socket, or null when WebSockets aren't usable here
+function connectSocket() {
+  if (ws) return Promise.resolve(ws);
+  if (wsOpening) return wsOpening;
+  if (!("WebSocket" in window) || wsFailures >= 3) return Promise.resolve(null);
+
+  wsOpening = new Promise(resolve => {
+      const sock = new WebSocket(WS_URL);
+      const timer = setTimeout(() => sock.close(), 5000);
+      sock.onopen = () => {
+          sock.send(JSON.stringify({ type: "hello", restaurant_key, session_id, last_turn: lastTurn }));
+      };
+      sock.onmessage = evt => {
+          let frame;
           try {
-              orderJson = JSON.parse(jsonString);
+              frame = JSON.parse(evt.data);
           } catch (err) {
-              console.error("JSON parse error:", err);
+              return;
+          }
+          if (frame.type === "ready") {
+              clearTimeout(timer);
+              ws = sock;
+              wsOpening = null;
+              wsFailures = 0;
+              resolve(sock);
+              return;
           }
+          handleFrame(sock, frame);
+      };
+      sock.onclose = () => {
+          clearTimeout(timer);
+          if (ws === sock) {
+              ws = null;
+              if (wsPending) resumePending();  // dropped mid-reply
+          } else {
+              wsFailures += 1;
+              wsOpening = null;
+              resolve(null);
+          }
+      };
+  });
+  return wsOpening;
+}
 
-          cleanText = botReply.replace(
-              botReply.substring(start, end + "---ORDER_JSON_END---".length),
-              ""
-          ).trim();
-      }
+function settlePending(result) {
+  const pending = wsPending;
+  wsPending = null;
+  if (pending) pending.resolve(result);
+}
 
-      // ---- Show only clean text ----
-      hideTyping();
+function handleFrame(sock, frame) {
+  if (frame.type === "ping") {
+      sock.send(JSON.stringify({ type: "pong" }));
+      return;
+  }
+  if (frame.type === "replay") {
+      // A reply that finished while we were disconnected
+      rememberTurn(frame.turn);
+      if (wsPending) {
+          settlePending({ botReply: frame.response, bubble: wsPending.bubble, order: frame.order });
+      } else {
+          finishBotReply(frame.response, null, frame.order);
+      }
+      return;
+  }
 
-      appendMessage(cleanText, "bot");
+  const pending = wsPending;
+  if (!pending) return;
+  if (frame.type === "delta" || (frame.type === "error" && frame.error !== undefined)) {
+      pending.botReply += frame.delta ?? frame.error ?? "";
+      if (!pending.bubble) {
+          hideTyping();
+          pending.bubble = appendMessage("", "bot");
+      }
+      pending.bubble.textContent = visibleReply(pending.botReply);
+      chatMessages.scrollTop = chatMessages.scrollHeight;
+  } else if (frame.type === "order") {
+      pending.order = frame.order;
+  } else if (frame.type === "done") {
+      rememberTurn(frame.turn);
+      console.info(`Syntra reply: first token ${frame.ttft_ms} ms, total ${frame.total_ms} ms`);
+      settlePending({ botReply: pending.botReply, bubble: pending.bubble, order: pending.order });
+  } else if (frame.type === "busy" || frame.type === "error") {
+      rememberTurn(frame.turn);
+      settlePending({ botReply: frame.message, bubble: pending.bubble, order: null });
+  }
+}
 
-      // ---- If JSON exists ----
-      if (orderJson) {
-          renderOrderSummary(orderJson.order);
+async function resumePending() {
+  const pending = wsPending;
+  const sock = await connectSocket();
+  // The server replays the reply right after "ready" if it finished; otherwise keep what we have
+  setTimeout(() => {
+      if (wsPending === pending) {
+          settlePending({
+              botReply: pending.botReply || "Connection lost. Please try again.",
+              bubble: pending.bubble,
+              order: pending.order
+          });
       }
+  }, sock ? 1000 : 0);
+}
 
+// Returns null when no socket could be bound, so the caller falls back to HTTP
+async function sendOverSocket(payload) {
+  const sock = await connectSocket();
+  if (!sock) return null;
+  return new Promise(resolve => {
+      wsPending = { resolve, botReply: "", bubble: null, order: null };
+      sock.send(JSON.stringify({
+          type: "message",
+          message: payload.message,
+          mode: payload.mode,
+          latitude: payload.latitude,
+          longitude: payload.longitude
+      }));
+  });
+}
+
+// 4a. Stream the reply from /ask/stream (server-sent events), rendering as it arrives.
+// Returns null if nothing was received, so the caller can retry on /ask.
+async function streamFromServer(payload) {
+  const response = await fetch("/ask/stream", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload)
+  });
+  // Shed under load: show the server's "try again" message instead of retrying on /ask
+  if (response.status === 429) {
+      const data = await response.json();
+      return { botReply: data.response, bubble: null, order: null };
+  }
+  if (!response.ok || !response.body) return null;
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let botReply = "";
+  let bubble = null;
+  let order = null;
+
+  try {
+      while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+
+          let sep;
+          while ((sep = buffer.indexOf("\n\n")) !== -1) {
+              const evt = parseSseEvent(buffer.slice(0, sep));
+              buffer = buffer.slice(sep + 2);
+              if (!evt) continue;
+
+              // Server-validated order (prices recomputed from the menu)
+              if (evt.event === "order") {
+                  order = evt.data.order;
+                  continue;
+              }
+              if (evt.event === "done") {
+                  console.info(`Syntra reply: first token ${evt.data.ttft_ms} ms, total ${evt.data.total_ms} ms`);
+                  continue;
+              }
+
+              botReply += evt.data.delta ?? evt.data.error ?? "";
+              if (!bubble) {
+                  hideTyping();
+                  bubble = appendMessage("", "bot");
+              }
+              // Never flash the raw order JSON while it is being generated
+              bubble.textContent = visibleReply(botReply);
+              chatMessages.scrollTop = chatMessages.scrollHeight;
+          }
+      }
   } catch (e) {
-      appendMessage("Error: Could not reach server", "bot");
+      // Connection dropped mid-reply: keep what we have rather than re-asking
+      if (!bubble) throw e;
+  }
+
+  return bubble ? { botReply, bubble, order } : null;
+}
+
+function parseSseEvent(raw) {
+  let event = "message";
+  let data = "";
+  for (const line of raw.split("\n")) {
+      if (line.startsWith("event:")) event = line.slice(6).trim();
+      else if (line.startsWith("data:")) data += line.slice(5).trim();
+  }
+  if (!data) return null;
+  try {
+      return { event, data: JSON.parse(data) };
+  } catch (err) {
+      return null;
+  }
+}
+
+function visibleReply(text) {
+  const marker = text.indexOf("---ORDER_JSON");
+  const shown = marker === -1 ? text : text.substring(0, marker);
+  return shown.replace(/-+$/, "").trim();
+}
+
+// 4b. Show a complete bot reply: strip the order JSON block and render the summary card.
+// serverOrder is the validated order from the server; it wins over the model's JSON.
+function finishBotReply(botReply, bubble, serverOrder) {
+  // ---------------- JSON Extraction -----------------
+  const start = botReply.indexOf("---ORDER_JSON_START---");
+  const end = botReply.indexOf("---ORDER_JSON_END---");
+
+  let cleanText = botReply;
+  let orderJson = null;
+
+  if (start !== -1 && end !== -1) {
+      const jsonString = botReply.substring(
+          start + "---ORDER_JSON_START---".length,
+          end
+      ).trim();
+
+      try {
+          orderJson = JSON.parse(jsonString);
+      } catch (err) {
+          console.error("JSON parse error:", err);
+      }
+
+      cleanText = botReply.replace(
+          botReply.substring(start, end + "---ORDER_JSON_END---".length),
+          ""
+      ).trim();
+  }
+
+  // ---- Show only clean text ----
+  hideTyping();
+
+  if (bubble) {
+      bubble.textContent = cleanText;
+  } else {
+      appendMessage(cleanText, "bot");
+  }
+
+  // ---- If JSON exists ----
+  if (serverOrder) {
+      renderOrderSummary(serverOrder);
+  } else if (orderJson) {
+      renderOrderSummary(orderJson.order);
   }
 }
 
@@ -171,6 +421,7 @@ function appendMessage(msg, role) {
 
     chatMessages.appendChild(div);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return div;
 }
 
 
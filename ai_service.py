@@ -1,9 +1,10 @@
 from openai import OpenAI
 from pymongo import MongoClient
 from datetime import datetime
-import random
 import os
 from dotenv import load_dotenv
+from ids import new_id
+from reservations import CapacityIndex, SlotFull
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -12,10 +13,18 @@ MONGO_URI = os.getenv("MONGO_URI")
 client = OpenAI(api_key=OPENAI_API_KEY)
 mongo_client = MongoClient(MONGO_URI)
 db = mongo_client["SyntraAI"]
+capacity = CapacityIndex(db)
+_indexed = set()
 
 # ---------- Helpers ----------
 def generate_id(prefix):
-    return f"{prefix}{random.randint(1000,9999)}"
+    return new_id(prefix)
+
+def ensure_id_index(collection, field):
+    # Unique ID lookups; created once per collection per process
+    if (collection, field) not in _indexed:
+        db[collection].create_index(field, unique=True)
+        _indexed.add((collection, field))
 
 def insert_order(restaurant, user_name, items, total_price):
     order = {
@@ -27,10 +36,13 @@ def insert_order(restaurant, user_name, items, total_price):
         "order_time": datetime.now().isoformat(),
         "status": "Confirmed"
     }
+    ensure_id_index(f"{restaurant}_order_docs", "order_id")
     db[f"{restaurant}_order_docs"].insert_one(order)
     return order
 
 def insert_reservation(restaurant, user_name, date, time, guests):
+    # Takes the seats first (raises SlotFull); they are given back if the reservation can't be saved
+    date, time = capacity.book(restaurant, date, time, guests)
     reservation = {
         "reservation_id": generate_id("RES"),
         "restaurant": restaurant,
@@ -41,7 +53,12 @@ def insert_reservation(restaurant, user_name, date, time, guests):
         "status": "Confirmed",
         "reservation_time": datetime.now().isoformat()
     }
-    db[f"{restaurant}_reservation_docs"].insert_one(reservation)
+    try:
+        ensure_id_index(f"{restaurant}_reservation_docs", "reservation_id")
+        db[f"{restaurant}_reservation_docs"].insert_one(reservation)
+    except Exception:
+        capacity.release(restaurant, date, time, guests)
+        raise
     return reservation
 
 # ---------- Chat Logic ----------
@@ -58,7 +75,10 @@ def chat_with_syntra(user_message, restaurant):
         return f"✅ Order {order['order_id']} placed at {restaurant}! Total ${total:.2f}."
 
     elif "reserve" in msg or "reservation" in msg:
-        res = insert_reservation(restaurant, "Guest", "2025-11-02", "19:00", 2)
+        try:
+            res = insert_reservation(restaurant, "Guest", "2025-11-02", "19:00", 2)
+        except SlotFull as e:
+            return f"Sorry, {restaurant} is fully booked at {e.time} on {e.date} ({e.remaining} seats left)."
         return f"🪑 Reservation {res['reservation_id']} confirmed at {restaurant} for {res['guests']} guests."
 
     else:
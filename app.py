@@ -1,30 +1,98 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
 import json
-from openai import OpenAI
-from datetime import datetime
-import pytz
-from pymongo import MongoClient
-from helper import load_all_restaurant_data
-from geopy.distance import geodesic
-from fastapi import Request
+import asyncio
+import time
+import logging
+from openai import AsyncOpenAI
 from datetime import datetime, timezone
+import pytz
+from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+from helper import make_session_id
+from catalog import CatalogCache
+from prompts import build_system_prompt, prompt_stats
+from menu_index import get_menu_index
+from store_index import get_store_index
+from intent import classify, get_intent_matcher
+from session_store import SessionStore, WriteBehind
+from chat_storage import bootstrap as bootstrap_storage, chat_target
+from history import HISTORY_PAGE_SIZE, export_ndjson, fetch_page, history_filter, to_json
+from response_cache import ResponseCache
+from fast_path import FastPathStats
+from registry import RestaurantRegistry
+from orders import OrderExtractor, extract_order, validate_order
+from summarizer import SUMMARY_ENABLED, SUMMARY_WINDOW, Summarizer, render_memory
+from metrics import UNKNOWN, current_trace, record_error, render as render_metrics, span, start_trace, use_trace
+from llm_gateway import LLM_EST_PROMPT_TOKENS, LLMGateway, Overloaded
+from archive import Archiver, JobTracker, clear_collection
 
 # -------------------- Setup --------------------
 load_dotenv()
+log = logging.getLogger("syntra")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MONGO_URI = os.getenv("MONGO_URI")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client["SyntraAI"]
-
-app = FastAPI()
+# Clients and everything bound to them are created in lifespan(), not at import
+client = None
+gateway = None
+mongo_client = None
+db = None
+catalog_cache = None
+session_store = None
+summarizer = None
+archiver = None
+response_cache = ResponseCache()
+fast_path = FastPathStats()
+registry = RestaurantRegistry()
+jobs = JobTracker()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, gateway, mongo_client, db, catalog_cache, session_store, summarizer, archiver
+    # Async clients: a request waiting on Mongo or the LLM must not block the event loop
+    client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)  # the gateway owns retries and deadlines
+    gateway = LLMGateway(client)
+    mongo_client = AsyncIOMotorClient(MONGO_URI)
+    db = mongo_client["SyntraAI"]
+    catalog_cache = CatalogCache(db)
+    session_store = SessionStore(db, WriteBehind(db), keep_backlog=SUMMARY_ENABLED)
+    summarizer = Summarizer(db, gateway) if SUMMARY_ENABLED else None
+    archiver = Archiver(db, jobs)
+
+    # Keys + display names only; the app never needs the raw payloads
+    registry.scan()
+
+    catalog_cache.start_watching()
+    # Create/verify chat indexes first so session loads never collection-scan
+    try:
+        await bootstrap_storage(db)
+    except Exception as e:
+        log.error("Chat storage bootstrap failed: %s", e)
+    session_store.start()
+    if summarizer:
+        summarizer.start()
+    archiver.start()
+    try:
+        yield
+    finally:
+        await catalog_cache.stop_watching()
+        await archiver.stop()
+        await jobs.stop()
+        if summarizer:
+            await summarizer.stop()
+        await session_store.stop()
+        await client.close()
+        mongo_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -32,32 +100,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", StaticFiles(directory="Static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-# -------------------- Load Restaurant Data --------------------
-all_restaurants = load_all_restaurant_data()
-
-def format_name(name: str) -> str:
-    return name.replace("_", " ").title()
 
 
 # -------------------- Nearest Store Finder --------------------
-def find_nearest_store(lat, lon, locations):
+def find_nearest_store(lat, lon, store_index):
     """Find nearest store given user latitude and longitude."""
     try:
-        user_loc = (float(lat), float(lon))
-        nearest = None
-        nearest_dist = float("inf")
-
-        for loc in locations:
-            store_coords = (loc["latitude"], loc["longitude"])
-            dist = geodesic(user_loc, store_coords).miles
-            if dist < nearest_dist:
-                nearest = loc
-                nearest_dist = dist
-
-        if nearest:
+        hits = store_index.nearest(float(lat), float(lon), k=1)
+        if hits:
+            nearest_dist, nearest = hits[0]
             return f"The nearest store is {nearest['name']} located at {nearest['address']} ({nearest_dist:.1f} miles away)."
         else:
             return "Sorry, I couldn’t find any nearby stores."
@@ -66,163 +120,99 @@ def find_nearest_store(lat, lon, locations):
 
 
 # -------------------- Main AI Logic --------------------
+LLM_ERROR_PREFIX = "Sorry, something went wrong"
+LLM_MAX_TOKENS = 800
+BUSY_MESSAGE = "We're a little swamped right now. Please try again in a few seconds."
+
 # Updated ask_syntra to accept session_id and use full waiter prompt
-def ask_syntra(user_text: str, restaurant_key: str, mode: str, session_id: str) -> str:
+async def build_messages(user_text: str, restaurant_key: str, mode: str, session_id: str,
+                         catalog=None, state=None) -> list:
+    """System prompt + recent session history + the new user message (catalog/state when already resolved)."""
     tz = pytz.timezone("America/Chicago")
     now = datetime.now(tz).strftime("%A, %B %d, %Y at %I:%M %p %Z")
 
-    # Fetch restaurant doc
-    restaurant_doc = db.restaurants.find_one({"key": restaurant_key})
-    display_name = restaurant_doc.get("display_name", restaurant_key.replace("_", " ").title())
-    restaurant_info = restaurant_doc.get("raw", {})
-
-    # -------------------- Load Menu --------------------
-    menu_cursor = db.menus.find({"restaurant_key": restaurant_key, "availability": True})
-    menu_list = []
-    for m in menu_cursor:
-        menu_list.append({
-            "item_id": m.get("item_id"),
-            "name": m.get("name"),
-            "category": m.get("category"),
-            "price": m.get("price"),
-            "description": m.get("description", "")
-        })
-
-    # Menu cutoff to avoid huge context
-    menu_for_prompt = menu_list[:60]
+    # Fetch restaurant doc + menu (served from the in-process catalog cache)
+    if catalog is None:
+        with span("catalog"):
+            catalog = await catalog_cache.get(restaurant_key)
 
     # -------------------- Load Session History --------------------
-    coll = db[f"{restaurant_key}_chat"]
-    recent = list(coll.find({"session_id": session_id}, {"_id": 0})
-                  .sort("timestamp", -1).limit(8))
-    recent.reverse()
-
-    # -------------------- ORDER MODE STICKINESS --------------------
-    # If the bot was already handling an order, stay in order mode
-    for h in reversed(recent):
-        if h["role"] == "bot":
-            msg = h["message"].lower()
-            # These phrases indicate we are mid-order
-            order_indicators = [
-                "how many", "quantity", "pickup", "delivery",
-                "would this be", "name for the order",
-                "anything else you want", "anything else you'd like",
-                "you wanna add", "you want to add", "add anything"
-            ]
-            if any(key in msg for key in order_indicators):
-                mode = "order"
-                break
-
-
-   # -------------------- Build System Prompt Based on Mode --------------------
-    if mode == "chat":
-        system_prompt = f"""
-You are a super friendly, casual, human-like waiter at {display_name}.
-You talk like a real waiter at a relaxed restaurant — fun, warm, a little playful, NEVER formal.
-
-VIBE RULES:
-- Say “hey!” or “hey there!” instead of “hello”
-- Use natural speech (“oh nice!”, “haha yeah same”, “for sure!”, “got you!”)
-- Light emoji allowed 😊🔥🍕 (max 1 per message)
-- Small talk is encouraged (“how’s your day going?”, “my day’s been pretty chill haha”)
-- Sound HUMAN, not professional or robotic.
-
-WHAT YOU CAN DO:
-- answer greetings (“how are you?”, “sup?”, “how’s your day?”)
-- chat casually
-- recommend items
-- explain menu categories
-- tell user what’s popular
-
-WHAT YOU CANNOT DO (in chat mode):
-- start an order unless the user clearly wants to order
-- ask for pickup/delivery info
-- generate order JSON
-
-MENU REFERENCE (don’t list everything unless asked):
-{json.dumps(menu_for_prompt, indent=2)}
-
-Policies: {json.dumps(restaurant_doc.get('raw', {}).get('policies', {}), indent=2)}
-Deals: {json.dumps(restaurant_doc.get('raw', {}).get('deals', []), indent=2)}
-
-Keep messages short, warm, and super friendly.
-    """
-
-    else:  # ORDER MODE
-        system_prompt = f"""
-You are now in ORDER MODE for {display_name}.
-The user is placing an order. Stay friendly and casual, but ensure accuracy.
-
-ORDER FLOW RULES (follow them strictly):
-
-1. Confirm the requested item
-2. Always Confirm size/flavor 
-3. Confirm quantity
-After the user confirms they do NOT want anything else, your next message MUST ask:
-“Would this be for pickup or delivery?”  
-Never end the conversation before asking this.
-4. Ask: "Would this be for pickup or delivery?"
-5. If it's for delivery, Always ask for address.
-6. Ask: "And can I get a name for the order?"
-7. Summarize the order clearly
-8. THEN output the order JSON ONLY between these markers:
-
-
-
-When you output the final JSON, it MUST match this structure EXACTLY:
-
----ORDER_JSON_START---
-{{
-  "order": {{
-    "items": [
-      {{
-        "item_id": "string",
-        "name": "string",
-        "qty": 1,
-        "price": 0
-      }}
-    ],
-    "total": 0,
-    "pickup_or_delivery": "pickup or delivery",
-    "customer_name": "string",
-    "address": "string (required if delivery)",
-    "notes": ""
-  }}
-}}
----ORDER_JSON_END---
-
-IMPORTANT:
-• Keys MUST be spelled exactly like this: item_id, name, qty, price, total, pickup_or_delivery, customer_name, address, notes
-• Do NOT invent new keys.
-• Do NOT rename keys.
-• Do NOT wrap numbers as strings.
-• Do NOT output JSON until ALL information is collected.
-
-
-Menu reference:
-{json.dumps(menu_for_prompt, indent=2)}
-"""
-
-
-
-    # Build message list: system + session history + user
+    # Recent window lives in the in-memory session store (no Mongo read when warm)
+    if state is None:
+        with span("session"):
+            state = await session_store.get(restaurant_key, session_id)
+    recent = list(state.history)
+
+    # -------------------- Menu Retrieval --------------------
+    # Top-k items for this message plus the last few turns, so prompt size
+    # depends on k rather than on how big the menu is
+    queries = [(user_text, 1.0)]
+    queries += [(h.get("message", ""), 0.5 if h.get("role") == "user" else 0.25) for h in recent[-4:]]
+    with span("menu_retrieval"):
+        menu_items = get_menu_index(catalog).top_items(queries)
+
+    # -------------------- Build System Prompt Based on Mode --------------------
+    # Prefix compiled once per (restaurant, menu version, mode); menu selection and time vary
+    with span("prompt"):
+        system_prompt = build_system_prompt(catalog, "chat" if mode == "chat" else "order", now, menu_items)
+
+    # Build message list: system + folded memory + recent history + user.
+    # Older turns live in the rolling summary, so history stays a fixed window
     messages = [{"role": "system", "content": system_prompt}]
-    for h in recent:
+    history = recent
+    if summarizer:
+        history = state.prompt_history(SUMMARY_WINDOW)
+        memory = render_memory(state)
+        if memory:
+            messages.append({"role": "system", "content": memory})
+    for h in history:
         # h contains {"role":"user"|"bot", "message":..., "timestamp":..., "session_id":...}
         role = "assistant" if h.get("role") == "bot" else "user"
         messages.append({"role": role, "content": h.get("message")})
     messages.append({"role": "user", "content": user_text})
+    return messages
+
 
+async def ask_syntra(user_text: str, restaurant_key: str, mode: str, session_id: str, **bound) -> str:
+    messages = await build_messages(user_text, restaurant_key, mode, session_id, **bound)
     try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=800
-        )
+        # Admission control, coalescing, deadline and retries live in llm_gateway
+        with span("llm"):
+            resp = await gateway.complete(
+                restaurant_key, mode,
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=LLM_MAX_TOKENS
+            )
         return resp.choices[0].message.content.strip()
+    except Overloaded:
+        raise  # shed, not failed: /ask answers 429
     except Exception as e:
-        return f"Sorry, something went wrong: {e}"
+        # The customer still gets an apology, but the failure is logged and counted
+        log.warning("LLM call failed for %s/%s: %r", restaurant_key, session_id, e)
+        record_error("llm", restaurant_key, e)
+        return f"{LLM_ERROR_PREFIX}: {e}"
+
+
+async def ask_syntra_stream(lease, user_text: str, restaurant_key: str, mode: str, session_id: str, **bound):
+    """Same as ask_syntra, but yields completion text deltas as they arrive, on an admitted gateway lease."""
+    messages = await build_messages(user_text, restaurant_key, mode, session_id, **bound)
+    started = time.perf_counter()
+    trace = current_trace()
+    stream = gateway.stream(
+        lease, mode,
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.7,
+        max_tokens=LLM_MAX_TOKENS,
+        stream_options={"include_usage": True}  # usage arrives on a final chunk with no choices
+    )
+    async for chunk in stream:
+        if trace is not None and "llm_first_token" not in trace.stages:
+            trace.add("llm_first_token", time.perf_counter() - started)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
 
 
 # -------------------- Routes --------------------
@@ -233,133 +223,580 @@ async def home(request: Request):
 
 @app.get("/restaurants")
 async def get_restaurants():
-    """Return restaurant names for dropdown — works for both nested and flat JSONs."""
-    restaurant_names = []
-    for name, data in all_restaurants.items():
-        if "Dominos" in data:
-            restaurant_names.append("Dominos Pizza")
-        else:
-            restaurant_names.append(format_name(name))
-    return JSONResponse({"restaurants": restaurant_names})
+    """Return restaurant names for dropdown — served from the registry index, no file parsing."""
+    return JSONResponse({"restaurants": registry.display_names()})
 
 
 
 
-@app.post("/ask")
-async def ask(request: Request):
-    data = await request.json()
+# -------------------- Chat Turn Helpers --------------------
+def new_turn(msg: str, restaurant_key: str, mode: str, session_id: str) -> dict:
+    return {"msg": msg, "restaurant_key": restaurant_key, "mode": mode, "session_id": session_id,
+            "answer": None, "error": None, "intent_rules": {}, "catalog": None, "state": None, "source": "llm"}
+
+
+async def start_turn(data: dict) -> dict:
+    """
+    Validate an /ask payload and resolve the mode for this turn.
+    Sets "error" for bad requests and "answer" when no LLM call is needed.
+    """
     msg = data.get("message", "").strip()
     restaurant_key = data.get("restaurant_key") or data.get("restaurant")  # widget will send restaurant_key
     mode = data.get("mode", "chat").strip().lower()
     session_id = data.get("session_id") or make_session_id()
+    turn = new_turn(msg, restaurant_key, mode, session_id)
 
     if not msg:
-        return JSONResponse({"response": "Please type a message.", "session_id": session_id})
+        turn["error"] = "Please type a message."
+        return turn
     if not restaurant_key:
-        return JSONResponse({"response": "Missing restaurant_key.", "session_id": session_id})
+        turn["error"] = "Missing restaurant_key."
+        return turn
 
     # Ensure restaurant exists
-    restaurant_doc = db.restaurants.find_one({"key": restaurant_key})
-    if not restaurant_doc:
-        return JSONResponse({"response": "Unknown restaurant_key.", "session_id": session_id})
+    with span("catalog"):
+        catalog = await catalog_cache.get(restaurant_key)
+    if not catalog:
+        turn["error"] = "Unknown restaurant_key."
+        return turn
+    turn["catalog"] = catalog
+    with span("session"):
+        turn["state"] = await session_store.get(restaurant_key, session_id)
+    route_turn(turn, data.get("latitude"), data.get("longitude"))
+    return turn
+
+
+def route_turn(turn: dict, lat=None, lon=None):
+    """Pick the mode and answer source for a turn whose catalog and session are resolved."""
+    msg, catalog, state, mode = turn["msg"], turn["catalog"], turn["state"], turn["mode"]
 
     # Handle nearest / location shortcuts if you want
-    lat = data.get("latitude")
-    lon = data.get("longitude")
     if msg.lower() in ["nearest", "closest", "near me"] and lat and lon:
-        locations = restaurant_doc.get("raw", {}).get("locations", [])
-        answer = find_nearest_store(lat, lon, locations)
+        turn["answer"], turn["source"] = find_nearest_store(lat, lon, get_store_index(catalog)), "shortcut"
+        return
+
+    # -------------------- Intent Detection --------------------
+    # Look at the last bot message to understand context
+    with span("intent"):
+        matcher = get_intent_matcher(catalog)
+
+        # One pass over the message against every routing rule (see intent.py)
+        mode, turn["intent_rules"] = classify(matcher, msg, mode, state.last_bot_message())
+
+        # -------------------- ORDER MODE STICKINESS --------------------
+        # If the bot was already handling an order, stay in order mode
+        if state.mid_order(matcher):
+            mode = "order"
+            turn["intent_rules"]["bot_mid_order"] = True
+    turn["mode"] = mode
+
+    # Exact menu/price/policy/store questions are answered from the catalog,
+    # unless the user is ordering or an order is already under way
+    if "order_phrase" not in turn["intent_rules"] and "bot_mid_order" not in turn["intent_rules"]:
+        with span("fast_path"):
+            fast = fast_path.answer(catalog, msg)
+        if fast:
+            turn["answer"], turn["source"] = fast[1], "fast_path"
+            return
+
+    # Repeat chat-mode questions are answered from the response cache (never orders)
+    if mode == "chat":
+        with span("response_cache"):
+            cached = response_cache.get(catalog, msg)
+        if cached is not None:
+            turn["answer"], turn["source"] = cached, "response_cache"
+
+
+def remember_answer(turn: dict, answer: str, latency: float):
+    """Offer a fresh chat-mode LLM reply to the response cache."""
+    if turn["mode"] == "chat" and not answer.startswith(LLM_ERROR_PREFIX):
+        response_cache.put(turn["catalog"], turn["msg"], answer, latency)
+
+
+def check_order(turn: dict, payload, parse_error: str = None):
+    """Validate an extracted ORDER_JSON block; keeps the clean order on the turn when it passes."""
+    if parse_error:
+        turn["order_errors"] = [parse_error]
+    elif payload is not None:
+        with span("order_validate"):
+            turn["order"], turn["order_errors"] = validate_order(payload, turn["catalog"])
+    if turn.get("order_errors"):
+        log.warning("Rejected order for %s/%s: %s", turn["restaurant_key"], turn["session_id"], turn["order_errors"])
+    return turn.get("order") if not turn.get("order_errors") else None
+
+
+async def save_turn(turn: dict, answer: str):
+    """Save messages with session_id & timestamp (session window now, Mongo on the next flush)."""
+    with span("save"):
+        await record_turn(turn, answer)
+
+
+async def record_turn(turn: dict, answer: str):
+    state = turn["state"] or await session_store.get(turn["restaurant_key"], turn["session_id"])
+    now_ts = datetime.now(timezone.utc)
+    extra = None
+    if turn.get("order") and not turn.get("order_errors"):
+        # Same write-behind batch as the chat messages
+        order_doc = dict(turn["order"], session_id=turn["session_id"], status="received", timestamp=now_ts)
+        extra = {f"{turn['restaurant_key']}_orders": [order_doc]}
+    session_store.record(state, [
+        {"session_id": turn["session_id"], "role": "user", "message": turn["msg"], "mode": turn["mode"], "timestamp": now_ts},
+        {"session_id": turn["session_id"], "role": "bot", "message": answer, "mode": turn["mode"], "timestamp": datetime.now(timezone.utc)},
+    ], extra)
+    if summarizer:
+        summarizer.enqueue(state)  # folded by the background worker, not on this request
+
+
+def label_trace(trace, turn: dict):
+    """Restaurant/mode/source labels for this turn's metrics (unknown keys stay unlabelled)."""
+    trace.restaurant = turn["restaurant_key"] if turn["catalog"] else UNKNOWN
+    trace.mode = turn["mode"] if turn["catalog"] else UNKNOWN
+    trace.source = turn["source"] if not turn["error"] else "error"
+
+
+def busy_response(turn: dict, e: Overloaded) -> JSONResponse:
+    """429 for a turn the LLM gateway shed; nothing is saved, so the client can simply resend."""
+    retry_after = int(e.retry_after + 0.999)
+    return JSONResponse({"response": BUSY_MESSAGE, "session_id": turn["session_id"], "retry_after": retry_after},
+                        status_code=429, headers={"Retry-After": str(retry_after)})
+
+
+def sse_event(payload: dict, event: str = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/ask")
+async def ask(request: Request):
+    trace = start_trace("/ask")
+    try:
+        data = await request.json()
+        turn = await start_turn(data)
+        label_trace(trace, turn)
+        if turn["error"]:
+            return JSONResponse({"response": turn["error"], "session_id": turn["session_id"]})
+
+        fast_path.count_turn(turn["source"])
+        answer = turn["answer"]
+        if answer is None:
+            started = time.perf_counter()
+            answer = await ask_syntra(turn["msg"], turn["restaurant_key"], turn["mode"], turn["session_id"],
+                                      catalog=turn["catalog"], state=turn["state"])
+            remember_answer(turn, answer, time.perf_counter() - started)
+            check_order(turn, *extract_order(answer))
+        await save_turn(turn, answer)
+    except Overloaded as e:
+        trace.source = "shed"
+        return busy_response(turn, e)
+    except Exception as e:
+        record_error("ask", trace.restaurant, e)
+        trace.source = "error"
+        raise
+    finally:
+        trace.finish()
+
+    result = {"response": answer, "session_id": turn["session_id"]}
+    if turn.get("order") and not turn.get("order_errors"):
+        result["order"] = turn["order"]  # prices and total recomputed from the menu
+    if data.get("debug"):
+        result["intent"] = {"mode": turn["mode"], "rules": turn["intent_rules"]}
+        result["source"] = turn["source"]
+        result["order_errors"] = turn.get("order_errors")
+    return JSONResponse(result)
+
+
+async def stream_turn(turn: dict, lease, started: float, debug: bool = False):
+    """
+    Run a resolved turn, yielding (event, payload) pairs: event None carries a
+    text delta (or an error), then "order" when a valid order closes and
+    "done" with timings. The reply is saved before "done" and left in
+    turn["response"].
+    """
+    if turn["error"]:
+        yield None, {"delta": turn["error"]}
+        yield "done", {"session_id": turn["session_id"], "ttft_ms": 0, "total_ms": 0}
+        return
+
+    parts = []
+    ttft_ms = None
+    failed = False
+    fast_path.count_turn(turn["source"])
+    if turn["answer"] is not None:
+        parts.append(turn["answer"])
+        ttft_ms = (time.perf_counter() - started) * 1000
+        yield None, {"delta": turn["answer"]}
     else:
-         # -------------------- Intent Detection --------------------
-        # Look at the last bot message to understand context
-        last_bot_msg = None
+        extractor = OrderExtractor()
         try:
-            last_chat = coll.find_one(
-                {"session_id": session_id, "role": "bot"},
-                sort=[("timestamp", -1)]
-            )
-            if last_chat:
-                last_bot_msg = last_chat.get("message", "").lower()
-        except:
+            async for delta in ask_syntra_stream(lease, turn["msg"], turn["restaurant_key"], turn["mode"],
+                                                 turn["session_id"], catalog=turn["catalog"], state=turn["state"]):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                parts.append(delta)
+                yield None, {"delta": delta}
+                # Validate the order as soon as its JSON block closes, mid-stream
+                if not extractor.done and (extractor.feed(delta) is not None or extractor.error):
+                    if check_order(turn, extractor.order, extractor.error):
+                        yield "order", {"order": turn["order"]}
+        except Exception as e:
+            log.warning("LLM stream failed for %s/%s: %r", turn["restaurant_key"], turn["session_id"], e)
+            record_error("llm", turn["restaurant_key"], e)
+            error = f"{LLM_ERROR_PREFIX}: {e}"
+            parts = [error]
+            failed = True
+            yield None, {"error": error}
+
+    answer = turn["response"] = "".join(parts).strip()
+    total_ms = (time.perf_counter() - started) * 1000
+    if turn["answer"] is None and not failed:
+        remember_answer(turn, answer, total_ms / 1000)
+    await save_turn(turn, answer)
+    log.info("stream %s ttft=%.0fms total=%.0fms", turn["restaurant_key"], ttft_ms or total_ms, total_ms)
+    done = {"session_id": turn["session_id"], "ttft_ms": round(ttft_ms or total_ms, 1), "total_ms": round(total_ms, 1)}
+    if debug:
+        done["intent"] = {"mode": turn["mode"], "rules": turn["intent_rules"]}
+        done["source"] = turn["source"]
+        done["order_errors"] = turn.get("order_errors")
+    yield "done", done
+
+
+@app.post("/ask/stream")
+async def ask_stream(request: Request):
+    """
+    Server-sent events variant of /ask: one `data: {"delta": ...}` event per
+    completion chunk, then an `event: done` carrying time-to-first-token and
+    total latency. The bot message is persisted once the stream finishes.
+    """
+    started = time.perf_counter()
+    trace = start_trace("/ask/stream")
+    data = await request.json()
+    turn = await start_turn(data)
+    label_trace(trace, turn)
+    lease = None
+    if not turn["error"] and turn["answer"] is None:
+        # Admit before the response starts so a shed turn can still be a 429
+        try:
+            lease = await gateway.admit(turn["restaurant_key"], LLM_EST_PROMPT_TOKENS + LLM_MAX_TOKENS)
+        except Overloaded as e:
+            trace.source = "shed"
+            trace.finish()
+            return busy_response(turn, e)
+
+    async def events():
+        use_trace(trace)  # the body may be iterated outside the handler's context
+        try:
+            async for event, payload in stream_turn(turn, lease, started, data.get("debug")):
+                yield sse_event(payload, event)
+        finally:
+            if lease is not None:
+                lease.release()  # no-op when the stream already released it
+            trace.finish()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# -------------------- WebSocket Chat --------------------
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+WS_MAX_MISSED_HEARTBEATS = int(os.getenv("WS_MAX_MISSED_HEARTBEATS", "3"))
+WS_RESUME_WAIT_SECONDS = float(os.getenv("WS_RESUME_WAIT_SECONDS", "60"))
+
+
+async def ws_send(websocket: WebSocket, frame: dict) -> bool:
+    """Send a frame; False once the client is gone (the turn still runs to completion and is saved)."""
+    try:
+        await websocket.send_json(frame)
+        return True
+    except (WebSocketDisconnect, RuntimeError):
+        return False
+
+
+async def ws_turn(websocket: WebSocket, state, frame: dict) -> bool:
+    """Answer one message frame on a bound session; returns whether the socket is still usable."""
+    started = time.perf_counter()
+    trace = start_trace("/ws/chat")
+    state.turn_seq += 1
+    seq = state.turn_seq
+    turn = new_turn(str(frame.get("message") or "").strip(), state.restaurant_key,
+                    str(frame.get("mode") or "chat").strip().lower(), state.session_id)
+    # In-process lookup only: picks up /reload and menu changes without a Mongo read
+    turn["catalog"] = await catalog_cache.get(state.restaurant_key)
+    turn["state"] = state
+    if not turn["msg"]:
+        turn["error"] = "Please type a message."
+    elif not turn["catalog"]:
+        turn["error"] = "Unknown restaurant_key."
+    else:
+        route_turn(turn, frame.get("latitude"), frame.get("longitude"))
+    label_trace(trace, turn)
+    if turn["error"]:
+        trace.finish()
+        return await ws_send(websocket, {"type": "error", "turn": seq, "message": turn["error"]})
+
+    lease = None
+    if turn["answer"] is None:
+        try:
+            lease = await gateway.admit(turn["restaurant_key"], LLM_EST_PROMPT_TOKENS + LLM_MAX_TOKENS)
+        except Overloaded as e:
+            trace.source = "shed"
+            trace.finish()
+            return await ws_send(websocket, {"type": "busy", "turn": seq, "message": BUSY_MESSAGE,
+                                             "retry_after": int(e.retry_after + 0.999)})
+
+    alive = True
+    running = state.running = asyncio.get_running_loop().create_future()
+    try:
+        async for event, payload in stream_turn(turn, lease, started, frame.get("debug")):
+            if alive:
+                kind = event or ("error" if "error" in payload else "delta")
+                alive = await ws_send(websocket, dict(payload, type=kind, turn=seq))
+    finally:
+        if lease is not None:
+            lease.release()
+        trace.finish()
+        state.last_reply = {"turn": seq, "response": turn.get("response", ""),
+                            "order": turn.get("order") if not turn.get("order_errors") else None}
+        running.set_result(None)
+        if state.running is running:
+            state.running = None
+    return alive
+
+
+@app.websocket("/ws/chat")
+async def ws_chat(websocket: WebSocket):
+    """
+    Chat over one socket. The first frame binds it to a restaurant and session:
+        {"type": "hello", "restaurant_key": ..., "session_id": ..., "last_turn": n}
+    and the session's history window and mode then stay in connection memory,
+    so a turn does no restaurant lookup and no history read. Each
+        {"type": "message", "message": ..., "mode": ...}
+    is answered with "delta" frames, an "order" frame when a valid order closes,
+    and "done" (or "busy"/"error"), all tagged with the turn number. The server
+    pings an idle socket every WS_HEARTBEAT_SECONDS and drops it after
+    WS_MAX_MISSED_HEARTBEATS unanswered. Reconnecting with the same session_id
+    resumes the session; if a reply finished after the old socket died, or its
+    turn is newer than last_turn, it is replayed in full as a "replay" frame.
+    """
+    await websocket.accept()
+    try:
+        hello = await asyncio.wait_for(websocket.receive_json(), WS_HEARTBEAT_SECONDS)
+    except (asyncio.TimeoutError, ValueError, WebSocketDisconnect):
+        await websocket.close(code=1008)
+        return
+    restaurant_key = hello.get("restaurant_key") or hello.get("restaurant")
+    catalog = await catalog_cache.get(restaurant_key) if restaurant_key else None
+    if hello.get("type") != "hello" or not catalog:
+        await ws_send(websocket, {"type": "error", "message": "Send a hello frame with a known restaurant_key."})
+        await websocket.close(code=1008)
+        return
+
+    session_id = hello.get("session_id") or make_session_id()
+    state = await session_store.get(restaurant_key, session_id)
+    if state.running is not None:
+        # The previous socket dropped mid-reply; let that turn finish so it can be replayed
+        try:
+            await asyncio.wait_for(asyncio.shield(state.running), WS_RESUME_WAIT_SECONDS)
+        except asyncio.TimeoutError:
             pass
+    if not await ws_send(websocket, {"type": "ready", "session_id": session_id, "mode": state.mode,
+                                     "resumed": bool(state.history), "heartbeat": WS_HEARTBEAT_SECONDS,
+                                     "last_turn": state.turn_seq}):
+        return
+    last, seen = state.last_reply, hello.get("last_turn")
+    if last and isinstance(seen, int) and last["turn"] > seen:
+        if not await ws_send(websocket, dict(last, type="replay")):
+            return
+
+    missed = 0
+    while True:
+        try:
+            frame = await asyncio.wait_for(websocket.receive_json(), WS_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            missed += 1
+            if missed > WS_MAX_MISSED_HEARTBEATS:
+                await websocket.close(code=1001)
+                return
+            if not await ws_send(websocket, {"type": "ping"}):
+                return
+            continue
+        except ValueError:
+            if not await ws_send(websocket, {"type": "error", "message": "Frames must be JSON."}):
+                return
+            continue
+        except (WebSocketDisconnect, RuntimeError):
+            return
+        missed = 0
+        kind = frame.get("type") if isinstance(frame, dict) else None
+        if kind == "ping":
+            alive = await ws_send(websocket, {"type": "pong"})
+        elif kind == "pong":
+            alive = True
+        elif kind == "message":
+            alive = await ws_turn(websocket, state, frame)
+        else:
+            alive = await ws_send(websocket, {"type": "error", "message": f"Unknown frame type {kind!r}."})
+        if not alive:
+            return
 
-        # New rule: if last bot message mentioned a specific item OR suggested adding items → switch to order mode
-        order_context_keywords = ["wings", "pizza", "pasta", "sides", "drinks", "add"] 
-        confirmation_keywords = ["yes", "yeah", "ok", "sure", "no", "not that", "that's all", "that’s all"]
 
-        if last_bot_msg and any(word in last_bot_msg for word in order_context_keywords):
-            if msg.lower() in confirmation_keywords:
-                mode = "order"
+# -------------------- History --------------------
+async def history_page(coll, scope, session_id, since, until, cursor, limit):
+    try:
+        flt = history_filter(scope, session_id, since, until, cursor)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    items, next_cursor = await fetch_page(coll, flt, limit)
+    return Response(to_json({"history": items, "next_cursor": next_cursor}), media_type="application/json")
 
-            else:
-                mode = "chat"
-        
-        # Call AI
-        # -------------------- ORDER INTENT DETECTION --------------------
-        msg_lower = msg.lower()
 
-        order_keywords = [
-            "i want", "i'll take", "i will take", "get me", "give me",
-            "order", "buy", "add", "take", "i want to order",
-            "i want a", "i want the", "i want pizza", "i want wings"
-        ]
+def history_export(coll, scope, session_id, since, until, filename):
+    flt = history_filter(scope, session_id, since, until)
+    return StreamingResponse(export_ndjson(coll, flt), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'})
 
-        confirmation_words = ["no", "nope", "that's it", "thats it", "no that's all", "no thats all", "ok", "okay"]
 
-        menu_keywords = ["pizza", "wings", "pasta", "salad", "sandwich", "drinks", "sides"]
-        size_keywords = ["small", "medium", "large","xl", "extra large", "extra-large",
-            "10", "12", "14", "16","10 inch", "12 inch", "14 inch", "16 inch"
-        ]
+@app.get("/history/{restaurant_key}")
+async def get_chat_history(restaurant_key: str, session_id: str = None, since: datetime = None,
+                           until: datetime = None, cursor: str = None, limit: int = HISTORY_PAGE_SIZE):
+    """Chat messages, oldest first, one page at a time; pass next_cursor back for the next page."""
+    name, scope = chat_target(restaurant_key)
+    return await history_page(db[name], scope, session_id, since, until, cursor, limit)
 
-        # 1. If the user explicitly expresses an order
-        if any(k in msg_lower for k in order_keywords):
-            mode = "order"
 
-        # 2. If user replies after item suggestion like "no", "that's it", etc.
-        if any(word == msg_lower for word in confirmation_words):
-            mode = "order"
+@app.get("/history/{restaurant_key}/export")
+async def export_chat_history(restaurant_key: str, session_id: str = None, since: datetime = None,
+                              until: datetime = None):
+    """Every matching chat message as NDJSON, streamed straight from the cursor."""
+    name, scope = chat_target(restaurant_key)
+    return history_export(db[name], scope, session_id, since, until, f"{restaurant_key}_chat")
 
-        # 3. If message mentions a menu item
-        if any(word in msg_lower for word in menu_keywords):
-            mode = "order"
 
-        # 4. If message mentions size of a item
-        if msg_lower in size_keywords or any(word in msg_lower for word in size_keywords):
-            mode = "order"
+@app.get("/history_orders/{restaurant_key}")
+async def get_order_history(restaurant_key: str, session_id: str = None, since: datetime = None,
+                            until: datetime = None, cursor: str = None, limit: int = HISTORY_PAGE_SIZE):
+    return await history_page(db[f"{restaurant_key}_orders"], {}, session_id, since, until, cursor, limit)
 
-        answer = ask_syntra(msg, restaurant_key, mode, session_id)
 
-    # Save messages in DB with session_id & timestamp
-    coll = db[f"{restaurant_key}_chat"]
-    now_ts = datetime.now(timezone.utc)
-    coll.insert_one({"session_id": session_id, "role": "user", "message": msg, "mode": mode, "timestamp": now_ts})
-    coll.insert_one({"session_id": session_id, "role": "bot", "message": answer, "mode": mode, "timestamp": datetime.now(timezone.utc)})
+@app.get("/history_orders/{restaurant_key}/export")
+async def export_order_history(restaurant_key: str, session_id: str = None, since: datetime = None,
+                               until: datetime = None):
+    return history_export(db[f"{restaurant_key}_orders"], {}, session_id, since, until, f"{restaurant_key}_orders")
 
-    return JSONResponse({"response": answer, "session_id": session_id})
 
+@app.post("/reload")
+async def reload_all_catalogs():
+    """Drop every cached restaurant/menu; use when change streams are off."""
+    catalog_cache.invalidate()
+    return JSONResponse({"ok": True, "reloaded": "all"})
 
 
-@app.get("/history/{restaurant_key}")
-async def get_chat_history(restaurant_key: str):
-    collection = db[restaurant_key]
-    chats = list(collection.find({}, {"_id": 0}))
-    return JSONResponse({"history": chats})
+@app.post("/reload/{restaurant_key}")
+async def reload_catalog(restaurant_key: str):
+    """Drop and eagerly reload one restaurant's cached doc and menu."""
+    catalog_cache.invalidate(restaurant_key)
+    catalog = await catalog_cache.get(restaurant_key)
+    if not catalog:
+        return JSONResponse({"ok": False, "error": "Unknown restaurant_key."}, status_code=404)
+    return JSONResponse({"ok": True, "reloaded": restaurant_key, "version": catalog.version, "items": len(catalog.menu)})
 
 
-@app.get("/history_orders/{restaurant_key}")
-async def get_order_history(restaurant_key: str):
-    collection = db[f"{restaurant_key}_orders"]
-    items = list(collection.find({}, {"_id": 0}))
-    return JSONResponse({"history": items})
+@app.get("/stores/{restaurant_key}")
+async def get_nearby_stores(restaurant_key: str, lat: float, lon: float, k: int = 3, radius_miles: float = None):
+    """k nearest stores, or every store within radius_miles when it is given."""
+    catalog = await catalog_cache.get(restaurant_key)
+    if not catalog:
+        return JSONResponse({"error": "Unknown restaurant_key."}, status_code=404)
+    index = get_store_index(catalog)
+    hits = index.within(lat, lon, radius_miles) if radius_miles is not None else index.nearest(lat, lon, k=k)
+    return JSONResponse({"stores": [dict(loc, miles=round(miles, 2)) for miles, loc in hits]})
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the response, catalog and session caches."""
+    return JSONResponse({
+        "responses": response_cache.stats(),
+        "catalog": catalog_cache.stats(),
+        "sessions": session_store.stats(),
+        "summaries": summarizer.stats() if summarizer else None,
+    })
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text format: per-stage latency, token usage, errors and cache hits."""
+    responses = response_cache.stats()
+    caches = {
+        "responses": {"hits": responses["exact_hits"] + responses["near_hits"], "misses": responses["misses"]},
+        "catalog": catalog_cache.stats(),
+        "sessions": session_store.stats(),
+    }
+    return Response(render_metrics(caches), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    """LLM gateway slots, queues, shed/coalesced/retried calls per restaurant."""
+    return JSONResponse(gateway.stats())
+
+
+@app.get("/fast_path/stats")
+async def get_fast_path_stats():
+    """Turns by answer source and the fraction served without an LLM call."""
+    return JSONResponse(fast_path.stats())
+
+
+@app.get("/prompts/{restaurant_key}")
+async def get_prompt_stats(restaurant_key: str):
+    """Compiled system prompt token counts per mode for one restaurant."""
+    catalog = await catalog_cache.get(restaurant_key)
+    if not catalog:
+        return JSONResponse({"error": "Unknown restaurant_key."}, status_code=404)
+    return JSONResponse(prompt_stats(catalog))
+
+
+# -------------------- Clears, Archival & Jobs --------------------
+def job_response(job, **extra):
+    return JSONResponse({"ok": True, **extra, "job": job.to_dict(), "status_url": f"/jobs/{job.id}"},
+                        status_code=202)
 
 
 @app.delete("/clear/{restaurant_key}")
 async def clear_chat_history(restaurant_key: str):
-    db[restaurant_key].delete_many({})
-    return JSONResponse({"ok": True, "cleared": restaurant_key})
+    """Delete a restaurant's chat history in the background; poll status_url for progress."""
+    collection, scope = chat_target(restaurant_key)
+    session_store.forget(restaurant_key)
+    job = jobs.start("clear", restaurant_key, lambda job: clear_collection(db[collection], scope, job))
+    return job_response(job, cleared=restaurant_key)
 
 
 @app.delete("/clear_orders/{restaurant_key}")
 async def clear_order_history(restaurant_key: str):
-    db[f"{restaurant_key}_orders"].delete_many({})
-    return JSONResponse({"ok": True, "cleared": f"{restaurant_key}_orders"})
+    """Delete a restaurant's orders in the background; poll status_url for progress."""
+    collection = f"{restaurant_key}_orders"
+    session_store.writer.discard(collection)
+    job = jobs.start("clear", collection, lambda job: clear_collection(db[collection], {}, job))
+    return job_response(job, cleared=collection)
+
+
+@app.post("/archive")
+async def run_archive(restaurant_key: str = None, days: float = None):
+    """Archive sessions idle for `days` (default ARCHIVE_AFTER_DAYS) to compressed JSONL now."""
+    if not (days or archiver.days):
+        return JSONResponse({"error": "Pass days or set ARCHIVE_AFTER_DAYS."}, status_code=400)
+    job = archiver.run_now([restaurant_key] if restaurant_key else None, days)
+    return job_response(job)
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """Recent clear and archive jobs, newest first."""
+    return JSONResponse({"jobs": jobs.list()})
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Unknown job."}, status_code=404)
+    return JSONResponse(job.to_dict())
@@ -0,0 +1,336 @@
+# archive.py
+"""
+Chat/order archival to compressed cold storage, and tracked background clears.
+
+Sessions whose last message is older than ARCHIVE_AFTER_DAYS are moved out of
+the hot chat and order collections in batches of ARCHIVE_BATCH sessions.
+Each batch is written as date-partitioned, compressed JSONL (partitioned by
+the day of the session's last message):
+
+    {ARCHIVE_DIR}/{collection}/date=YYYY-MM-DD/{restaurant}-{stamp}-{n}.jsonl.gz
+
+The file is fsynced and renamed into place before the batch is deleted from
+Mongo by _id, so a crash can at worst archive a batch twice, never lose it.
+Sessions still active keep all their messages hot, and everything older
+than the window leaves. The find and the delete share one snapshot filter
+(idle sessions, timestamp < cutoff), so a message that arrives mid-pass is
+never archived or deleted, so hot collection size is bounded by traffic over
+ARCHIVE_AFTER_DAYS. Clears use the same throttled _id-batch deletes instead
+of one delete_many({}). Archival passes and clears run as tracked jobs
+(JobTracker) whose progress is served by /jobs.
+
+    python archive.py run [--days 30] [--restaurant KEY]   # one pass, uses MONGO_URI
+"""
+import argparse
+import asyncio
+import gzip
+import io
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from chat_storage import chat_target
+from history import to_json
+from metrics import record_error
+from session_store import SUMMARY_COLLECTION
+
+log = logging.getLogger("syntra.archive")
+
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "0"))  # 0 disables the periodic archiver
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", "500"))
+ARCHIVE_DELETE_BATCH = int(os.getenv("ARCHIVE_DELETE_BATCH", "1000"))
+ARCHIVE_THROTTLE_SECONDS = float(os.getenv("ARCHIVE_THROTTLE_SECONDS", "0.05"))  # pause between delete batches
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "gzip")  # or "zstd" (needs zstandard)
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# -------------------- Jobs --------------------
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class Job:
+    def __init__(self, kind: str, target: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.target = target
+        self.status = "queued"
+        self.processed = 0
+        self.total = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.task = None
+
+    def advance(self, n: int):
+        self.processed += n
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "target": self.target,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": round(min(1.0, self.processed / self.total), 4) if self.total else None,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+class JobTracker:
+    """Background tasks with progress; keeps the last JOB_HISTORY jobs for /jobs."""
+
+    def __init__(self, keep: int = JOB_HISTORY):
+        self.keep = keep
+        self.jobs = OrderedDict()
+
+    def start(self, kind: str, target: str, work) -> Job:
+        """Run work(job) in the background; an unfinished job for the same kind+target is returned instead."""
+        for job in self.jobs.values():
+            if job.kind == kind and job.target == target and job.finished_at is None:
+                return job
+        job = Job(kind, target)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.keep:
+            oldest = next((j for j in self.jobs.values() if j.finished_at is not None), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest.id]
+        job.task = asyncio.ensure_future(self._run(job, work))
+        return job
+
+    async def _run(self, job: Job, work):
+        job.status, job.started_at = "running", _now()
+        try:
+            await work(job)
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+            record_error(job.kind, None, e)
+            log.error("%s job %s on %s failed: %s", job.kind, job.id, job.target, e)
+        finally:
+            job.finished_at = _now()
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        return [job.to_dict() for job in reversed(self.jobs.values())]
+
+    async def stop(self):
+        running = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+# -------------------- Cold Storage --------------------
+def _open_compressed(path: str):
+    if ARCHIVE_COMPRESSION == "zstd" and zstandard is not None:
+        raw = open(path, "wb")
+        return raw, io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False), encoding="utf-8")
+    raw = open(path, "wb")
+    return raw, io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="wb"), encoding="utf-8")
+
+
+def archive_suffix() -> str:
+    if ARCHIVE_COMPRESSION == "zstd":
+        if zstandard is not None:
+            return ".jsonl.zst"
+        log.warning("ARCHIVE_COMPRESSION=zstd but zstandard is not installed; writing gzip")
+    return ".jsonl.gz"
+
+
+def session_day(docs: list) -> str:
+    stamps = [d["timestamp"] for d in docs if isinstance(d.get("timestamp"), datetime)]
+    return max(stamps).strftime("%Y-%m-%d") if stamps else "unknown"
+
+
+def write_partitions(collection: str, label: str, partitions: dict, root: str = ARCHIVE_DIR) -> list:
+    """Write {day: docs} as one compressed JSONL file per day; fsync + rename so files are whole or absent."""
+    stamp, suffix, paths = time.strftime("%Y%m%dT%H%M%S"), archive_suffix(), []
+    for n, (day, docs) in enumerate(sorted(partitions.items())):
+        folder = os.path.join(root, collection, f"date={day}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{label}-{stamp}-{uuid.uuid4().hex[:6]}-{n}{suffix}")
+        raw, out = _open_compressed(path + ".tmp")
+        with raw:
+            with out:
+                for doc in docs:
+                    out.write(to_json(doc))
+                    out.write("\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(path + ".tmp", path)
+        paths.append(path)
+    return paths
+
+
+# -------------------- Archival --------------------
+async def delete_ids(coll, ids: list, job: Job = None, match: dict = None) -> int:
+    deleted = 0
+    for i in range(0, len(ids), ARCHIVE_DELETE_BATCH):
+        result = await coll.delete_many(dict(match or {}, _id={"$in": ids[i:i + ARCHIVE_DELETE_BATCH]}))
+        deleted += result.deleted_count
+        if job:
+            job.advance(result.deleted_count)
+        await asyncio.sleep(ARCHIVE_THROTTLE_SECONDS)
+    return deleted
+
+
+async def archive_sessions(coll, scope: dict, session_ids: list, cutoff: datetime, label: str, job: Job = None) -> int:
+    """Move every message of the given sessions that has had no activity since cutoff."""
+    active = set(await coll.distinct("session_id", dict(scope, session_id={"$in": session_ids},
+                                                        timestamp={"$gte": cutoff})))
+    idle = [s for s in session_ids if s not in active]
+    if not idle:
+        return 0
+    # Find and delete use the same snapshot: anything written after the check is newer than cutoff
+    snapshot = dict(scope, session_id={"$in": idle, "$nin": list(active)}, timestamp={"$lt": cutoff})
+    docs = await coll.find(snapshot).sort(
+        [("session_id", 1), ("timestamp", 1)]).to_list(length=None)
+    sessions = {}
+    for doc in docs:
+        sessions.setdefault(doc.get("session_id"), []).append(doc)
+    partitions = {}
+    for session_docs in sessions.values():
+        partitions.setdefault(session_day(session_docs), []).extend(session_docs)
+    # Files are complete on disk before anything leaves Mongo
+    await asyncio.to_thread(write_partitions, coll.name, label, partitions)
+    return await delete_ids(coll, [d["_id"] for d in docs], job, snapshot)
+
+
+async def archive_collection(coll, scope: dict, cutoff: datetime, label: str, job: Job = None,
+                             batch_size: int = ARCHIVE_BATCH) -> int:
+    """Archive, batch by batch, every session in coll (within scope) idle since before cutoff."""
+    moved, seen, pending = 0, set(), []
+    cursor = coll.find(dict(scope, timestamp={"$lt": cutoff}), {"session_id": 1}).sort([("timestamp", 1), ("_id", 1)])
+    async for doc in cursor:
+        session_id = doc.get("session_id")
+        if session_id in seen:
+            continue
+        seen.add(session_id)
+        pending.append(session_id)
+        if len(pending) >= batch_size:
+            moved += await archive_sessions(coll, scope, pending, cutoff, label, job)
+            pending = []
+    if pending:
+        moved += await archive_sessions(coll, scope, pending, cutoff, label, job)
+    return moved
+
+
+async def clear_collection(coll, scope: dict, job: Job = None, batch_size: int = ARCHIVE_DELETE_BATCH) -> int:
+    """delete_many in throttled _id batches, so a big clear never holds one long write on the primary."""
+    if job:
+        job.total = await coll.count_documents(scope)
+    deleted = 0
+    while True:
+        ids = [d["_id"] for d in await coll.find(scope, {"_id": 1}).limit(batch_size).to_list(length=batch_size)]
+        if not ids:
+            return deleted
+        deleted += await delete_ids(coll, ids, job)
+
+
+class Archiver:
+    """Periodic archival pass over every restaurant's chat and order collections."""
+
+    def __init__(self, db, jobs: JobTracker, days: float = ARCHIVE_AFTER_DAYS,
+                 interval: float = ARCHIVE_INTERVAL_SECONDS):
+        self.db = db
+        self.jobs = jobs
+        self.days = days
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self.days > 0 and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            job = self.run_now()
+            await asyncio.shield(job.task)
+            await asyncio.sleep(self.interval)
+
+    def run_now(self, restaurant_keys: list = None, days: float = None) -> Job:
+        days = days or self.days
+        target = ",".join(restaurant_keys) if restaurant_keys else "*"
+        return self.jobs.start("archive", target, lambda job: self.archive(job, restaurant_keys, days))
+
+    def targets(self, restaurant_keys: list) -> list:
+        """(collection, scope, file label) for each hot collection to archive."""
+        out = []
+        for key in restaurant_keys:
+            name, scope = chat_target(key)
+            out.append((self.db[name], scope, key))
+            out.append((self.db[f"{key}_orders"], {}, key))
+        return out
+
+    async def archive(self, job: Job, restaurant_keys: list = None, days: float = None):
+        cutoff = _now() - timedelta(days=days or self.days)
+        if not restaurant_keys:
+            restaurant_keys = await self.db.restaurants.distinct("key")
+        targets = self.targets(restaurant_keys)
+        # Upper bound: messages older than the cutoff (some belong to sessions still active)
+        job.total = sum([await coll.count_documents(dict(scope, timestamp={"$lt": cutoff})) for coll, scope, _ in targets])
+        for coll, scope, label in targets:
+            moved = await archive_collection(coll, scope, cutoff, label, job)
+            if moved:
+                log.info("Archived %d docs from %s (%s) older than %s", moved, coll.name, label, cutoff.date())
+        # Rolling summaries of sessions idle since the cutoff went out with their messages
+        await self.db[SUMMARY_COLLECTION].delete_many(
+            {"restaurant_key": {"$in": restaurant_keys}, "updated_at": {"$lt": cutoff}})
+
+
+def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Archive idle chat sessions and orders to compressed JSONL")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS or 30)
+    parser.add_argument("--restaurant", action="append", help="restaurant key (repeatable; default all)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = AsyncIOMotorClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))["SyntraAI"]
+
+    async def run():
+        jobs = JobTracker()
+        job = Archiver(db, jobs, days=args.days).run_now(args.restaurant)
+        await job.task
+        print(job.to_dict())
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,231 @@
+# benchmarks/ask_harness.py
+"""
+End-to-end /ask benchmark with local stand-ins for MongoDB and OpenAI.
+
+Starts benchmarks/fake_openai.py and app.py (through benchmarks/bench_app.py,
+which counts Mongo ops and seeds data/), then replays scripted multi-turn
+chat and order sessions across every restaurant in data/ at the given
+concurrency. Prints one JSON document: latency p50/p95/p99, requests/sec,
+Mongo ops per turn, prompt tokens per LLM call and per turn, and where
+answers came from.
+
+    python benchmarks/ask_harness.py --sessions 120 --concurrency 16 --latency-ms 300 --tokens-per-sec 80
+    python benchmarks/ask_harness.py --mongo mongod --out bench.json   # MONGO_URI, a scratch mongod
+
+Needs fastapi, uvicorn, httpx, motor and (for --mongo memory) mongomock-motor.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from menu_normalize import normalize_menu, unwrap_restaurant  # noqa: E402
+
+
+# -------------------- Scripts --------------------
+def chat_script(names: list, rng) -> list:
+    a, b = rng.sample(names, 2)
+    return ["hi! what's good here?", f"how much is the {a}?", "do you have any deals today?",
+            f"what comes on the {b}?", "what are your hours?", "thanks, that's all!"]
+
+
+def order_script(names: list, rng) -> list:
+    a, b = rng.sample(names, 2)
+    return [f"I'd like to order a {a}", f"can you add 2 {b} too", "that's for pickup",
+            "my name is Sam", f"place the order: 1 x {a}; 2 x {b}"]
+
+
+def load_menus() -> dict:
+    """restaurant_key -> priced item names (unique, and free of the separators the scripts use)."""
+    menus = {}
+    data_dir = os.path.join(ROOT, "data")
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(data_dir, filename), encoding="utf-8") as f:
+            table = normalize_menu(unwrap_restaurant(json.load(f)))
+        counts = Counter(table.name)
+        names = sorted(n for n, p in zip(table.name, table.price)
+                       if p is not None and counts[n] == 1 and not set(n) & set(";,:"))
+        key = filename[:-len(".json")]
+        if len(names) >= 2:
+            menus[key] = names
+    return menus
+
+
+# -------------------- Processes --------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(http, url, proc, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {proc.returncode}")
+        try:
+            await http.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def start_servers(args, llm_port, app_port):
+    fake = subprocess.Popen([sys.executable, os.path.join(ROOT, "benchmarks", "fake_openai.py"),
+                             "--port", str(llm_port), "--latency-ms", str(args.latency_ms),
+                             "--tokens-per-sec", str(args.tokens_per_sec), "--reply-tokens", str(args.reply_tokens)],
+                            cwd=ROOT)
+    env = dict(os.environ, BENCH_MONGO=args.mongo, OPENAI_API_KEY="bench",
+               OPENAI_BASE_URL=f"http://127.0.0.1:{llm_port}/v1")
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "benchmarks.bench_app:app", "--host", "127.0.0.1",
+                               "--port", str(app_port), "--workers", "1", "--log-level", "warning"],
+                              cwd=ROOT, env=env)
+    return fake, server
+
+
+# -------------------- Replay --------------------
+async def run_session(http, url, key, kind, turns, results):
+    session_id = f"bench_{uuid.uuid4().hex}"
+    for msg in turns:
+        payload = {"message": msg, "restaurant_key": key, "mode": "chat", "session_id": session_id, "debug": True}
+        started = time.perf_counter()
+        try:
+            resp = await http.post(f"{url}/ask", json=payload)
+            resp.raise_for_status()
+            body = resp.json()
+        except Exception as e:
+            results["errors"].append(f"{key}/{kind}: {e!r}")
+            continue
+        results["latencies"].append(time.perf_counter() - started)
+        results["sources"][body.get("source", "unknown")] += 1
+        if kind == "order" and msg.startswith("place the order"):
+            results["orders_placed"] += 1
+            results["orders_accepted"] += "order" in body
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+async def settle(http, url, timeout=30.0):
+    """Wait for background summaries to drain so their writes and prompts are counted."""
+    deadline = time.monotonic() + timeout
+    while True:
+        stats = (await http.get(f"{url}/__bench/stats")).json()
+        summaries = stats["caches"]["summaries"]
+        if not summaries or not summaries["queued"] or time.monotonic() > deadline:
+            return stats
+        await asyncio.sleep(0.25)
+
+
+async def bench(args):
+    rng = random.Random(args.seed)
+    menus = load_menus()
+    keys = sorted(menus)
+    sessions = []
+    for i in range(args.sessions):
+        key = keys[i % len(keys)]
+        kind = "order" if rng.random() < args.order_ratio else "chat"
+        sessions.append((key, kind, (order_script if kind == "order" else chat_script)(menus[key], rng)))
+
+    llm_port, app_port = free_port(), free_port()
+    llm_url, url = f"http://127.0.0.1:{llm_port}", f"http://127.0.0.1:{app_port}"
+    fake, server = start_servers(args, llm_port, app_port)
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout) as http:
+            await wait_ready(http, f"{llm_url}/stats", fake)
+            await wait_ready(http, f"{url}/restaurants", server)
+            await http.post(f"{url}/__bench/reset")
+            await http.post(f"{llm_url}/stats/reset")
+
+            results = {"latencies": [], "errors": [], "sources": Counter(), "orders_placed": 0, "orders_accepted": 0}
+            sem = asyncio.Semaphore(args.concurrency)
+
+            async def bounded(session):
+                async with sem:
+                    await run_session(http, url, *session, results)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(bounded(s) for s in sessions))
+            elapsed = time.perf_counter() - started
+
+            app_stats = await settle(http, url)
+            llm_stats = (await http.get(f"{llm_url}/stats")).json()
+    finally:
+        for proc in (server, fake):
+            proc.terminate()
+        for proc in (server, fake):
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    latencies = sorted(results["latencies"])
+    turns = len(latencies)
+    per_turn = (lambda n: round(n / turns, 2)) if turns else (lambda n: 0.0)
+    return {
+        "config": {"sessions": args.sessions, "concurrency": args.concurrency, "order_ratio": args.order_ratio,
+                   "mongo": args.mongo, "llm_latency_ms": args.latency_ms, "llm_tokens_per_sec": args.tokens_per_sec,
+                   "reply_tokens": args.reply_tokens, "restaurants": keys, "seed": args.seed},
+        "turns": turns,
+        "errors": len(results["errors"]),
+        "error_samples": results["errors"][:5],
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(turns / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "mongo_ops_per_turn": per_turn(app_stats["mongo_ops"]),
+        "mongo_ops": app_stats["by_op"],
+        "llm_calls_per_turn": per_turn(llm_stats["calls"]),
+        "prompt_tokens_per_turn": per_turn(llm_stats["prompt_tokens"]),
+        "prompt_tokens_per_llm_call": round(llm_stats["prompt_tokens"] / llm_stats["calls"], 1) if llm_stats["calls"] else 0.0,
+        "summary_prompt_tokens_per_turn": per_turn(llm_stats["summary_prompt_tokens"]),
+        "sources": dict(results["sources"]),
+        "orders": {"placed": results["orders_placed"], "accepted": results["orders_accepted"]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--order-ratio", type=float, default=0.4, help="fraction of sessions that place an order")
+    parser.add_argument("--mongo", choices=("memory", "mongod"), default="memory")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fake LLM time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(bench(args)), indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/bench_app.py
+"""
+app.py wired for benchmarking: Mongo calls are counted, data/ is seeded on
+startup, and GET /__bench/stats reports the op counts. Started by
+benchmarks/ask_harness.py; to run it by hand:
+
+    BENCH_MONGO=memory OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn benchmarks.bench_app:app
+
+BENCH_MONGO=memory uses mongomock_motor (no server needed); BENCH_MONGO=mongod
+uses MONGO_URI (default mongodb://localhost:27017). Seeding replaces the
+restaurants and menus of every data/ key in the SyntraAI database, so point
+it at a scratch mongod.
+"""
+import os
+import sys
+from collections import Counter
+from contextlib import asynccontextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_MONGO = os.getenv("BENCH_MONGO", "memory")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+if BENCH_MONGO == "memory":
+    os.environ.setdefault("CATALOG_CHANGE_STREAMS", "0")  # mongomock has no change streams
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import app as syntra  # noqa: E402
+from helper import load_all_restaurant_data  # noqa: E402
+from menu_normalize import unwrap_restaurant  # noqa: E402
+from seed_db import build_item_doc, build_restaurant_doc, prepare_menu_items  # noqa: E402
+
+# Collection methods that cost a round trip (cursor methods ride on find/aggregate)
+MONGO_OPS = {"find", "find_one", "aggregate", "count_documents", "insert_one", "insert_many", "update_one",
+             "update_many", "replace_one", "delete_one", "delete_many", "bulk_write", "find_one_and_update"}
+ops = Counter()
+
+
+# -------------------- Counting Proxies --------------------
+class CountingCollection:
+    def __init__(self, coll):
+        self._coll = coll
+
+    def __getattr__(self, name):
+        attr = getattr(self._coll, name)
+        if name not in MONGO_OPS:
+            return attr
+
+        def counted(*args, **kwargs):
+            ops[f"{self._coll.name}.{name}"] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, name):
+        return CountingCollection(self._db[name])
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        return CountingCollection(attr) if hasattr(attr, "insert_many") else attr
+
+
+class CountingClient:
+    def __init__(self, client):
+        self._client = client
+
+    def __getitem__(self, name):
+        return CountingDatabase(self._client[name])
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+syntra_motor_client = syntra.AsyncIOMotorClient
+
+
+def mongo_client_factory(uri):
+    if BENCH_MONGO == "memory":
+        from mongomock_motor import AsyncMongoMockClient
+        return CountingClient(AsyncMongoMockClient())
+    return CountingClient(syntra_motor_client(uri))
+
+
+syntra.AsyncIOMotorClient = mongo_client_factory
+
+
+# -------------------- Seeding --------------------
+async def seed(db) -> dict:
+    """Unversioned restaurant + menu docs for every data/ file, replacing what was there."""
+    counts = {}
+    for key, raw in load_all_restaurant_data().items():
+        data = unwrap_restaurant(raw)
+        items = [build_item_doc(key, it, idx) for idx, it in enumerate(prepare_menu_items(key, data))]
+        await db.restaurants.delete_many({"key": key})
+        await db.menus.delete_many({"restaurant_key": key})
+        await db.restaurants.insert_one(build_restaurant_doc(key, data))
+        if items:
+            await db.menus.insert_many(items, ordered=False)
+        counts[key] = len(items)
+    return counts
+
+
+app = syntra.app
+app_lifespan = app.router.lifespan_context
+seeded = {}
+
+
+@asynccontextmanager
+async def bench_lifespan(a):
+    async with app_lifespan(a) as state:
+        seeded.update(await seed(syntra.db))
+        ops.clear()
+        yield state
+
+
+app.router.lifespan_context = bench_lifespan
+
+
+@app.get("/__bench/stats")
+async def bench_stats(flush: bool = True):
+    """Mongo op counts since the last reset; flushes the write-behind queue first so writes are included."""
+    if flush:
+        await syntra.session_store.writer.flush()
+    return JSONResponse({
+        "mongo": BENCH_MONGO,
+        "seeded_items": seeded,
+        "mongo_ops": sum(ops.values()),
+        "by_op": dict(ops.most_common()),
+        "fast_path": syntra.fast_path.stats(),
+        "caches": {"responses": syntra.response_cache.stats(), "sessions": syntra.session_store.stats(),
+                   "summaries": syntra.summarizer.stats() if syntra.summarizer else None},
+    })
+
+
+@app.post("/__bench/reset")
+async def bench_reset():
+    await syntra.session_store.writer.flush()
+    ops.clear()
+    return JSONResponse({"ok": True})
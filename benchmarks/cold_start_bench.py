@@ -0,0 +1,68 @@
+# benchmarks/cold_start_bench.py
+"""
+Startup cost of listing restaurants: the old eager load_all_restaurant_data()
+vs the registry (first scan, warm scan from the on-disk index), plus reading
+every payload one at a time through registry.get() as seed_db does, at 1,
+100 and 1000 data files.
+
+    python benchmarks/cold_start_bench.py --counts 1 100 1000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import helper  # noqa: E402
+from registry import RestaurantRegistry  # noqa: E402
+
+
+def make_data_dir(base, count):
+    with open(os.path.join(ROOT, "data", "dominos_pizza.json"), encoding="utf-8") as f:
+        template = json.load(f)
+    data_dir = os.path.join(base, "data")
+    os.makedirs(data_dir)
+    for i in range(count):
+        payload = dict(template["Dominos"], name=f"Tenant {i}")
+        with open(os.path.join(data_dir, f"tenant_{i:04d}.json"), "w", encoding="utf-8") as f:
+            json.dump({"Dominos": payload} if i % 2 else payload, f)
+    return data_dir
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    print(f"{'files':>6} {'eager load':>12} {'first scan':>12} {'warm scan':>12} {'get() each':>12}")
+    for count in args.counts:
+        base = tempfile.mkdtemp()
+        try:
+            data_dir = make_data_dir(base, count)
+            index_path = os.path.join(base, "index.json")
+            os.chdir(base)  # load_all_restaurant_data reads ./data
+            eager = timed(helper.load_all_restaurant_data)
+            first = timed(lambda: RestaurantRegistry(data_dir, index_path).scan())
+            warm = timed(lambda: RestaurantRegistry(data_dir, index_path).scan())
+            registry = RestaurantRegistry(data_dir, index_path).scan()
+            each = timed(lambda: [registry.get(key) for key in registry.keys()])
+            print(f"{count:>6} {eager:>10.1f}ms {first:>10.1f}ms {warm:>10.1f}ms {each:>10.1f}ms")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(base)
+
+
+if __name__ == "__main__":
+    main()
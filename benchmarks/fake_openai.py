@@ -0,0 +1,138 @@
+# benchmarks/fake_openai.py
+"""
+OpenAI-compatible stand-in for benchmarking: POST /v1/chat/completions with
+configurable time-to-first-token and token rate, streaming or not, plus
+GET /stats with call and prompt-token counts.
+
+Replies are canned filler. The filler is neutral, except on order turns
+(the user's message mentions ordering, adding, pickup/delivery or a name),
+where it reads like a real mid-order reply, so the bot_mid_order rule and
+the fast path see what they would in production. A user message containing
+"place the order: 1 x Name; 2 x Other" is answered with a matching
+ORDER_JSON block (so the order path is exercised end to end), and
+json_object requests (the summarizer) get a small valid memory object.
+
+    python benchmarks/fake_openai.py --port 9100 --latency-ms 300 --tokens-per-sec 80 --reply-tokens 60
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1.
+"""
+import argparse
+import asyncio
+import json
+import re
+import os
+import sys
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orders import ORDER_END, ORDER_START  # noqa: E402
+from prompts import count_tokens  # noqa: E402
+
+WORDS = ("sure thing! our pizzas come hand tossed, thin or pan, and the deluxe is a crowd favorite. "
+         "let me know if there's something else i can help with. ").split()
+ORDER_WORDS = ("got it, that's in your cart. would this be for pickup or delivery, "
+               "and is there anything else you'd like to add? ").split()
+ORDER_TURN = re.compile(r"\b(order|add|pickup|delivery|my name is)\b", re.IGNORECASE)
+
+config = {"latency_ms": 300.0, "tokens_per_sec": 80.0, "reply_tokens": 60}
+ORDER_LINE = re.compile(r"(\d+)\s*x\s*([^;,]+)")
+stats = {"calls": 0, "stream_calls": 0, "summary_calls": 0, "prompt_tokens": 0, "summary_prompt_tokens": 0,
+         "completion_tokens": 0}
+app = FastAPI()
+
+
+def reply_text(n: int, messages: list) -> list:
+    last = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    words = ORDER_WORDS if ORDER_TURN.search(last) else WORDS
+    pieces = [words[i % len(words)] + " " for i in range(n)]
+    if "place the order:" in last:
+        items = [{"name": name.strip(), "qty": int(qty)} for qty, name in ORDER_LINE.findall(last.split(":", 1)[1])]
+        order = {"order": {"items": items, "total": 0, "pickup_or_delivery": "pickup",
+                           "customer_name": "Sam", "address": "", "notes": ""}}
+        block = f"\n{ORDER_START}\n{json.dumps(order)}\n{ORDER_END}\n"
+        pieces += [block[i:i + 8] for i in range(0, len(block), 8)]  # split like real deltas
+    return pieces
+
+
+def memory_reply() -> str:
+    """The summarizer asks for JSON; echo a small, valid memory object."""
+    return json.dumps({"summary": "Customer is ordering; details confirmed so far are in the order.",
+                       "order": {"items": [], "pickup_or_delivery": "", "customer_name": "", "address": ""}})
+
+
+@app.post("/v1/chat/completions")
+async def completions(request: Request):
+    body = await request.json()
+    prompt_tokens = sum(count_tokens(m.get("content") or "") + 4 for m in body.get("messages", []))
+    wants_json = (body.get("response_format") or {}).get("type") == "json_object"
+    pieces = [memory_reply()] if wants_json else reply_text(config["reply_tokens"], body.get("messages", []))
+    completion_tokens = count_tokens("".join(pieces))
+    if wants_json:
+        stats["summary_calls"] += 1
+        stats["summary_prompt_tokens"] += prompt_tokens
+    else:
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+             "total_tokens": prompt_tokens + completion_tokens}
+    cid, created, model = f"chatcmpl-{uuid.uuid4().hex}", int(time.time()), body.get("model", "fake")
+    per_token = 1.0 / config["tokens_per_sec"] if config["tokens_per_sec"] > 0 else 0.0
+
+    await asyncio.sleep(config["latency_ms"] / 1000)
+    if not body.get("stream"):
+        await asyncio.sleep(per_token * len(pieces))
+        return JSONResponse({
+            "id": cid, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "".join(pieces).strip()}}],
+            "usage": usage,
+        })
+
+    stats["stream_calls"] += 1
+
+    async def events():
+        for piece in pieces:
+            chunk = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(per_token)
+        final = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return JSONResponse(stats)
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return JSONResponse(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=config["latency_ms"], help="time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=config["tokens_per_sec"])
+    parser.add_argument("--reply-tokens", type=int, default=config["reply_tokens"])
+    args = parser.parse_args()
+    config.update(latency_ms=args.latency_ms, tokens_per_sec=args.tokens_per_sec, reply_tokens=args.reply_tokens)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/fast_path_bench.py
+"""
+Answer latency and coverage of the LLM-free fast path on the data/ restaurants.
+
+    python benchmarks/fast_path_bench.py
+"""
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog import Catalog  # noqa: E402
+from fast_path import FastPath  # noqa: E402
+from menu_normalize import normalize_menu, unwrap_restaurant  # noqa: E402
+
+QUESTIONS = [
+    "how much is the deluxe pizza?",
+    "how much is the chiken burrito",
+    "what sides do you have?",
+    "what desserts do you have",
+    "do you deliver?",
+    "any deals?",
+    "where are you located?",
+    "are you open?",
+    "hey how's your day going?",
+    "what do you recommend?",
+    "can I get a large pepperoni pizza",
+    "how much is a pizza?",
+]
+
+
+def load_catalog(path):
+    with open(path, encoding="utf-8") as f:
+        raw = unwrap_restaurant(json.load(f))
+    key = os.path.basename(path)[:-len(".json")]
+    restaurant = {"raw": raw, "display_name": raw.get("name"), "locations": raw.get("locations", [])}
+    return Catalog(key, restaurant, normalize_menu(raw))
+
+
+def main():
+    data_dir = os.path.join(ROOT, "data")
+    n = 2000
+    answered = total = 0
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith(".json"):
+            continue
+        engine = FastPath(load_catalog(os.path.join(data_dir, filename)))
+        hits = [q for q in QUESTIONS if engine.answer(q)]
+        answered += len(hits)
+        total += len(QUESTIONS)
+        per_q = timeit.timeit(lambda: [engine.answer(q) for q in QUESTIONS], number=n) / (n * len(QUESTIONS))
+        print(f"{filename:<26} {len(hits):2d}/{len(QUESTIONS)} answered  {per_q * 1e6:7.1f} us/question")
+        for q in hits:
+            print(f"    {q!r:<40} -> {engine.answer(q)[1][:70]!r}")
+    print(f"served without the LLM: {answered}/{total} ({answered / total:.0%})")
+
+
+if __name__ == "__main__":
+    main()
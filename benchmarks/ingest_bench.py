@@ -0,0 +1,87 @@
+# benchmarks/ingest_bench.py
+"""
+Items/sec of the incremental menu ingester against a real MongoDB.
+
+Runs a synthetic chain through three ingests (initial load, unchanged
+re-ingest, a small edit) in a scratch database, and optionally the old
+one-insert_one-per-item path for comparison.
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/ingest_bench.py --items 100000 --legacy
+    python benchmarks/ingest_bench.py --mongo memory --items 100000 --legacy
+
+--mongo memory runs against mongomock (no server needed). That measures the
+ingester's own Python cost and the number of operations, but not network
+round trips, so it understates what batching saves against a real mongod.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_db import build_item_doc, ensure_menu_indexes, ingest_restaurant, mongo_client  # noqa: E402
+
+CATEGORIES = ["Pizzas", "Pastas", "Chicken", "Sandwiches", "Salads", "Breads & Sides", "Desserts", "Drinks"]
+
+
+def synthetic_items(n, rng):
+    return [{
+        "item_id": f"itm_{i}",
+        "name": f"Item {i}",
+        "category": rng.choice(CATEGORIES),
+        "price": round(rng.uniform(2, 30), 2),
+        "description": f"synthetic item {i}",
+    } for i in range(n)]
+
+
+def timed(label, n, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.2f}s  {n / elapsed:10.0f} items/s  {result or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--change", type=float, default=0.01, help="fraction of items edited in the last run")
+    parser.add_argument("--legacy", action="store_true", help="also time one insert_one per item")
+    parser.add_argument("--mongo", choices=("mongod", "memory"), default="mongod")
+    args = parser.parse_args()
+
+    client = mongo_client
+    if args.mongo == "memory":
+        import mongomock
+        # mongomock 4.x predates UpdateOne(sort=...) in pymongo 4.11; ingest never sorts
+        builder = mongomock.collection.BulkOperationBuilder
+        add_update = builder.add_update
+        builder.add_update = lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs)
+        client = mongomock.MongoClient()
+
+    rng = random.Random(7)
+    db = client["SyntraAI_bench"]
+    db.restaurants.drop()
+    db.menus.drop()
+    ensure_menu_indexes(db)
+
+    items = synthetic_items(args.items, rng)
+    data = {"name": "Bench Chain"}
+    timed("initial ingest", args.items, lambda: ingest_restaurant(db, "bench", data, items))
+    timed("unchanged re-ingest", args.items, lambda: ingest_restaurant(db, "bench", data, items))
+    for it in rng.sample(items, int(args.items * args.change)):
+        it["price"] = round(it["price"] + 0.5, 2)
+    timed(f"{args.change:.0%} changed re-ingest", args.items, lambda: ingest_restaurant(db, "bench", data, items))
+
+    if args.legacy:
+        legacy = db.legacy_menus
+        legacy.drop()
+        timed("legacy insert_one loop", args.items,
+              lambda: [legacy.insert_one(build_item_doc("bench", it, i)) for i, it in enumerate(items)] and None)
+
+    client.drop_database("SyntraAI_bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/intent_bench.py
+"""
+Microbenchmark: compiled intent matcher vs the old per-list `any(...)` scans.
+
+    python benchmarks/intent_bench.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent import IntentMatcher, build_rules, classify  # noqa: E402
+
+MESSAGES = [
+    "hey! how's your day going?",
+    "can I get a large pepperoni pizza and some wings",
+    "no that's all",
+    "what are your hours on sunday",
+    "i'll take two 14 inch pizzas for delivery please",
+    "do you have anything vegetarian? my friend doesn't eat meat",
+]
+LAST_BOT = "Nice! Want to add some drinks or sides to that? 🍕"
+
+
+def legacy_classify(phrases, msg, mode, last_bot_msg):
+    msg_lower = msg.lower()
+    if last_bot_msg and any(w in last_bot_msg.lower() for w in phrases["bot_order_context"]):
+        mode = "order" if msg_lower in phrases["context_confirmation"] else "chat"
+    if any(k in msg_lower for k in phrases["order_phrase"]):
+        mode = "order"
+    if any(w == msg_lower for w in phrases["confirmation_reply"]):
+        mode = "order"
+    if any(w in msg_lower for w in phrases["menu_item"]):
+        mode = "order"
+    if msg_lower in phrases["size"] or any(w in msg_lower for w in phrases["size"]):
+        mode = "order"
+    return mode
+
+
+def main():
+    categories = ["Pizzas", "Pastas", "Chicken", "Sandwiches", "Salads", "Desserts", "Drinks"]
+    n = 5000
+    # Per-restaurant tables grow with the menu; show how each approach scales
+    for extra in (0, 50, 200, 1000):
+        overrides = {"menu_item": [f"special item {i}" for i in range(extra)]}
+        rules = build_rules(categories, overrides)
+        phrases = {name: phrases for name, (_, phrases) in rules.items()}
+        matcher = IntentMatcher(rules)
+        print(f"rule tables: {sum(map(len, phrases.values()))} phrases")
+        for label, fn in (
+            ("legacy any() scans", lambda m: legacy_classify(phrases, m, "chat", LAST_BOT)),
+            ("compiled matcher", lambda m: classify(matcher, m, "chat", LAST_BOT)),
+        ):
+            total = timeit.timeit(lambda: [fn(m) for m in MESSAGES], number=n)
+            print(f"    {label:<20} {total / (n * len(MESSAGES)) * 1e6:7.2f} us/message")
+
+    matcher = IntentMatcher(build_rules(categories))
+
+    for m in MESSAGES:
+        print(f"  {m!r:<70} -> {classify(matcher, m, 'chat', LAST_BOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/menu_index_bench.py
+"""
+Build and query latency of the menu retrieval index on synthetic menus.
+
+"query" is one message; "turn" is what /ask runs per turn: the message plus
+the last four history messages at weights 0.5 (user) and 0.25 (bot).
+
+    python benchmarks/menu_index_bench.py --items 1000 5000 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from menu_index import MenuIndex  # noqa: E402
+
+CATEGORIES = ["Pizzas", "Pastas", "Chicken", "Sandwiches", "Salads", "Breads & Sides", "Desserts", "Drinks"]
+WORDS = [
+    "pepperoni", "sausage", "buffalo", "bbq", "garlic", "parmesan", "spinach", "feta", "bacon",
+    "ranch", "honey", "chicken", "veggie", "hawaiian", "philly", "steak", "alfredo", "marinara",
+    "chocolate", "cinnamon", "caesar", "greek", "classic", "ultimate", "deluxe", "supreme", "spicy",
+]
+SIZES = ["Small (10”)", "Medium (12”)", "Large (14”)", "Extra Large (16”)", "(8 pc)", "(20 oz)", ""]
+QUERIES = [
+    "can I get a large pepperoni pizza",
+    "what wings do you have",
+    "xl bbq chicken",
+    "any desserts with chocolate?",
+    "hey how's it going",
+    "14 inch veggie with feta",
+]
+
+
+def synthetic_menu(n, rng):
+    items = []
+    for i in range(n):
+        cat = rng.choice(CATEGORIES)
+        name = " ".join(rng.sample(WORDS, 2)).title() + " " + cat.rstrip("s") + " " + rng.choice(SIZES)
+        items.append({
+            "item_id": f"itm_{i}",
+            "name": name.strip(),
+            "category": cat,
+            "price": round(rng.uniform(2, 25), 2),
+            "description": " ".join(rng.sample(WORDS, 5)),
+        })
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for n in args.items:
+        items = synthetic_menu(n, rng)
+        start = time.perf_counter()
+        index = MenuIndex(items)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            index.top_items([(QUERIES[i % len(QUERIES)], 1.0)], k=args.k)
+        query_us = (time.perf_counter() - start) / args.repeat * 1e6
+
+        turns = [[(QUERIES[i % len(QUERIES)], 1.0)] +
+                 [(QUERIES[(i + j) % len(QUERIES)], 0.5 if j % 2 else 0.25) for j in range(1, 5)]
+                 for i in range(len(QUERIES))]
+        start = time.perf_counter()
+        for i in range(args.repeat):
+            index.top_items(turns[i % len(turns)], k=args.k)
+        turn_us = (time.perf_counter() - start) / args.repeat * 1e6
+        print(f"items={n:>6}  build={build_ms:8.1f} ms  top{args.k} query={query_us:8.1f} us  turn={turn_us:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
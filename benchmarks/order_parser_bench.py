@@ -0,0 +1,103 @@
+# benchmarks/order_parser_bench.py
+"""
+Throughput of the streaming ORDER_JSON extractor and the order validator on
+large synthetic transcripts, fed in model-sized chunks. The naive approach
+(re-join and re-search the whole reply on every chunk) is timed alongside
+to show the streaming scan stays linear.
+
+    python benchmarks/order_parser_bench.py --kb 64 256 1024
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog import Catalog  # noqa: E402
+from menu_normalize import normalize_menu, unwrap_restaurant  # noqa: E402
+from orders import ORDER_END, ORDER_START, OrderExtractor, validate_order  # noqa: E402
+
+CHATTER = ("Sure thing -- one more sec! The --- crust options are hand tossed, thin, or pan --- ", "Got it! ",
+           "Would this be for pickup or delivery? ", "Anything else you'd like? -- ")
+
+
+def load_catalog():
+    with open(os.path.join(ROOT, "data", "dominos_pizza.json"), encoding="utf-8") as f:
+        raw = unwrap_restaurant(json.load(f))
+    return Catalog("dominos_pizza", {"raw": raw}, normalize_menu(raw))
+
+
+def transcript(kb, catalog, rng, lines=20):
+    items = [{"item_id": i, "name": n, "qty": rng.randint(1, 3), "price": 0}
+             for i, n in rng.sample(list(zip(catalog.table.item_id, catalog.table.name)), lines)]
+    order = {"order": {"items": items, "total": 0, "pickup_or_delivery": "delivery",
+                       "customer_name": "Sam", "address": "1 Main St", "notes": ""}}
+    chatter, size = [], 0
+    while size < kb * 1024:
+        piece = rng.choice(CHATTER)
+        chatter.append(piece)
+        size += len(piece)
+    return "".join(chatter) + f"\n{ORDER_START}\n{json.dumps(order, indent=2)}\n{ORDER_END}\nThanks!"
+
+
+def chunks(text, rng):
+    i, out = 0, []
+    while i < len(text):
+        n = rng.randint(2, 12)  # roughly what a token delta carries
+        out.append(text[i:i + n])
+        i += n
+    return out
+
+
+def naive(deltas):
+    text = ""
+    for d in deltas:
+        text += d
+        start = text.find(ORDER_START)
+        end = text.find(ORDER_END)
+        if start >= 0 and end > start:
+            return json.loads(text[start + len(ORDER_START):end])
+
+
+def streaming(deltas):
+    ex = OrderExtractor()
+    for d in deltas:
+        if ex.feed(d) is not None:
+            return ex.order
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kb", type=int, nargs="+", default=[64, 256, 1024])
+    args = parser.parse_args()
+    rng = random.Random(3)
+    catalog = load_catalog()
+
+    print(f"{'reply':>8} {'chunks':>8} {'streaming':>14} {'naive re-scan':>16}")
+    for kb in args.kb:
+        text = transcript(kb, catalog, rng)
+        deltas = chunks(text, rng)
+        row = []
+        for fn in (streaming, naive):
+            started = time.perf_counter()
+            order = fn(deltas)
+            elapsed = time.perf_counter() - started
+            assert order and len(order["order"]["items"]) == 20
+            row.append(f"{len(text) / elapsed / 1e6:9.2f} MB/s")
+        print(f"{kb:>6}KB {len(deltas):>8} {row[0]:>14} {row[1]:>16}")
+
+    payload = json.loads(transcript(1, catalog, rng, lines=30).split(ORDER_START)[1].split(ORDER_END)[0])
+    n = 5000
+    started = time.perf_counter()
+    for _ in range(n):
+        clean, errors = validate_order(payload, catalog)
+    elapsed = time.perf_counter() - started
+    print(f"validate_order (30 lines): {elapsed / n * 1e6:.1f} us/order, total ${clean['total']}, errors={errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# benchmarks/reservation_stress.py
+"""
+Concurrent booking stress test for reservations.CapacityIndex and ids.new_id.
+
+Several processes, each running a thread pool with its own CapacityIndex,
+hammer a few slots of one restaurant with random party sizes, far more
+seats than exist. Each booking saves a reservation doc the way
+ai_service.insert_reservation does. Afterwards the script checks that:
+
+- no slot holds more guests than its capacity;
+- every slot doc's remaining count equals capacity minus the guests saved;
+- every reservation_id is unique and the IDs sort in creation order within
+  each thread.
+
+It prints booking latency and the cost of an in-memory availability check,
+and exits non-zero if any check fails.
+
+    python benchmarks/reservation_stress.py --processes 4 --threads 16 --bookings 4000 --slots 4 --capacity 24
+
+Needs pymongo and a scratch mongod at MONGO_URI. The --db database is dropped
+before and after the run.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ids import new_id  # noqa: E402
+from reservations import CapacityIndex, SlotFull, slot_collection  # noqa: E402
+
+RESTAURANT = "stress"
+DATE = "2025-11-02"
+
+
+def slot_times(n: int) -> list:
+    return [f"{18 + i // 2:02d}:{30 * (i % 2):02d}" for i in range(n)]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def worker(job):
+    uri, db_name, seed, bookings, threads, times, max_party = job
+    db = MongoClient(uri, maxPoolSize=threads)[db_name]
+    capacity = CapacityIndex(db)
+    docs = db[f"{RESTAURANT}_reservation_docs"]
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        latencies, ids, booked, rejected = [], [], 0, 0
+        for _ in range(bookings // threads):
+            time_, guests = rng.choice(times), rng.randint(1, max_party)
+            started = time.perf_counter()
+            try:
+                date, slot = capacity.book(RESTAURANT, DATE, time_, guests)
+            except SlotFull:
+                rejected += 1
+            else:
+                reservation_id = new_id("RES")
+                docs.insert_one({"reservation_id": reservation_id, "restaurant": RESTAURANT, "user_name": "Stress",
+                                 "date": date, "time": slot, "guests": guests, "status": "Confirmed"})
+                ids.append(reservation_id)
+                booked += 1
+            latencies.append(time.perf_counter() - started)
+        return latencies, ids, booked, rejected
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(run, [seed * 1000 + t for t in range(threads)]))
+
+    # Availability checks against the (now warm) in-memory index
+    n = 100_000
+    started = time.perf_counter()
+    for i in range(n):
+        capacity.available(RESTAURANT, DATE, times[i % len(times)], 2)
+    check_ns = (time.perf_counter() - started) * 1e9 / n
+    return results, check_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16, help="threads per process")
+    parser.add_argument("--bookings", type=int, default=4000, help="booking attempts per process")
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--capacity", type=int, default=24, help="seats per slot")
+    parser.add_argument("--max-party", type=int, default=6)
+    parser.add_argument("--db", default="SyntraAI_reservation_stress")
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    client = MongoClient(uri)
+    client.drop_database(args.db)
+    db = client[args.db]
+    db.restaurants.insert_one({"key": RESTAURANT, "reservation_capacity": args.capacity})
+    times = slot_times(args.slots)
+
+    started = time.perf_counter()
+    with Pool(args.processes) as pool:
+        outputs = pool.map(worker, [(uri, args.db, seed, args.bookings, args.threads, times, args.max_party)
+                                    for seed in range(args.processes)])
+    elapsed = time.perf_counter() - started
+
+    latencies, all_ids, booked, rejected, unordered = [], [], 0, 0, 0
+    for results, _ in outputs:
+        for lat, ids, b, r in results:
+            latencies.extend(lat)
+            all_ids.extend(ids)
+            booked += b
+            rejected += r
+            unordered += sum(a >= b for a, b in zip(ids, ids[1:]))
+    latencies.sort()
+
+    guests = defaultdict(int)
+    for doc in db[f"{RESTAURANT}_reservation_docs"].find({}, {"time": 1, "guests": 1}):
+        guests[doc["time"]] += doc["guests"]
+    slots = {d["time"]: d for d in db[slot_collection(RESTAURANT)].find()}
+    per_slot = {t: {"capacity": slots[t]["capacity"] if t in slots else args.capacity, "guests": guests.get(t, 0),
+                    "remaining": slots[t]["remaining"] if t in slots else None} for t in times}
+    overbooked = [t for t, s in per_slot.items() if s["guests"] > s["capacity"]]
+    drift = [t for t, s in per_slot.items() if s["remaining"] is not None and s["remaining"] != s["capacity"] - s["guests"]]
+    duplicates = sum(n - 1 for n in Counter(all_ids).values() if n > 1)
+
+    report = {
+        "config": vars(args),
+        "attempts": len(latencies),
+        "booked": booked,
+        "rejected": rejected,
+        "elapsed_s": round(elapsed, 3),
+        "bookings_per_sec": round(len(latencies) / elapsed, 1),
+        "book_latency_ms": {q: round(percentile(latencies, p) * 1000, 2) for q, p in (("p50", .5), ("p95", .95), ("p99", .99))},
+        "availability_check_ns": round(sum(ns for _, ns in outputs) / len(outputs), 1),
+        "slots": per_slot,
+        "overbooked_slots": overbooked,
+        "remaining_drift_slots": drift,
+        "duplicate_ids": duplicates,
+        "out_of_order_ids": unordered,
+    }
+    print(json.dumps(report, indent=2))
+    client.drop_database(args.db)
+    if overbooked or drift or duplicates or unordered:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
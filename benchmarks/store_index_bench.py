@@ -0,0 +1,82 @@
+# benchmarks/store_index_bench.py
+"""
+Nearest-store lookup: grid index vs the old full geodesic scan.
+
+    python benchmarks/store_index_bench.py --stores 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geopy.distance import geodesic  # noqa: E402
+
+from store_index import StoreIndex  # noqa: E402
+
+# Continental US bounding box
+LAT_RANGE = (25.0, 49.0)
+LON_RANGE = (-124.0, -67.0)
+
+
+def synthetic_locations(n, rng):
+    return [
+        {
+            "name": f"Store {i}",
+            "address": f"{i} Main St",
+            "latitude": rng.uniform(*LAT_RANGE),
+            "longitude": rng.uniform(*LON_RANGE),
+        }
+        for i in range(n)
+    ]
+
+
+def brute_force(lat, lon, locations):
+    return min((geodesic((lat, lon), (l["latitude"], l["longitude"])).miles, l["name"]) for l in locations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--brute-queries", type=int, default=3)
+    parser.add_argument("--radius", type=float, default=25.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for n in args.stores:
+        locations = synthetic_locations(n, rng)
+        points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        index = StoreIndex(locations)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        timings = {}
+        for label, fn in (
+            ("nearest k=1", lambda p: index.nearest(*p, k=1)),
+            ("nearest k=5", lambda p: index.nearest(*p, k=5)),
+            (f"within {args.radius:g}mi", lambda p: index.within(*p, args.radius)),
+        ):
+            start = time.perf_counter()
+            for p in points:
+                fn(p)
+            timings[label] = (time.perf_counter() - start) / len(points) * 1000
+
+        start = time.perf_counter()
+        for p in points[:args.brute_queries]:
+            expected = brute_force(*p, locations)
+            got = index.nearest(*p, k=1)[0]
+            assert abs(expected[0] - got[0]) < 1e-6, (p, expected, got)
+        brute_ms = (time.perf_counter() - start) / args.brute_queries * 1000
+
+        print(f"stores={n:>7}  build={build_ms:8.1f} ms  cell={index.cell_deg:.3f} deg")
+        for label, ms in timings.items():
+            print(f"    {label:<16} {ms:8.3f} ms/query")
+        print(f"    {'full scan':<16} {brute_ms:8.1f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/summary_tokens_bench.py
+"""
+Prompt tokens per turn on a scripted 30-turn order: the old last-8-messages
+history vs the rolling summary (last SUMMARY_WINDOW messages + folded memory).
+
+The summarization call is replaced by a scripted completion that returns a
+summary of the folded user messages (clipped like a real one) and the order
+lines confirmed so far, so the numbers show prompt shape, not model quality.
+
+    python benchmarks/summary_tokens_bench.py
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog import Catalog  # noqa: E402
+from menu_index import get_menu_index  # noqa: E402
+from menu_normalize import normalize_menu, unwrap_restaurant  # noqa: E402
+from prompts import build_system_prompt, count_tokens  # noqa: E402
+from session_store import SessionState  # noqa: E402
+from summarizer import SUMMARY_WINDOW, Summarizer, clip, render_memory  # noqa: E402
+
+ITEMS = ["Deluxe Pizza", "Buffalo Chicken Pizza", "Pacific Veggie Pizza", "Chicken Alfredo Pasta",
+         "Stuffed Cheesy Bread", "Garlic Bread Twists", "Coke (20 oz)", "Marbled Cookie Brownie (9 pc tray)"]
+FILLER = ("Totally, great pick! Just so we're on the same page, here's everything on your order so far "
+          "with sizes and quantities, and a quick reminder of today's deals in case you want to stack them. ") * 4
+
+
+def scripted_turns(n=30):
+    turns = []
+    for i in range(n):
+        item = ITEMS[i % len(ITEMS)]
+        if i % 3 == 0:
+            turns.append((f"can I add a {item}?", f"Added one {item}! {FILLER}Anything else you'd like?", item))
+        elif i % 3 == 1:
+            turns.append((f"actually make that 2 {item}s, large", f"Done, 2 large {item}s. {FILLER}", None))
+        else:
+            turns.append(("what else is good with that?", f"The {item} pairs great with sides. {FILLER}", None))
+    return turns
+
+
+class ScriptedLLM:
+    """Stands in for the gateway's summarization call: concatenates folded user turns, tracks confirmed items."""
+
+    def __init__(self):
+        self.order_items = []
+    async def complete(self, tenant, mode=None, messages=(), **kwargs):
+        memory = messages[1]["content"]
+        prev = json.loads(memory.split("\n", 1)[1].split("\n\nNew messages:")[0])
+        users = [line[len("user: "):] for line in memory.split("New messages:\n", 1)[1].splitlines()
+                 if line.startswith("user: ")]
+        summary = clip("; ".join(filter(None, [prev["summary"]] + users)))
+        order = dict(prev["order"], items=[{"name": n, "qty": 1} for n in self.order_items])
+        content = json.dumps({"summary": summary, "order": order})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class NullCollection:
+    async def update_one(self, *a, **k):
+        return None
+
+
+def history_tokens(system_prompt, extra_system, history, user_text):
+    text = system_prompt + (extra_system or "") + "".join(h["message"] for h in history) + user_text
+    return count_tokens(text) + 4 * (len(history) + 2)
+
+
+async def main():
+    with open(os.path.join(ROOT, "data", "dominos_pizza.json"), encoding="utf-8") as f:
+        raw = unwrap_restaurant(json.load(f))
+    catalog = Catalog("dominos_pizza", {"raw": raw}, normalize_menu(raw))
+    index = get_menu_index(catalog)
+
+    llm = ScriptedLLM()
+    summarizer = Summarizer({"session_summaries": NullCollection()}, llm)
+    old_state = SessionState("dominos_pizza", "old")
+    new_state = SessionState("dominos_pizza", "new")
+    ts = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    print(f"{'turn':>4} {'old (last 8 raw)':>18} {f'new (summary + last {SUMMARY_WINDOW})':>26}")
+    old_total = new_total = 0
+    for i, (user, bot, confirmed) in enumerate(scripted_turns(), 1):
+        system = build_system_prompt(catalog, "order", "now", index.top_items([(user, 1.0)]))
+        old = history_tokens(system, "", list(old_state.history), user)
+        new = history_tokens(system, render_memory(new_state), new_state.prompt_history(SUMMARY_WINDOW), user)
+        old_total += old
+        new_total += new
+        if i in (1, 5, 10, 15, 20, 25, 30):
+            print(f"{i:>4} {old:>18} {new:>26}")
+        for state in (old_state, new_state):
+            state.append("user", user, "order", ts + timedelta(seconds=2 * i))
+            state.append("bot", bot, "order", ts + timedelta(seconds=2 * i + 1))
+        if confirmed:
+            llm.order_items.append(confirmed)
+        await summarizer.fold(new_state)  # the app does this in the background worker
+    print(f"mean tokens/turn: old {old_total / 30:.0f}, new {new_total / 30:.0f}")
+    print(f"order so far after 30 turns: {len(new_state.order['items'])} items "
+          f"(old prompt only sees the last {old_state.history.maxlen} messages)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+# benchmarks/ws_chat_bench.py
+"""
+WebSocket chat vs HTTP /ask: per-turn overhead and idle sessions per worker.
+
+Starts the same stand-ins as ask_harness.py (fake OpenAI + bench_app on an
+in-memory Mongo), then:
+
+1. Runs the same scripted sessions over POST /ask and over /ws/chat. The
+   messages are answered from the catalog fast path, so no LLM time is
+   included. It reports per-turn latency and server CPU per turn, read from
+   /proc for the uvicorn worker.
+2. Opens --connections bound, idle sockets and reports server RSS per
+   connection. It then checks that a turn on a fresh socket is still
+   answered promptly while they are all open.
+
+    python benchmarks/ws_chat_bench.py --sessions 200 --turns 10 --concurrency 32 --connections 2000
+
+Needs websockets and httpx, plus what ask_harness.py needs. Raise ulimit -n
+for large --connections.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ask_harness import free_port, load_menus, percentile, start_servers, wait_ready  # noqa: E402
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def proc_usage(pid: int):
+    """(cpu seconds, rss bytes) of a process, from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    with open(f"/proc/{pid}/statm") as f:
+        rss_pages = int(f.read().split()[1])
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK, rss_pages * PAGE_SIZE
+
+
+def scripts(menus: dict, sessions: int, turns: int) -> list:
+    keys = sorted(menus)
+    out = []
+    for i in range(sessions):
+        key = keys[i % len(keys)]
+        names = menus[key]
+        msgs = [f"how much is the {names[(i + t) % len(names)]}?" for t in range(turns)]  # fast-path prices
+        out.append((key, msgs))
+    return out
+
+
+async def http_session(http, url, key, msgs, latencies):
+    session_id = f"bench_{uuid.uuid4().hex}"
+    for msg in msgs:
+        started = time.perf_counter()
+        resp = await http.post(f"{url}/ask", json={"message": msg, "restaurant_key": key, "session_id": session_id})
+        resp.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def ws_session(ws_url, key, msgs, latencies):
+    async with websockets.connect(ws_url, max_size=None) as sock:
+        await sock.send(json.dumps({"type": "hello", "restaurant_key": key, "session_id": f"bench_{uuid.uuid4().hex}"}))
+        assert json.loads(await sock.recv())["type"] == "ready"
+        for msg in msgs:
+            started = time.perf_counter()
+            await sock.send(json.dumps({"type": "message", "message": msg}))
+            while True:
+                frame = json.loads(await sock.recv())
+                if frame["type"] in ("done", "error", "busy"):
+                    break
+            latencies.append(time.perf_counter() - started)
+
+
+async def timed(pid, concurrency, jobs):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def bounded(job):
+        async with sem:
+            await job(latencies)
+
+    cpu0, _ = proc_usage(pid)
+    started = time.perf_counter()
+    await asyncio.gather(*(bounded(job) for job in jobs))
+    elapsed = time.perf_counter() - started
+    cpu1, _ = proc_usage(pid)
+    latencies.sort()
+    return {
+        "turns": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {q: round(percentile(latencies, p) * 1000, 2) for q, p in (("p50", .5), ("p95", .95), ("p99", .99))},
+        "server_cpu_ms_per_turn": round((cpu1 - cpu0) * 1000 / len(latencies), 3),
+    }
+
+
+async def idle_sockets(pid, ws_url, key, name, n):
+    _, rss0 = proc_usage(pid)
+    socks = []
+    try:
+        for i in range(n):
+            sock = await websockets.connect(ws_url, max_size=None)
+            await sock.send(json.dumps({"type": "hello", "restaurant_key": key, "session_id": f"idle_{i}_{uuid.uuid4().hex}"}))
+            await sock.recv()
+            socks.append(sock)
+        await asyncio.sleep(1.0)
+        _, rss1 = proc_usage(pid)
+        probe = []
+        await ws_session(ws_url, key, [f"how much is the {name}?"], probe)
+        return {"connections": len(socks), "rss_mb": round(rss1 / 2 ** 20, 1),
+                "rss_kb_per_connection": round((rss1 - rss0) / 1024 / max(1, len(socks)), 1),
+                "probe_turn_ms": round(probe[0] * 1000, 2)}
+    finally:
+        await asyncio.gather(*(s.close() for s in socks), return_exceptions=True)
+
+
+async def bench(args):
+    menus = load_menus()
+    jobs = scripts(menus, args.sessions, args.turns)
+    llm_port, app_port = free_port(), free_port()
+    url, ws_url = f"http://127.0.0.1:{app_port}", f"ws://127.0.0.1:{app_port}/ws/chat"
+    opts = SimpleNamespace(mongo="memory", latency_ms=args.latency_ms, tokens_per_sec=80.0, reply_tokens=60)
+    fake, server = start_servers(opts, llm_port, app_port)
+    try:
+        async with httpx.AsyncClient(timeout=60.0, limits=httpx.Limits(max_connections=args.concurrency)) as http:
+            await wait_ready(http, f"http://127.0.0.1:{llm_port}/stats", fake)
+            await wait_ready(http, f"{url}/restaurants", server)
+            pid = server.pid  # uvicorn --workers 1 serves from the process itself
+            # Warm catalogs and indexes so neither side pays first-load costs
+            await timed(pid, args.concurrency, [lambda lat, k=k, m=m: http_session(http, url, k, m[:2], lat)
+                                                for k, m in jobs[:len(menus)]])
+            report = {
+                "config": {"sessions": args.sessions, "turns": args.turns, "concurrency": args.concurrency},
+                "http_ask": await timed(pid, args.concurrency,
+                                        [lambda lat, k=k, m=m: http_session(http, url, k, m, lat) for k, m in jobs]),
+                "websocket": await timed(pid, args.concurrency,
+                                         [lambda lat, k=k, m=m: ws_session(ws_url, k, m, lat) for k, m in jobs]),
+            }
+            if args.connections:
+                key = sorted(menus)[0]
+                report["idle_sockets"] = await idle_sockets(pid, ws_url, key, menus[key][0], args.connections)
+    finally:
+        for proc in (server, fake):
+            proc.terminate()
+            proc.wait(timeout=10)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--connections", type=int, default=2000, help="idle bound sockets to hold open (0 to skip)")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(bench(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
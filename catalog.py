@@ -0,0 +1,169 @@
+# catalog.py
+"""
+In-process cache of restaurant documents and their parsed menus.
+
+Each entry is keyed by restaurant_key and holds the restaurant doc plus the
+available menu items, so steady-state chat turns make no catalog queries.
+Entries expire after a TTL, the cache is LRU-bounded, and entries are dropped
+when a Mongo change stream reports a write to `restaurants` or `menus`
+(or when /reload is called on deployments without change streams).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from menu_index import MenuIndex
+from menu_normalize import MenuTable
+from store_index import StoreIndex
+
+log = logging.getLogger("syntra.catalog")
+
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", "900"))
+CATALOG_MAX_ENTRIES = int(os.getenv("CATALOG_MAX_ENTRIES", "256"))
+CATALOG_CHANGE_STREAMS = os.getenv("CATALOG_CHANGE_STREAMS", "1") not in ("0", "false", "False", "")
+
+
+def live_menu_filter(restaurant_key: str, menu_version: int = None) -> dict:
+    """
+    db.menus filter for a restaurant's current menu. Versioned menus (see
+    seed_db.ingest_restaurant) keep each item doc live for the range of menu
+    versions [v_from, v_to), so the restaurant's menu_version picks one
+    consistent snapshot; unversioned menus are read as-is.
+    """
+    flt = {"restaurant_key": restaurant_key, "availability": True}
+    if menu_version is None:
+        flt["v_from"] = {"$exists": False}
+    else:
+        flt["v_from"] = {"$lte": menu_version}
+        flt["$or"] = [{"v_to": None}, {"v_to": {"$gt": menu_version}}]
+    return flt
+
+
+def compute_version(restaurant_doc: dict, menu: list) -> str:
+    """Content hash of the restaurant doc and menu; changes whenever either does."""
+    payload = json.dumps(
+        {"raw": restaurant_doc.get("raw", {}), "display_name": restaurant_doc.get("display_name"), "menu": menu},
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Catalog:
+    """A loaded restaurant: its doc, available menu items and a content version."""
+
+    def __init__(self, key: str, restaurant: dict, menu):
+        self.key = key
+        self.restaurant = restaurant
+        # Columnar menu; self.menu holds its row dicts, shared by every consumer
+        self.table = menu if isinstance(menu, MenuTable) else MenuTable.from_docs(menu)
+        self.menu = self.table.records
+        self.version = compute_version(restaurant, self.menu)
+        self.loaded_at = time.monotonic()
+        # Artefacts built from this version (compiled prompts, indexes, ...);
+        # they are dropped together with the entry on invalidation.
+        self.derived = {"menu_index": MenuIndex(self.menu),
+                        "store_index": StoreIndex(self.raw.get("locations", []))}
+
+    @property
+    def display_name(self) -> str:
+        return self.restaurant.get("display_name", self.key.replace("_", " ").title())
+
+    @property
+    def raw(self) -> dict:
+        return self.restaurant.get("raw", {})
+
+
+class CatalogCache:
+    def __init__(self, db, ttl: float = CATALOG_TTL_SECONDS, max_entries: int = CATALOG_MAX_ENTRIES):
+        self.db = db
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._watch_task = None
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, restaurant_key: str):
+        """Return the Catalog for restaurant_key, or None if it does not exist."""
+        entry = self._entries.get(restaurant_key)
+        if entry is not None and time.monotonic() - entry.loaded_at < self.ttl:
+            self._entries.move_to_end(restaurant_key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        # Single-flight: concurrent misses for the same key share one load
+        pending = self._loading.get(restaurant_key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(restaurant_key))
+            self._loading[restaurant_key] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(restaurant_key, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, restaurant_key: str):
+        restaurant_doc = await self.db.restaurants.find_one({"key": restaurant_key})
+        if not restaurant_doc:
+            self._entries.pop(restaurant_key, None)
+            return None
+
+        menu_cursor = self.db.menus.find(live_menu_filter(restaurant_key, restaurant_doc.get("menu_version")))
+        table = MenuTable.from_docs([m async for m in menu_cursor])
+
+        # Building the menu and store indexes is CPU work; keep it off the event loop
+        entry = await asyncio.to_thread(Catalog, restaurant_key, restaurant_doc, table)
+        self._entries[restaurant_key] = entry
+        self._entries.move_to_end(restaurant_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, restaurant_key: str = None):
+        """Drop one restaurant, or everything when no key is given."""
+        if restaurant_key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(restaurant_key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "watching": self._watch_task is not None and not self._watch_task.done(),
+        }
+
+    # -------------------- Change Stream Invalidation --------------------
+    def start_watching(self):
+        if CATALOG_CHANGE_STREAMS and self._watch_task is None:
+            self._watch_task = asyncio.ensure_future(self._watch())
+
+    async def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": ["restaurants", "menus"]}}}]
+        try:
+            async with self.db.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get("fullDocument") or {}
+                    if "v_from" in doc:
+                        continue  # versioned menu writes go live with the restaurants switch
+                    key = doc.get("key") if change["ns"]["coll"] == "restaurants" else doc.get("restaurant_key")
+                    # Deletes carry no document; we can't tell which restaurant they hit
+                    self.invalidate(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Standalone mongod has no change streams; fall back to TTL + /reload
+            log.warning("Catalog change stream unavailable, relying on TTL and /reload: %s", e)
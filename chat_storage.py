@@ -0,0 +1,221 @@
+# chat_storage.py
+"""
+Chat storage layout, index bootstrap and migration.
+
+Chat messages live either in one collection per restaurant
+(`{restaurant_key}_chat`, the original layout) or, with
+CHAT_STORAGE_MODE=consolidated, in a single `chats` collection keyed by
+(restaurant_key, session_id, timestamp). On startup the compound indexes the
+hot queries need are created and verified, along with an optional TTL
+retention index (CHAT_TTL_DAYS).
+
+CLI (uses MONGO_URI like the app):
+    python chat_storage.py ensure     # create + verify indexes
+    python chat_storage.py explain    # check hot-query plans use an index
+    python chat_storage.py migrate [--drop-source]   # {key}_chat -> chats
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from history import EXPORT_BATCH_SIZE, HISTORY_PAGE_SIZE, SORT, encode_cursor, history_filter
+
+log = logging.getLogger("syntra.storage")
+
+CHAT_STORAGE_MODE = os.getenv("CHAT_STORAGE_MODE", "per_restaurant")  # or "consolidated"
+CHAT_TTL_DAYS = float(os.getenv("CHAT_TTL_DAYS", "0"))  # 0 keeps chats forever
+CONSOLIDATED_COLLECTION = "chats"
+MIGRATE_BATCH = 1000
+
+SESSION_INDEX = "session_ts"
+CONSOLIDATED_INDEX = "restaurant_session_ts"
+HISTORY_INDEX = "ts_id"
+TTL_INDEX = "ttl_timestamp"
+
+
+def consolidated() -> bool:
+    return CHAT_STORAGE_MODE == "consolidated"
+
+
+def chat_target(restaurant_key: str):
+    """(collection name, scope fields) for a restaurant's chat messages."""
+    if consolidated():
+        return CONSOLIDATED_COLLECTION, {"restaurant_key": restaurant_key}
+    return f"{restaurant_key}_chat", {}
+
+
+def chat_index_spec() -> dict:
+    """{index name: keys} for the session window and the (timestamp, _id) history pages."""
+    if consolidated():
+        return {
+            CONSOLIDATED_INDEX: [("restaurant_key", 1), ("session_id", 1), ("timestamp", 1)],
+            HISTORY_INDEX: [("restaurant_key", 1), ("timestamp", 1), ("_id", 1)],
+        }
+    return {
+        SESSION_INDEX: [("session_id", 1), ("timestamp", 1)],
+        HISTORY_INDEX: [("timestamp", 1), ("_id", 1)],
+    }
+
+
+def ttl_seconds():
+    return int(CHAT_TTL_DAYS * 86400) if CHAT_TTL_DAYS > 0 else 0
+
+
+async def ensure_ttl(coll, seconds: int):
+    """Create, retune (collMod) or drop the TTL index to match the retention policy."""
+    info = await coll.index_information()
+    existing = info.get(TTL_INDEX)
+    if not seconds:
+        if existing:
+            await coll.drop_index(TTL_INDEX)
+        return
+    if existing is None:
+        await coll.create_index([("timestamp", 1)], name=TTL_INDEX, expireAfterSeconds=seconds)
+    elif existing.get("expireAfterSeconds") != seconds:
+        await coll.database.command("collMod", coll.name, index={"name": TTL_INDEX, "expireAfterSeconds": seconds})
+
+
+async def ensure_chat_indexes(db, restaurant_key: str = None):
+    """Compound (+ TTL) indexes on one restaurant's chat collection, or on `chats`."""
+    name, _ = chat_target(restaurant_key or "")
+    coll = db[name]
+    for index_name, keys in chat_index_spec().items():
+        await coll.create_index(keys, name=index_name)
+    await ensure_ttl(coll, ttl_seconds())
+    return coll
+
+
+async def verify_indexes(coll, expected: dict):
+    """Raise RuntimeError unless every {name: key list} in expected exists on coll."""
+    info = await coll.index_information()
+    missing = [name for name, keys in expected.items()
+               if name not in info or [tuple(k) for k in info[name]["key"]] != list(keys)]
+    if missing:
+        raise RuntimeError(f"{coll.name}: missing indexes {missing}")
+
+
+async def bootstrap(db, restaurant_keys: list = None):
+    """Create and verify the indexes the app's hot queries rely on."""
+    await db.restaurants.create_index("key", unique=True)
+    await db.menus.create_index([("restaurant_key", 1), ("availability", 1)])
+    if restaurant_keys is None:
+        restaurant_keys = await db.restaurants.distinct("key")
+
+    targets = [None] if consolidated() else restaurant_keys
+    for key in targets:
+        coll = await ensure_chat_indexes(db, key)
+        await verify_indexes(coll, chat_index_spec())
+    for key in restaurant_keys:
+        await db[f"{key}_orders"].create_index([("timestamp", 1), ("_id", 1)], name=HISTORY_INDEX)
+    log.info("Chat storage ready: mode=%s ttl_days=%s collections=%d", CHAT_STORAGE_MODE, CHAT_TTL_DAYS, len(targets))
+
+
+# -------------------- Query Plans --------------------
+def plan_stages(plan: dict) -> list:
+    """Every stage name in an explain() winning plan, outermost first."""
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        if "inputStages" in plan:
+            for sub in plan["inputStages"]:
+                stages.extend(plan_stages(sub))
+            break
+        plan = plan.get("inputStage")
+    return stages
+
+
+async def hot_query_stages(db, restaurant_key: str) -> dict:
+    """Winning-plan stages for the session window (/ask) and the history page, keyset and export reads."""
+    name, scope = chat_target(restaurant_key)
+    coll = db[name]
+    session_filter = dict(scope, session_id="__explain__")
+    until = datetime.now(timezone.utc)
+    after = encode_cursor({"timestamp": until - timedelta(days=1), "_id": ObjectId()})
+    queries = {
+        "session_window": coll.find(session_filter).sort("timestamp", -1).limit(8),
+        "history_page": coll.find(history_filter(scope)).sort(SORT).limit(HISTORY_PAGE_SIZE + 1),
+        "history_keyset": coll.find(history_filter(scope, cursor=after)).sort(SORT).limit(HISTORY_PAGE_SIZE + 1),
+        "export": coll.find(history_filter(scope, since=until - timedelta(days=7), until=until), {"_id": 0})
+                      .sort(SORT).batch_size(EXPORT_BATCH_SIZE),
+    }
+    out = {}
+    for label, cursor in queries.items():
+        explain = await cursor.explain()
+        out[label] = plan_stages(explain["queryPlanner"]["winningPlan"])
+    return out
+
+
+async def assert_indexed_plans(db, restaurant_key: str):
+    for label, stages in (await hot_query_stages(db, restaurant_key)).items():
+        if "COLLSCAN" in stages or "IXSCAN" not in stages:
+            raise AssertionError(f"{label} on {restaurant_key} is not index-backed: {stages}")
+
+
+# -------------------- Migration --------------------
+async def migrate_to_consolidated(db, drop_source: bool = False):
+    """
+    Copy every `{key}_chat` collection into `chats`, tagging restaurant_key.
+    Upserts by _id, so it is safe to re-run after an interruption.
+    """
+    from pymongo import ReplaceOne
+
+    target = db[CONSOLIDATED_COLLECTION]
+    total = 0
+    for name in await db.list_collection_names():
+        if not name.endswith("_chat") or name == CONSOLIDATED_COLLECTION:
+            continue
+        restaurant_key = name[:-len("_chat")]
+        batch, moved = [], 0
+        async for doc in db[name].find({}):
+            doc["restaurant_key"] = restaurant_key
+            batch.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+            if len(batch) >= MIGRATE_BATCH:
+                await target.bulk_write(batch, ordered=False)
+                moved += len(batch)
+                batch = []
+        if batch:
+            await target.bulk_write(batch, ordered=False)
+            moved += len(batch)
+        total += moved
+        print(f"{name}: {moved} messages -> {CONSOLIDATED_COLLECTION}")
+        if drop_source:
+            await db[name].drop()
+    await target.create_index([("restaurant_key", 1), ("session_id", 1), ("timestamp", 1)], name=CONSOLIDATED_INDEX)
+    await target.create_index([("restaurant_key", 1), ("timestamp", 1), ("_id", 1)], name=HISTORY_INDEX)
+    print(f"Migrated {total} messages. Set CHAT_STORAGE_MODE=consolidated to switch the app over.")
+
+
+def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Chat storage bootstrap and migration")
+    parser.add_argument("command", choices=["ensure", "explain", "migrate"])
+    parser.add_argument("--drop-source", action="store_true", help="drop {key}_chat collections after migrating")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = AsyncIOMotorClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))["SyntraAI"]
+
+    async def run():
+        if args.command == "ensure":
+            await bootstrap(db)
+            print("Indexes verified.")
+        elif args.command == "explain":
+            for key in await db.restaurants.distinct("key"):
+                print(key, await hot_query_stages(db, key))
+                await assert_indexed_plans(db, key)
+            print("All hot queries are index-backed.")
+        else:
+            await migrate_to_consolidated(db, drop_source=args.drop_source)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,230 @@
+# fast_path.py
+"""
+LLM-free answers for deterministic chat questions.
+
+"How much is the Deluxe Pizza", "what sides do you have", "do you deliver",
+"any deals" and "where are you located" can be answered exactly from the
+catalog: the menu items and the restaurant's raw policies, deals, hours and
+locations. A question is answered here only when it is clearly a question,
+exactly one question type applies, and the entity resolves unambiguously
+against the menu name index (typos are corrected with difflib). Anything
+else falls through to the LLM. The engine is built once per catalog
+version and cached on the Catalog.
+"""
+import difflib
+import re
+import time
+
+from menu_index import tokenize
+
+LISTING_LIMIT = 12
+FUZZY_CUTOFF = 0.8
+
+QUESTION_STARTS = {
+    "what", "whats", "what's", "which", "how", "where", "when", "do", "does", "are", "is", "can",
+    "could", "got", "any", "list", "show", "tell",
+}
+PRICE_RE = re.compile(r"\b(how much|prices?|costs?|how expensive)\b")
+LISTING_RE = re.compile(r"\b(have|got|options|sell|serve|kinds?|types?|list|show)\b")
+DEALS_RE = re.compile(r"\b(deals?|specials?|coupons?|promos?|promotions?|discounts?)\b")
+HOURS_RE = re.compile(r"\b(open|opens|close|closes|closing|hours)\b")
+LOCATION_RE = re.compile(r"\b(where are you|where is|located|locations?|address|phone)\b")
+# Tokens that only say "this is a price / listing question"
+QUESTION_TOKENS = {"much", "price", "cost", "expensive", "one", "got", "sell", "serve", "option", "kind", "type",
+                   "list", "show", "menu", "food", "item"}
+POLICY_TRIGGERS = {
+    "delivery": re.compile(r"\b(deliver|delivers|delivery|delivery fee|minimum order)\b"),
+    "pickup": re.compile(r"\b(pickup|pick up|carryout|carry out|takeout)\b"),
+    "refund": re.compile(r"\b(refunds?|return|replacements?|missing|wrong order)\b"),
+}
+
+
+def _norm(text: str) -> str:
+    return (text or "").lower().replace("’", "'").strip()
+
+
+def is_question(norm: str) -> bool:
+    first = norm.split(" ", 1)[0] if norm else ""
+    return norm.endswith("?") or first.strip(",.!") in QUESTION_STARTS
+
+
+def _money(price) -> str:
+    return f"${float(price):.2f}"
+
+
+class FastPath:
+    """Question-type detection, fuzzy menu entity resolution and answer templates for one catalog."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        raw = catalog.raw
+        self.policies = raw.get("policies") or {}
+        self.deals = raw.get("deals")
+        self.hours = raw.get("hours")
+        self.locations = catalog.restaurant.get("locations") or raw.get("locations") or []
+
+        self.items = []  # (item, name tokens, category tokens)
+        self.by_token = {}
+        self.categories = {}
+        for item in catalog.menu:
+            name_toks = set(tokenize(item.get("name")))
+            cat_toks = set(tokenize(item.get("category")))
+            if not name_toks:
+                continue
+            idx = len(self.items)
+            self.items.append((item, name_toks, cat_toks))
+            for tok in name_toks:
+                self.by_token.setdefault(tok, []).append(idx)
+            self.categories.setdefault(item.get("category") or "Uncategorized", []).append(item)
+        self.category_tokens = {cat: set(tokenize(cat)) for cat in self.categories}
+        self.vocab = sorted(set(self.by_token).union(*self.category_tokens.values()))
+
+    # -------------------- Entity Resolution --------------------
+    def query_tokens(self, norm: str) -> set:
+        """Content words of the question, with typos snapped to the menu vocabulary."""
+        out = set()
+        for tok in tokenize(norm):
+            if tok in QUESTION_TOKENS:
+                continue
+            if tok not in self.by_token and len(tok) >= 4:
+                close = difflib.get_close_matches(tok, self.vocab, n=1, cutoff=FUZZY_CUTOFF)
+                tok = close[0] if close else tok
+            out.add(tok)
+        return out
+
+    def resolve_item(self, toks: set):
+        """The one menu item the tokens name in full (extra words allowed only from its category)."""
+        candidates = {idx for tok in toks for idx in self.by_token.get(tok, ())}
+        scored = []
+        for idx in candidates:
+            item, name_toks, cat_toks = self.items[idx]
+            if not name_toks <= toks or toks - name_toks - cat_toks:
+                continue
+            scored.append((len(name_toks), len(toks & cat_toks), idx))
+        if not scored:
+            return None
+        scored.sort(reverse=True)
+        if len(scored) > 1 and scored[0][:2] == scored[1][:2]:
+            return None  # e.g. "Cheese" in two categories and no category word to pick one
+        return self.items[scored[0][2]][0]
+
+    def resolve_category(self, toks: set):
+        """The one category the tokens point at ("sides" -> "Breads & Sides")."""
+        scored = []
+        for cat, cat_toks in self.category_tokens.items():
+            hit = toks & cat_toks
+            if hit and not toks - cat_toks:
+                scored.append((len(hit) / len(cat_toks), cat))
+        if not scored:
+            return None
+        scored.sort(reverse=True)
+        if len(scored) > 1 and scored[0][0] == scored[1][0]:
+            return None
+        return scored[0][1]
+
+    # -------------------- Answers --------------------
+    def price_answer(self, norm: str):
+        if not PRICE_RE.search(norm):
+            return None
+        item = self.resolve_item(self.query_tokens(norm))
+        if item is None or not item.get("price"):
+            return None
+        return f"The {item['name']} is {_money(item['price'])}. Want me to add one?"
+
+    def listing_answer(self, norm: str):
+        if not LISTING_RE.search(norm) or PRICE_RE.search(norm):
+            return None
+        cat = self.resolve_category(self.query_tokens(norm))
+        if cat is None:
+            return None
+        items = self.categories[cat]
+        shown = ", ".join(f"{it['name']} ({_money(it['price'])})" if it.get("price") else it["name"]
+                          for it in items[:LISTING_LIMIT])
+        more = f", and {len(items) - LISTING_LIMIT} more" if len(items) > LISTING_LIMIT else ""
+        return f"Here's what we've got for {cat}: {shown}{more}."
+
+    def deals_answer(self, norm: str):
+        if self.deals is None or not DEALS_RE.search(norm):
+            return None
+        if not self.deals:
+            return "No deals running right now, sorry!"
+        deals = self.deals if isinstance(self.deals, list) else [self.deals]
+        return "Here are our current deals:\n" + "\n".join(f"- {d}" for d in deals)
+
+    def policy_answer(self, norm: str):
+        found = [self.policies[key] for key, trigger in POLICY_TRIGGERS.items()
+                 if key in self.policies and trigger.search(norm)]
+        return " ".join(found) if found else None
+
+    def hours_answer(self, norm: str):
+        if not self.hours or not HOURS_RE.search(norm):
+            return None
+        if isinstance(self.hours, dict):
+            return "Our hours: " + "; ".join(f"{day}: {span}" for day, span in self.hours.items()) + "."
+        return f"Our hours: {self.hours}."
+
+    def location_answer(self, norm: str):
+        if not self.locations or not LOCATION_RE.search(norm) or "order" in norm:
+            return None
+        if len(self.locations) == 1:
+            loc = self.locations[0]
+            phone = f" ({loc['phone']})" if loc.get("phone") else ""
+            return f"We're at {loc.get('address') or loc.get('name')}{phone}."
+        names = ", ".join(loc.get("name") or loc.get("address", "") for loc in self.locations[:3])
+        return (f"We have {len(self.locations)} locations, including {names}. "
+                "Share your location and say \"nearest\" and I'll find the closest one.")
+
+    def answer(self, message: str):
+        """(kind, text) when exactly one question type answers confidently, else None."""
+        norm = _norm(message)
+        if not is_question(norm):
+            return None
+        answers = []
+        for kind, fn in (("price", self.price_answer), ("listing", self.listing_answer),
+                         ("deals", self.deals_answer), ("policy", self.policy_answer),
+                         ("hours", self.hours_answer), ("location", self.location_answer)):
+            text = fn(norm)
+            if text:
+                answers.append((kind, text))
+        return answers[0] if len(answers) == 1 else None
+
+
+def get_fast_path(catalog) -> FastPath:
+    engine = catalog.derived.get("fast_path")
+    if engine is None:
+        engine = catalog.derived["fast_path"] = FastPath(catalog)
+    return engine
+
+
+class FastPathStats:
+    """How many turns skipped the LLM, and by which route."""
+
+    def __init__(self):
+        self.turns = 0
+        self.sources = {}
+        self.kinds = {}
+        self.answer_seconds = 0.0
+        self.answered = 0
+
+    def answer(self, catalog, message: str):
+        started = time.perf_counter()
+        hit = get_fast_path(catalog).answer(message)
+        if hit:
+            self.answered += 1
+            self.answer_seconds += time.perf_counter() - started
+            self.kinds[hit[0]] = self.kinds.get(hit[0], 0) + 1
+        return hit
+
+    def count_turn(self, source: str):
+        self.turns += 1
+        self.sources[source] = self.sources.get(source, 0) + 1
+
+    def stats(self) -> dict:
+        llm = self.sources.get("llm", 0)
+        return {
+            "turns": self.turns,
+            "sources": dict(self.sources),
+            "fast_path_kinds": dict(self.kinds),
+            "llm_free_fraction": round((self.turns - llm) / self.turns, 4) if self.turns else 0.0,
+            "fast_path_avg_ms": round(self.answer_seconds / self.answered * 1000, 3) if self.answered else 0.0,
+        }
@@ -0,0 +1,91 @@
+# history.py
+"""
+Keyset-paginated and streamed reads of chat/order history.
+
+Pages are ordered by (timestamp, _id) and continue from an opaque cursor, so
+each page is one index range scan no matter how deep the client has paged.
+The NDJSON export yields documents straight off the Mongo cursor, keeping
+memory flat for collections of any size.
+"""
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return str(value)
+
+
+def to_json(doc: dict) -> str:
+    return json.dumps(doc, default=_json_default, ensure_ascii=False)
+
+
+def encode_cursor(doc: dict) -> str:
+    ts = doc.get("timestamp")
+    payload = {"ts": ts.isoformat() if isinstance(ts, datetime) else ts, "id": str(doc["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(token: str):
+    """(timestamp, ObjectId) from encode_cursor; raises ValueError on a bad token."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        ts = payload["ts"]
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts)
+        return ts, ObjectId(payload["id"])
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {e}")
+
+
+def history_filter(scope: dict = None, session_id: str = None, since: datetime = None,
+                   until: datetime = None, cursor: str = None) -> dict:
+    clauses = [dict(scope or {})]
+    if session_id:
+        clauses.append({"session_id": session_id})
+    if since or until:
+        ts_range = {}
+        if since:
+            ts_range["$gte"] = since
+        if until:
+            ts_range["$lt"] = until
+        clauses.append({"timestamp": ts_range})
+    if cursor:
+        ts, oid = decode_cursor(cursor)
+        clauses.append({"$or": [{"timestamp": {"$gt": ts}}, {"timestamp": ts, "_id": {"$gt": oid}}]})
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+SORT = [("timestamp", 1), ("_id", 1)]
+
+
+async def fetch_page(coll, flt: dict, limit: int = HISTORY_PAGE_SIZE):
+    """One page of documents (without _id) and the cursor for the next, or None."""
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    docs = await coll.find(flt).sort(SORT).limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    page = []
+    for doc in docs[:limit]:
+        doc.pop("_id", None)
+        page.append(doc)
+    return page, next_cursor
+
+
+async def export_ndjson(coll, flt: dict):
+    """Yield one JSON line per document, streaming from the cursor."""
+    cursor = coll.find(flt, {"_id": 0}).sort(SORT).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        yield to_json(doc) + "\n"
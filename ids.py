@@ -0,0 +1,61 @@
+# ids.py
+"""
+Sortable, collision-free IDs for orders and reservations (ULID layout).
+
+An ID is a 48-bit millisecond timestamp followed by 80 random bits, written
+as 26 Crockford base32 characters after the prefix (e.g. ORD01JA8X...).
+IDs sort by creation time as plain strings. Two processes minting in the
+same millisecond collide only if 80 random bits match. Within a process, IDs
+are strictly increasing: a second ID in the same millisecond (or after the
+clock steps back) reuses the last timestamp and adds one to the random part.
+"""
+import os
+import threading
+import time
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_rand = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def new_id(prefix: str = "") -> str:
+    global _last_ms, _last_rand
+    with _lock:
+        now = time.time_ns() // 1_000_000
+        if now > _last_ms:
+            _last_ms, _last_rand = now, int.from_bytes(os.urandom(RANDOM_BITS // 8), "big")
+        else:
+            _last_rand += 1
+            if _last_rand >> RANDOM_BITS:  # random part exhausted this millisecond: borrow the next one
+                _last_ms, _last_rand = _last_ms + 1, int.from_bytes(os.urandom(RANDOM_BITS // 8), "big")
+        value = (_last_ms << RANDOM_BITS) | _last_rand
+    return prefix + _encode(value, 26)
+
+
+def _reseed_after_fork():
+    # A forked worker must not continue the parent's sequence within the same millisecond
+    global _last_ms, _last_rand
+    _last_ms, _last_rand = 0, 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
+
+
+def id_time(id_: str, prefix: str = "") -> float:
+    """Creation time (unix seconds) encoded in an ID from new_id()."""
+    value = 0
+    for ch in id_[len(prefix):]:
+        value = value * 32 + ALPHABET.index(ch)
+    return (value >> RANDOM_BITS) / 1000
@@ -0,0 +1,188 @@
+# intent.py
+"""
+Single-pass intent matcher for /ask mode routing.
+
+All "contains" phrases from every rule table are compiled into one
+word-level trie, and "exact" rules become a dict lookup, so a message is
+classified with one pass over its words instead of one `any(...)` substring
+loop per keyword list. Matching is on whole words ("add" no longer fires on
+"address"). Tables default to the lists below, gain terms from
+the restaurant's menu categories, and can be extended per restaurant via
+`intent_rules` in its data file. Matchers are cached on the Catalog.
+"""
+import re
+
+# rule name -> (match type, phrases)
+#   contains: phrase appears in the message as whole words (plural "s" allowed)
+#   exact:    the whole message is the phrase
+DEFAULT_RULES = {
+    # user message rules that switch to order mode
+    "order_phrase": ("contains", [
+        "i want", "i'll take", "i will take", "get me", "give me",
+        "order", "buy", "add", "take", "i want to order",
+        "i want a", "i want the", "i want pizza", "i want wings",
+    ]),
+    "confirmation_reply": ("exact", [
+        "no", "nope", "that's it", "thats it", "no that's all", "no thats all", "ok", "okay",
+    ]),
+    "menu_item": ("contains", ["pizza", "wings", "pasta", "salad", "sandwich", "drinks", "sides"]),
+    "size": ("contains", [
+        "small", "medium", "large", "xl", "extra large", "extra-large",
+        "10", "12", "14", "16", "10 inch", "12 inch", "14 inch", "16 inch",
+    ]),
+    # reply to a bot message that suggested an item or adding something
+    "context_confirmation": ("exact", ["yes", "yeah", "ok", "sure", "no", "not that", "that's all"]),
+    # bot message rules
+    "bot_order_context": ("contains", ["wings", "pizza", "pasta", "sides", "drinks", "add"]),
+    "bot_mid_order": ("contains", [
+        "how many", "quantity", "pickup", "delivery",
+        "would this be", "name for the order",
+        "anything else you want", "anything else you'd like",
+        "you wanna add", "you want to add", "add anything",
+    ]),
+}
+
+PLURAL_MIN_LEN = 3  # shorter words ("i", "a", "me", "xl") get no plural forms
+
+ORDER_RULES = ("order_phrase", "confirmation_reply", "menu_item", "size")
+
+# Category words too generic to signal an order on their own
+GENERIC_CATEGORY_WORDS = {
+    "food", "foods", "other", "others", "extra", "extras", "special", "specials", "build",
+    "your", "own", "menu", "item", "items", "and", "the", "with", "hand", "tossed",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9']*")
+_RULES = "\0"  # trie node key holding the rules that end at that node
+
+
+def normalize(text: str) -> str:
+    return (text or "").lower().replace("’", "'").strip()
+
+
+def _exact_key(text: str) -> str:
+    return normalize(text).rstrip(".!?, ")
+
+
+def _stem(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "'s")):
+        return word[:-1]
+    return word
+
+
+def words(text: str) -> list:
+    """Normalized, lightly singularized words ("Extra-Large pizzas" -> extra, large, pizza)."""
+    return [_stem(w) for w in _WORD_RE.findall(normalize(text))]
+
+
+class IntentMatcher:
+    """
+    Word-level trie over every "contains" phrase: one walk over the message
+    finds all (overlapping) phrase hits; "exact" rules are a single dict lookup.
+    Plural forms of words of PLURAL_MIN_LEN+ letters are baked into the trie so
+    messages need no stemming ("i" must not also match "is").
+    """
+
+    def __init__(self, rules: dict):
+        self.rules = rules
+        self.trie = {}
+        self.exact = {}
+        for name, (kind, phrases) in rules.items():
+            for phrase in phrases:
+                if kind == "exact":
+                    self.exact.setdefault(_exact_key(phrase), set()).add(name)
+                    continue
+                node = self.trie
+                for w in words(phrase):
+                    child = node.get(w)
+                    if child is None:
+                        child = {}
+                        forms = (w, w + "s", w + "es") if len(w) >= PLURAL_MIN_LEN else (w,)
+                        for form in forms:
+                            node.setdefault(form, child)
+                    node = child
+                node.setdefault(_RULES, {})[name] = phrase
+
+    def match(self, text: str) -> dict:
+        """{rule: [matched phrases]} for every rule the text triggers."""
+        hits = {}
+        norm = normalize(text)
+        toks = _WORD_RE.findall(norm)
+        trie = self.trie
+        n = len(toks)
+        for i in range(n):
+            node = trie.get(toks[i])
+            j = i + 1
+            while node is not None:
+                found = node.get(_RULES)
+                if found:
+                    for rule, phrase in found.items():
+                        hits.setdefault(rule, []).append(phrase)
+                if j == n:
+                    break
+                node = node.get(toks[j])
+                j += 1
+        key = norm.rstrip(".!?, ")
+        for rule in self.exact.get(key, ()):
+            hits.setdefault(rule, []).append(key)
+        return hits
+
+
+def category_terms(categories: list) -> list:
+    """Words from menu category names ("Breads & Sides" -> bread, side)."""
+    terms = []
+    for cat in categories:
+        for word in words(cat):
+            if len(word) >= 4 and word not in GENERIC_CATEGORY_WORDS and word not in terms:
+                terms.append(word)
+    return terms
+
+
+def build_rules(categories: list = (), overrides: dict = None) -> dict:
+    """Default tables + menu category terms + per-restaurant `intent_rules` extras."""
+    rules = {name: (kind, list(phrases)) for name, (kind, phrases) in DEFAULT_RULES.items()}
+    terms = category_terms(categories)
+    rules["menu_item"][1].extend(terms)
+    rules["bot_order_context"][1].extend(terms)
+    for name, phrases in (overrides or {}).items():
+        if name in rules:
+            rules[name][1].extend(phrases)
+        else:
+            rules[name] = ("contains", list(phrases))
+    return rules
+
+
+def get_intent_matcher(catalog) -> IntentMatcher:
+    matcher = catalog.derived.get("intent")
+    if matcher is None:
+        rules = build_rules(catalog.table.categories, catalog.raw.get("intent_rules"))
+        matcher = catalog.derived["intent"] = IntentMatcher(rules)
+    return matcher
+
+
+def classify(matcher: IntentMatcher, msg: str, mode: str, last_bot_msg: str = None):
+    """
+    Route one user message to "chat" or "order".
+    Returns (mode, fired) where fired maps each rule that applied to its phrases.
+    """
+    hits = matcher.match(msg)
+    fired = {}
+
+    # If the last bot message mentioned an item or suggested adding one,
+    # a bare "yes"/"no" continues the order; anything else drops back to chat
+    if last_bot_msg:
+        bot_hits = matcher.match(last_bot_msg)
+        if "bot_order_context" in bot_hits:
+            fired["bot_order_context"] = bot_hits["bot_order_context"]
+            if "context_confirmation" in hits:
+                fired["context_confirmation"] = hits["context_confirmation"]
+                mode = "order"
+            else:
+                mode = "chat"
+
+    for rule in ORDER_RULES:
+        if rule in hits:
+            fired[rule] = hits[rule]
+            mode = "order"
+    return mode, fired
+
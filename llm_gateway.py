@@ -0,0 +1,336 @@
+# llm_gateway.py
+"""
+Admission control in front of the chat completion API.
+
+Every LLM call takes a slot on its restaurant's lane and on the global lane.
+Each lane has a concurrency limit and a bounded wait queue. A call that
+can't get a slot before LLM_QUEUE_WAIT_SECONDS, or that finds the queue
+full, is shed with Overloaded, which /ask turns into a 429 with Retry-After.
+Token-rate limits (tokens per minute, per restaurant and global) are token
+buckets charged with an estimate up front and squared with resp.usage
+afterwards. Identical in-flight non-streaming requests share one upstream
+call. Each call has an overall deadline; 429s, 5xx, timeouts and connection
+errors are retried with full-jitter exponential backoff (honouring
+Retry-After) while the deadline allows. A busy restaurant therefore queues
+behind its own lane instead of eating every tenant's rate limit.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+from metrics import record_error, record_usage
+from prompts import count_tokens
+
+log = logging.getLogger("syntra.llm")
+
+LLM_GLOBAL_CONCURRENCY = int(os.getenv("LLM_GLOBAL_CONCURRENCY", "64"))
+LLM_TENANT_CONCURRENCY = int(os.getenv("LLM_TENANT_CONCURRENCY", "16"))
+LLM_GLOBAL_QUEUE = int(os.getenv("LLM_GLOBAL_QUEUE", "256"))
+LLM_TENANT_QUEUE = int(os.getenv("LLM_TENANT_QUEUE", "64"))
+LLM_QUEUE_WAIT_SECONDS = float(os.getenv("LLM_QUEUE_WAIT_SECONDS", "5"))
+LLM_GLOBAL_TPM = float(os.getenv("LLM_GLOBAL_TPM", "0"))  # tokens/minute, 0 = unlimited
+LLM_TENANT_TPM = float(os.getenv("LLM_TENANT_TPM", "0"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# Stream admission happens before the prompt is built, so it's charged this plus max_tokens
+LLM_EST_PROMPT_TOKENS = int(os.getenv("LLM_EST_PROMPT_TOKENS", "1500"))
+
+GLOBAL = "*"
+
+
+class Overloaded(Exception):
+    """Shed before reaching the API; retry_after is a hint in seconds."""
+
+    def __init__(self, scope: str, reason: str, retry_after: float):
+        super().__init__(f"LLM {reason} for {scope}, retry in {retry_after:.0f}s")
+        self.scope = scope
+        self.reason = reason
+        self.retry_after = max(1.0, retry_after)
+
+
+# -------------------- Limits --------------------
+class Lane:
+    """Concurrency slots with a bounded number of waiters."""
+
+    def __init__(self, scope: str, limit: int, queue_limit: int):
+        self.scope = scope
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.active = 0
+        self.waiting = 0
+        self._sem = asyncio.Semaphore(limit)
+        self.shed = 0
+
+    async def acquire(self, wait: float):
+        if self._sem.locked():
+            if self.waiting >= self.queue_limit:
+                self.shed += 1
+                raise Overloaded(self.scope, "queue full", wait)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), wait)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                raise Overloaded(self.scope, "queue wait exceeded", wait) from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._sem.release()
+
+    def idle(self) -> bool:
+        return self.active == 0 and self.waiting == 0
+
+
+class TokenBucket:
+    """Tokens-per-minute budget; callers reserve up front and may go into debt they then wait out."""
+
+    def __init__(self, scope: str, per_minute: float):
+        self.scope = scope
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float, max_wait: float) -> float:
+        """Take `cost` tokens; returns how long to wait before using them, or raises Overloaded."""
+        self._refill()
+        wait = max(0.0, (cost - self.tokens) / self.rate)
+        if wait > max_wait:
+            raise Overloaded(self.scope, "token rate exceeded", wait)
+        self.tokens -= cost
+        return wait
+
+    def refund(self, tokens: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+class Lease:
+    """Slots (and token reservations) held by one admitted call."""
+
+    def __init__(self, gateway, tenant: str, lanes: list, buckets: list, cost: float):
+        self.gateway = gateway
+        self.tenant = tenant
+        self.lanes = lanes
+        self.buckets = buckets
+        self.cost = cost
+        self.released = False
+
+    def settle(self, usage):
+        """Square the token reservation with what the API actually reported."""
+        if usage is None or not self.buckets:
+            return
+        spent = (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+        for bucket in self.buckets:
+            bucket.refund(self.cost - spent)  # negative when we under-estimated
+        self.cost = spent
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            for lane in self.lanes:
+                lane.release()
+            self.gateway._prune(self.tenant)
+
+
+# -------------------- Retries --------------------
+def retryable(e: Exception) -> bool:
+    if isinstance(e, (APITimeoutError, APIConnectionError, asyncio.TimeoutError)):
+        return True
+    return isinstance(e, APIStatusError) and (e.status_code == 429 or e.status_code >= 500)
+
+
+def backoff(attempt: int, e: Exception) -> float:
+    """Full jitter, or the server's Retry-After when it sent one."""
+    response = getattr(e, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return float(retry_after)
+    except ValueError:
+        pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def request_key(kwargs: dict) -> str:
+    payload = json.dumps(kwargs, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------- Gateway --------------------
+class LLMGateway:
+    def __init__(self, client, tenant_concurrency: int = LLM_TENANT_CONCURRENCY,
+                 global_concurrency: int = LLM_GLOBAL_CONCURRENCY, tenant_tpm: float = LLM_TENANT_TPM,
+                 global_tpm: float = LLM_GLOBAL_TPM, deadline: float = LLM_DEADLINE_SECONDS):
+        self.client = client
+        self.tenant_concurrency = tenant_concurrency
+        self.tenant_tpm = tenant_tpm
+        self.deadline = deadline
+        self.global_lane = Lane(GLOBAL, global_concurrency, LLM_GLOBAL_QUEUE)
+        self.global_bucket = TokenBucket(GLOBAL, global_tpm) if global_tpm > 0 else None
+        self.lanes = {}
+        self.buckets = {}
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.shed = 0
+
+    def _lane(self, tenant: str) -> Lane:
+        lane = self.lanes.get(tenant)
+        if lane is None:
+            lane = self.lanes[tenant] = Lane(tenant, self.tenant_concurrency, LLM_TENANT_QUEUE)
+        return lane
+
+    def _prune(self, tenant: str):
+        lane = self.lanes.get(tenant)
+        if lane is not None and lane.idle() and tenant not in self.buckets:
+            del self.lanes[tenant]
+
+    async def admit(self, tenant: str, cost: float, wait: float = LLM_QUEUE_WAIT_SECONDS) -> Lease:
+        """Reserve tokens, then a tenant slot, then a global slot; raises Overloaded when shedding."""
+        try:
+            buckets, delay = self._reserve(tenant, cost, wait)
+            if delay:
+                await asyncio.sleep(delay)  # wait out the token debt in reservation order
+            lanes = []
+            started = time.monotonic()
+            try:
+                for lane in (self._lane(tenant), self.global_lane):
+                    await lane.acquire(max(0.0, wait - (time.monotonic() - started)))
+                    lanes.append(lane)
+            except BaseException:
+                for lane in lanes:
+                    lane.release()
+                for bucket in buckets:
+                    bucket.refund(cost)
+                self._prune(tenant)
+                raise
+            return Lease(self, tenant, lanes, buckets, cost)
+        except Overloaded as e:
+            self.shed += 1
+            record_error("llm_admission", tenant, e)
+            raise
+
+    def _reserve(self, tenant: str, cost: float, wait: float):
+        buckets = [self.global_bucket] if self.global_bucket is not None else []
+        if self.tenant_tpm > 0:
+            if tenant not in self.buckets:
+                self.buckets[tenant] = TokenBucket(tenant, self.tenant_tpm)
+            buckets.insert(0, self.buckets[tenant])
+        reserved, delay = [], 0.0
+        try:
+            for bucket in buckets:
+                delay = max(delay, bucket.reserve(cost, wait))
+                reserved.append(bucket)
+        except Overloaded:
+            for bucket in reserved:
+                bucket.refund(cost)
+            raise
+        return reserved, delay
+
+    def estimate(self, kwargs: dict) -> float:
+        prompt = sum(count_tokens(m.get("content") or "") + 4 for m in kwargs.get("messages", ()))
+        return prompt + kwargs.get("max_tokens", 0)
+
+    async def _attempts(self, call, deadline: float):
+        """Run call() until it succeeds, retrying retryable errors with backoff inside the deadline."""
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                return await asyncio.wait_for(call(), min(remaining, LLM_ATTEMPT_TIMEOUT_SECONDS))
+            except Exception as e:
+                delay = backoff(attempt, e)
+                if attempt >= LLM_MAX_RETRIES or not retryable(e) or time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                self.retries += 1
+                log.info("Retrying LLM call in %.2fs after %r", delay, e)
+                await asyncio.sleep(delay)
+
+    async def complete(self, tenant: str, mode: str = None, **kwargs):
+        """chat.completions.create(**kwargs) under admission control; identical in-flight calls share one."""
+        key = request_key(kwargs)
+        shared = self._inflight.get(key)
+        if shared is not None:
+            self.coalesced += 1
+            return await asyncio.shield(shared)
+        shared = self._inflight[key] = asyncio.ensure_future(self._complete(tenant, mode, kwargs))
+        shared.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(shared)
+
+    def _forget(self, key: str, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # retrieved here so a result nobody awaited anymore isn't logged as lost
+
+    async def _complete(self, tenant: str, mode: str, kwargs: dict):
+        deadline = time.monotonic() + self.deadline
+        lease = await self.admit(tenant, self.estimate(kwargs))
+        try:
+            self.calls += 1
+            resp = await self._attempts(lambda: self.client.chat.completions.create(**kwargs), deadline)
+            lease.settle(resp.usage)
+            record_usage(resp.usage, tenant, mode)
+            return resp
+        finally:
+            lease.release()
+
+    async def stream(self, lease: Lease, mode: str = None, **kwargs):
+        """
+        Yield chunks of a streaming completion on an already admitted lease
+        (admit() runs in the handler so shedding can still be a 429). Retries
+        happen only before the first chunk; the lease is released at the end.
+        """
+        deadline = time.monotonic() + self.deadline
+        stream = None
+        try:
+            self.calls += 1
+            stream = await self._attempts(lambda: self.client.chat.completions.create(stream=True, **kwargs), deadline)
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    break
+                if getattr(chunk, "usage", None):
+                    lease.settle(chunk.usage)
+                    record_usage(chunk.usage, lease.tenant, mode)
+                yield chunk
+        finally:
+            lease.release()
+            if stream is not None:
+                await stream.close()  # abandoned or timed-out streams give the connection back
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "shed": self.shed,
+            "global": {"active": self.global_lane.active, "waiting": self.global_lane.waiting,
+                       "tokens": round(self.global_bucket.tokens) if self.global_bucket else None},
+            "tenants": {t: {"active": lane.active, "waiting": lane.waiting, "shed": lane.shed}
+                        for t, lane in sorted(self.lanes.items())},
+        }
@@ -0,0 +1,264 @@
+# menu_index.py
+"""
+Per-restaurant lexical retrieval over the menu.
+
+A BM25 inverted index over item names, categories and descriptions (names
+weighted highest), with alias and size expansion so "xl", "14 inch" and
+"wings" line up with "Extra Large (16”)", 'Medium 14"' and "Buffalo Wings".
+Per-posting BM25 contributions (with IDF) are precomputed at build time,
+and a turn's queries (the message plus recent history) are merged into one
+weight per term, so each item is scored once per turn.
+
+Scoring runs on packed integers rather than per-posting dict updates: each
+term also keeps its contributions quantized to 1..255 in 16-bit lanes of one
+Python int (lane d = item d). A turn's weighted lane sum is a few big-int
+multiply/adds in C, and the lanes' high bytes locate the bucket holding the
+k-th best item. Rounding error is bounded, so only items within that bound
+of the bucket can be in the top k; just those are rescored with the exact
+float contributions, and the result is the exact BM25 top k. Menus smaller
+than LANE_MIN_ITEMS skip the lanes, since plain dict scoring is quicker there.
+
+The index is built with the Catalog when it loads, never on a request.
+"""
+import heapq
+import math
+import os
+import re
+import sys
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+MENU_TOP_K = int(os.getenv("MENU_TOP_K", "20"))
+WEIGHT_STEPS = 4    # lane sums weight queries in quarters (1.0, 0.5, 0.25 are exact)
+LANE_MAX = 255      # quantized per-term contribution
+LANE_BUDGET = 257   # summed integer weights must stay below this so 16-bit lanes can't overflow
+LANE_MIN_ITEMS = int(os.getenv("MENU_LANE_MIN_ITEMS", "200"))  # smaller menus score faster with plain dicts
+
+FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+
+STOPWORDS = {
+    "a", "an", "and", "any", "anything", "are", "as", "at", "be", "can", "could", "do", "does", "for", "from",
+    "get", "give", "have", "hey", "hi", "how", "i", "i'd", "i'll", "i'm", "in", "is", "it", "just",
+    "like", "me", "my", "of", "on", "or", "please", "some", "that", "the", "there", "this", "to",
+    "u", "us", "want", "what", "whats", "which", "with", "would", "you", "your",
+}
+
+# Query-side expansion: shorthand and synonyms customers type
+ALIASES = {
+    "xl": ["extra", "large"],
+    "xlarge": ["extra", "large"],
+    "lg": ["large"],
+    "lrg": ["large"],
+    "med": ["medium"],
+    "md": ["medium"],
+    "sm": ["small"],
+    "sml": ["small"],
+    "piece": ["pc"],
+    "pcs": ["pc"],
+    "soda": ["coke", "sprite", "drink"],
+    "pop": ["coke", "sprite", "drink"],
+    "beverage": ["drink"],
+    "dessert": ["dessert", "cake", "cookie", "brownie"],
+    "veggie": ["veggie", "vegetable"],
+    "vegetarian": ["veggie"],
+    "cheesy": ["cheese"],
+    "bbq": ["bbq", "barbecue"],
+    "barbecue": ["bbq"],
+    "pepperonis": ["pepperoni"],
+}
+
+_SIZE_RE = re.compile(r"(\d+)\s*(?:\"|”|''|-?inch(?:es)?\b|-?in\b)")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(tok: str) -> str:
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+        return tok[:-1]
+    return tok
+
+
+def tokenize(text: str) -> list:
+    """Lowercase, fold inch sizes to '<n>in', split, drop stopwords, light stemming."""
+    if not text:
+        return []
+    text = _SIZE_RE.sub(r" \1in ", str(text).lower())
+    return [_stem(t) for t in _TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+@lru_cache(maxsize=4096)
+def _field_tokens(text: str) -> tuple:
+    # Categories, sizes and common names repeat across items and catalog reloads
+    return tuple(tokenize(text))
+
+
+def expand_query(tokens: list) -> list:
+    out = []
+    for tok in tokens:
+        out.append(tok)
+        out.extend(ALIASES.get(tok, ()))
+        if tok.isdigit():
+            out.append(f"{tok}in")  # "14" may mean 14"
+    return out
+
+
+@lru_cache(maxsize=4096)
+def query_terms(text: str) -> frozenset:
+    """Expanded terms of one query; history messages recur every turn, so they are cached."""
+    return frozenset(expand_query(tokenize(text)))
+
+
+# BELOW[v]: bytes to delete to count lane buckets >= v; AT_LEAST[v]: pattern finding them
+BELOW = [bytes(range(v)) for v in range(256)]
+AT_LEAST = [re.compile(b"[" + re.escape(bytes([v])) + b"-\xff]") for v in range(256)]
+NONZERO = re.compile(b"[^\x00]")
+
+
+class MenuIndex:
+    def __init__(self, items: list, k1: float = 1.2, b: float = 0.75):
+        self.items = items
+        self.categories = list(dict.fromkeys(it.get("category") or "Uncategorized" for it in items))
+
+        doc_tfs = []
+        for it in items:
+            tf = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                value = it.get(field)
+                for tok in _field_tokens(str(value)) if value else ():
+                    tf[tok] = tf.get(tok, 0.0) + weight
+            doc_tfs.append(tf)
+
+        # Fallback order for vague turns: round-robin across categories
+        by_cat = {}
+        for doc, it in enumerate(items):
+            by_cat.setdefault(it.get("category") or "Uncategorized", []).append(doc)
+        self.sample_order = [
+            docs[depth]
+            for depth in range(max(map(len, by_cat.values()), default=0))
+            for docs in by_cat.values() if depth < len(docs)
+        ]
+
+        n = len(items)
+        lengths = [sum(tf.values()) for tf in doc_tfs]
+        avg_len = (sum(lengths) / n) if n else 1.0
+
+        df = Counter(tok for tf in doc_tfs for tok in tf)
+        idf = {tok: math.log(1 + (n - d + 0.5) / (d + 0.5)) for tok, d in df.items()}
+        k1p = k1 + 1
+
+        # postings[term] = {doc: precomputed bm25 contribution}
+        self.postings = postings = {tok: {} for tok in df}
+        for doc, tf in enumerate(doc_tfs):
+            norm = k1 * (1 - b + b * lengths[doc] / avg_len) if avg_len else k1
+            for tok, f in tf.items():
+                postings[tok][doc] = idf[tok] * f * k1p / (f + norm)
+
+        # lanes[term] = the same contributions quantized to 1..LANE_MAX, one 16-bit lane per doc
+        self.lanes = {}
+        if n >= LANE_MIN_ITEMS:
+            scale = LANE_MAX / max(max(post.values()) for post in postings.values())
+            for tok, post in postings.items():
+                lane = array("H", bytes(2 * n))
+                for doc, contrib in post.items():
+                    lane[doc] = int(contrib * scale + 0.5) or 1
+                if sys.byteorder == "big":
+                    lane.byteswap()
+                self.lanes[tok] = int.from_bytes(lane.tobytes(), "little")
+
+    def term_weights(self, queries: list) -> dict:
+        """Merge [(text, weight), ...] into {term: summed weight}; BM25 is linear in the query."""
+        weights = {}
+        for text, weight in queries:
+            for tok in query_terms(text or ""):
+                if tok in self.postings:
+                    weights[tok] = weights.get(tok, 0.0) + weight
+        return weights
+
+    def score(self, queries: list) -> dict:
+        """Full BM25 scores {doc: score} over [(text, weight), ...]."""
+        scores = {}
+        for tok, weight in self.term_weights(queries).items():
+            for doc, contrib in self.postings[tok].items():
+                scores[doc] = scores.get(doc, 0.0) + weight * contrib
+        return scores
+
+    def _rescore(self, weights: dict, docs: list) -> dict:
+        """Exact scores for just these docs, one term at a time."""
+        totals = [0.0] * len(docs)
+        for tok, weight in weights.items():
+            get = self.postings[tok].get
+            totals = [t + weight * get(doc, 0.0) for t, doc in zip(totals, docs)]
+        return dict(zip(docs, totals))
+
+    def _candidates(self, weights: dict, k: int):
+        """Docs that can be in the top k, from the packed lanes; None when the weights don't fit them."""
+        steps = {tok: max(1, round(w * WEIGHT_STEPS)) for tok, w in weights.items()}
+        budget = sum(steps.values())
+        if budget >= LANE_BUDGET or min(weights.values()) <= 0:
+            return None
+        by_step = {}
+        for tok, step in steps.items():
+            by_step[step] = by_step.get(step, 0) + self.lanes[tok]
+        total = sum(step * lanes for step, lanes in by_step.items())
+        n = len(self.items)
+        raw = total.to_bytes(2 * n, "little")
+        high = raw[1::2]
+
+        # Highest high-byte bucket with at least k lanes at or above it
+        lo, hi = 0, min(255, budget)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if len(high.translate(None, BELOW[mid])) >= k:
+                lo = mid
+            else:
+                hi = mid - 1
+
+        # A lane is within err of the doc's exact scaled score (contribution rounding plus
+        # weight rounding), so a top-k doc's lane is at least the k-th largest lane - 2 * err
+        margin = math.ceil(2 * (budget + LANE_MAX * sum(abs(steps[tok] - w * WEIGHT_STEPS)
+                                                         for tok, w in weights.items())))
+        floor = (256 * lo - margin) // 256
+        docs = self._matched(raw, n) if floor <= 0 else [m.start() for m in AT_LEAST[floor].finditer(high)]
+        if len(docs) <= k:
+            return docs
+        lanes = array("H", raw)
+        if sys.byteorder == "big":
+            lanes.byteswap()
+        values = [lanes[doc] for doc in docs]
+        cut = heapq.nlargest(k, values)[-1] - margin
+        return [doc for doc, v in zip(docs, values) if v >= cut]
+
+    @staticmethod
+    def _matched(raw: bytes, n: int) -> list:
+        """Docs with any matching term (non-zero lane)."""
+        hit = (int.from_bytes(raw[0::2], "little") | int.from_bytes(raw[1::2], "little")).to_bytes(n, "little")
+        return [m.start() for m in NONZERO.finditer(hit)]
+
+    def top_docs(self, queries: list, k: int = MENU_TOP_K) -> list:
+        """[(doc, score), ...] of the k best-scoring docs (ties keep menu order)."""
+        weights = self.term_weights(queries)
+        if not weights:
+            return []
+        candidates = self._candidates(weights, k) if self.lanes else None
+        scores = self.score(queries) if candidates is None else self._rescore(weights, candidates)
+        return heapq.nlargest(k, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+
+    def top_items(self, queries: list, k: int = MENU_TOP_K) -> list:
+        """The k most relevant menu items, padded from the category round-robin."""
+        picked = [doc for doc, _ in self.top_docs(queries, k)]
+        if len(picked) < k:
+            seen = set(picked)
+            for doc in self.sample_order:
+                if len(picked) >= k:
+                    break
+                if doc not in seen:
+                    picked.append(doc)
+        return [self.items[doc] for doc in picked]
+
+
+def get_menu_index(catalog) -> MenuIndex:
+    # Catalog builds this when it loads; the fallback covers catalogs built without one
+    index = catalog.derived.get("menu_index")
+    if index is None:
+        index = catalog.derived["menu_index"] = MenuIndex(catalog.menu)
+    return index
@@ -0,0 +1,216 @@
+# menu_normalize.py
+"""
+One normalizer for every menu schema in data/, and a columnar menu table.
+
+Schemas seen in the wild:
+    item_list        {"menu" | "items" | "menu_items": [{...}, ...]}
+    category_lists   {"menu": {"Starters": [{...}, ...]}}
+    category_prices  {"menu": {"Burritos": {"Chicken Burrito": "$8.50"}}}
+    item_docs        [{"item_id", "name", "category", "base_price", "variants", ...}]
+plus brand wrappers like {"Dominos": {...}} around any of them.
+
+iter_items() detects the schema and streams raw items; prices are parsed in
+one bulk pass and the result is a MenuTable (parallel id/name/category/
+price/description/flags columns). The Catalog keeps the table, and the
+menu index, intent rules and prompt builder share its rows and categories.
+
+    python menu_normalize.py           # conformance check over data/ and dominos_menu.json
+"""
+import json
+import os
+import re
+import sys
+import time
+
+AVAILABLE = 1
+HAS_VARIANTS = 2
+HAS_OPTIONS = 4
+NO_PRICE = 8
+
+LIST_KEYS = ("menu", "items", "menu_items")
+_PRICE_RE = re.compile(r"-?\d+(?:[.,]\d+)?")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def slug(text: str) -> str:
+    return _SLUG_RE.sub("_", str(text).lower()).strip("_")
+
+
+def unwrap_restaurant(data):
+    """Strip brand wrappers like {"Dominos": {...}} down to the restaurant payload."""
+    while isinstance(data, dict) and len(data) == 1:
+        inner = next(iter(data.values()))
+        if not isinstance(inner, dict) or not any(k in inner for k in LIST_KEYS + ("name",)):
+            break
+        data = inner
+    return data
+
+
+def detect_schema(data) -> str:
+    if isinstance(data, list):
+        return "item_docs"
+    for key in LIST_KEYS:
+        if isinstance(data.get(key), list):
+            return "item_list"
+    menu = data.get("menu")
+    if isinstance(menu, dict) and menu:
+        if all(isinstance(v, list) for v in menu.values()):
+            return "category_lists"
+        if all(isinstance(v, dict) for v in menu.values()):
+            return "category_prices"
+    return "unknown"
+
+
+def iter_items(data):
+    """Yield raw item dicts (price still unparsed) from any supported schema."""
+    data = unwrap_restaurant(data)
+    schema = detect_schema(data)
+    if schema == "item_docs":
+        for it in data:
+            yield dict(it, price=it.get("price", it.get("base_price")))
+    elif schema == "item_list":
+        yield from next(data[k] for k in LIST_KEYS if isinstance(data.get(k), list))
+    elif schema == "category_lists":
+        for cat, items in data["menu"].items():
+            for it in items:
+                yield dict(it, category=it.get("category") or cat)
+    elif schema == "category_prices":
+        for cat, items in data["menu"].items():
+            for name, value in items.items():
+                if isinstance(value, dict):  # {"Name": {"price": ..., "description": ...}}
+                    yield dict(value, name=value.get("name") or name, category=cat)
+                else:
+                    yield {"name": name, "category": cat, "price": value}
+
+
+def parse_prices(values: list) -> list:
+    """Bulk-parse prices ("$8.50", "8", 8.5, "1,299.00", None) to floats, None when unparseable."""
+    out = []
+    append = out.append
+    for v in values:
+        if v is None or isinstance(v, bool):
+            append(None)
+        elif isinstance(v, (int, float)):
+            append(float(v))
+        else:
+            s = str(v).strip().lstrip("$").replace(",", "")
+            try:
+                append(float(s))
+            except ValueError:
+                m = _PRICE_RE.search(s)
+                append(float(m.group().replace(",", ".")) if m else None)
+    return out
+
+
+class MenuTable:
+    """Column-oriented menu: parallel lists plus lazily built row dicts."""
+
+    COLUMNS = ("item_id", "name", "category", "price", "description", "flags")
+
+    def __init__(self, item_id, name, category, price, description, flags):
+        self.item_id = item_id
+        self.name = name
+        self.category = category
+        self.price = price
+        self.description = description
+        self.flags = flags
+        self._records = None
+        self._categories = None
+
+    def __len__(self):
+        return len(self.item_id)
+
+    @classmethod
+    def from_items(cls, items, prefix: str = ""):
+        """Build from iter_items() output: ids are slugged from category + name when missing."""
+        cols = {c: [] for c in cls.COLUMNS}
+        raw_prices, seen = [], set()
+        for it in items:
+            name = it.get("name") or it.get("title") or f"item_{len(raw_prices) + 1}"
+            category = it.get("category") or it.get("type") or "Uncategorized"
+            item_id = it.get("item_id") or f"{prefix}{slug(category)}_{slug(name)}"
+            if item_id in seen:
+                item_id = f"{item_id}_{len(raw_prices) + 1}"
+            seen.add(item_id)
+            flags = AVAILABLE if it.get("availability", True) else 0
+            if it.get("variants"):
+                flags |= HAS_VARIANTS
+            if it.get("options") or it.get("addons"):
+                flags |= HAS_OPTIONS
+            cols["item_id"].append(item_id)
+            cols["name"].append(name)
+            cols["category"].append(category)
+            cols["description"].append(it.get("description") or "")
+            cols["flags"].append(flags)
+            raw_prices.append(it.get("price"))
+        cols["price"] = parse_prices(raw_prices)
+        for i, p in enumerate(cols["price"]):
+            if p is None:
+                cols["flags"][i] |= NO_PRICE
+        return cls(**cols)
+
+    @classmethod
+    def from_docs(cls, docs):
+        """Build from db.menus documents (prices already numeric, availability already filtered)."""
+        return cls.from_items(docs)
+
+    @property
+    def records(self) -> list:
+        """Row dicts (item_id, name, category, price, description) as the chat pipeline uses them."""
+        if self._records is None:
+            self._records = [
+                {"item_id": i, "name": n, "category": c, "price": p, "description": d}
+                for i, n, c, p, d in zip(self.item_id, self.name, self.category, self.price, self.description)
+            ]
+        return self._records
+
+    @property
+    def categories(self) -> list:
+        if self._categories is None:
+            self._categories = list(dict.fromkeys(self.category))
+        return self._categories
+
+
+def normalize_menu(data, prefix: str = "") -> MenuTable:
+    return MenuTable.from_items(iter_items(data), prefix)
+
+
+# -------------------- Conformance Check --------------------
+def check_file(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    started = time.perf_counter()
+    table = normalize_menu(data)
+    elapsed = time.perf_counter() - started
+    problems = []
+    if not len(table):
+        problems.append("no items")
+    if len(set(table.item_id)) != len(table):
+        problems.append("duplicate item ids")
+    missing = [n for n, f in zip(table.name, table.flags) if f & NO_PRICE]
+    if missing:
+        problems.append(f"unparsed prices: {missing[:5]}")
+    if any(p is not None and p < 0 for p in table.price):
+        problems.append("negative prices")
+    if not all(table.name) or not all(table.category):
+        problems.append("blank names or categories")
+    return {"schema": detect_schema(unwrap_restaurant(data)), "items": len(table),
+            "categories": len(table.categories), "ms": round(elapsed * 1000, 3), "problems": problems}
+
+
+def main():
+    root = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(root, "data")
+    paths = [os.path.join(data_dir, f) for f in sorted(os.listdir(data_dir)) if f.endswith(".json")]
+    paths.append(os.path.join(root, "dominos_menu.json"))
+    failed = 0
+    for path in paths:
+        result = check_file(path)
+        status = "ok" if not result["problems"] else "FAIL"
+        failed += bool(result["problems"])
+        print(f"{status:<4} {os.path.relpath(path, root):<28} {result}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
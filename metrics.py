@@ -0,0 +1,183 @@
+# metrics.py
+"""
+Request-scoped timing spans and Prometheus-format metrics.
+
+Each /ask turn starts a Trace; `with span("stage"):` anywhere below it (the
+catalog and session reads, intent routing, prompt building, the LLM call,
+order validation, saving) adds that stage's wall time to the trace through
+a context variable, so nothing has to be threaded through call signatures.
+When the turn finishes the stages are observed into histograms labelled by
+restaurant and mode, and turns slower than SLOW_REQUEST_MS are logged with
+their breakdown. Counters and histograms are plain in-process objects
+rendered in the Prometheus text format by render(); cache hit counters are
+read from the caches' own stats() at scrape time.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+log = logging.getLogger("syntra.metrics")
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))  # 0 disables slow-request logging
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+UNKNOWN = "unknown"
+
+
+# -------------------- Metric Types --------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, le: str = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *values, amount: float = 1):
+        self.values[values] = self.values.get(values, 0) + amount
+
+    def samples(self):
+        for values, total in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.labels, values)} {total:g}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, *values, value: float):
+        row = self.values.get(values)
+        if row is None:
+            row = self.values[values] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def samples(self):
+        for values, row in sorted(self.values.items()):
+            for bound, n in zip(self.buckets, row):
+                yield f"{self.name}_bucket{_labels(self.labels, values, f'{bound:g}')} {n}"
+            yield f"{self.name}_bucket{_labels(self.labels, values, '+Inf')} {row[-1]}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {row[-2]:.6f}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {row[-1]}"
+
+
+REQUEST_SECONDS = Histogram("syntra_request_seconds", "End-to-end chat turn latency.",
+                            ("endpoint", "restaurant", "mode", "source"))
+STAGE_SECONDS = Histogram("syntra_stage_seconds", "Time spent in each stage of a chat turn.",
+                          ("stage", "restaurant", "mode"))
+LLM_TOKENS = Counter("syntra_llm_tokens_total", "Tokens reported by the LLM API (resp.usage).",
+                     ("restaurant", "mode", "kind"))
+ERRORS = Counter("syntra_errors_total", "Errors by stage and exception type.", ("stage", "restaurant", "error"))
+FLUSH_SECONDS = Histogram("syntra_mongo_flush_seconds", "Write-behind insert_many latency per collection batch.",
+                          ("collection",))
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, LLM_TOKENS, ERRORS, FLUSH_SECONDS]
+
+
+def record_usage(usage, restaurant: str, mode: str):
+    """Count prompt/completion tokens from an OpenAI usage object (absent on some stream chunks)."""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(restaurant or UNKNOWN, mode or UNKNOWN, "prompt", amount=usage.prompt_tokens or 0)
+    LLM_TOKENS.inc(restaurant or UNKNOWN, mode or UNKNOWN, "completion", amount=usage.completion_tokens or 0)
+
+
+def record_error(stage: str, restaurant: str, error: BaseException):
+    ERRORS.inc(stage, restaurant or UNKNOWN, type(error).__name__)
+
+
+# -------------------- Spans --------------------
+_current = ContextVar("syntra_trace", default=None)
+
+
+class Trace:
+    """Stage timings for one turn; labels are filled in as the turn resolves them."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.restaurant = UNKNOWN
+        self.mode = UNKNOWN
+        self.source = UNKNOWN
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(self.endpoint, self.restaurant, self.mode, self.source, value=total)
+        for stage, seconds in self.stages.items():
+            STAGE_SECONDS.observe(stage, self.restaurant, self.mode, value=seconds)
+        if SLOW_REQUEST_MS and total * 1000 >= SLOW_REQUEST_MS:
+            breakdown = " ".join(f"{s}={v * 1000:.0f}ms" for s, v in sorted(self.stages.items(), key=lambda kv: -kv[1]))
+            log.warning("Slow %s %s/%s source=%s total=%.0fms %s", self.endpoint, self.restaurant, self.mode,
+                        self.source, total * 1000, breakdown)
+        return total
+
+
+def start_trace(endpoint: str) -> Trace:
+    trace = Trace(endpoint)
+    _current.set(trace)
+    return trace
+
+
+def use_trace(trace: Trace):
+    """Re-bind a trace in another context (e.g. a streaming body iterated outside the handler)."""
+    _current.set(trace)
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(stage: str):
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.perf_counter() - started)
+
+
+# -------------------- Exposition --------------------
+def render(cache_stats: dict = None) -> str:
+    """Prometheus text format; cache_stats maps cache name -> its stats() dict."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    if cache_stats:
+        for name, field in (("syntra_cache_hits_total", "hits"), ("syntra_cache_misses_total", "misses")):
+            lines.append(f"# HELP {name} Cache {field} since startup.")
+            lines.append(f"# TYPE {name} counter")
+            for cache, stats in sorted(cache_stats.items()):
+                if stats and field in stats:
+                    lines.append(f'{name}{{cache="{cache}"}} {stats[field]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,140 @@
+# orders.py
+"""
+Order extraction from the ORDER_JSON block the order-mode prompt asks for.
+
+OrderExtractor watches a reply as it streams and parses the JSON between
+---ORDER_JSON_START--- and ---ORDER_JSON_END--- as soon as the end marker
+arrives, scanning each chunk once (plus a marker-length overlap). The parsed
+order is then validated against the catalog's price index: item_ids must
+exist (a unique exact name is accepted in place of a bad id), quantities
+must be positive integers, and unit prices, line totals and the total are
+recomputed from the menu rather than taken from the model. Valid orders are
+persisted to `{restaurant_key}_orders` in the same write-behind batch as
+the chat turn.
+"""
+import json
+
+ORDER_START = "---ORDER_JSON_START---"
+ORDER_END = "---ORDER_JSON_END---"
+FULFILMENT = ("pickup", "delivery")
+MAX_QTY = 100
+
+
+class OrderExtractor:
+    """Incremental marker scan over streamed text; .order is set once a block parses."""
+
+    def __init__(self):
+        self.buffer = []
+        self.size = 0
+        self._tail = ""    # end of the text so far, long enough to hold a split marker
+        self._start = -1   # offset just past ORDER_START in the full text
+        self.order = None
+        self.error = None
+        self.done = False
+
+    def feed(self, chunk: str):
+        """Add a delta; returns the parsed order the moment its block completes, else None."""
+        if self.done or not chunk:
+            return None
+        window = self._tail + chunk
+        base = self.size - len(self._tail)  # offset of window[0] in the full text
+        self.buffer.append(chunk)
+        self.size += len(chunk)
+        if self._start < 0:
+            pos = window.find(ORDER_START)
+            if pos < 0:
+                self._tail = window[-(len(ORDER_START) - 1):]
+                return None
+            self._start = base + pos + len(ORDER_START)
+            window, base = window[pos + len(ORDER_START):], self._start
+        pos = window.find(ORDER_END)
+        if pos < 0:
+            self._tail = window[-(len(ORDER_END) - 1):]
+            return None
+        self.done = True
+        text = "".join(self.buffer)
+        try:
+            self.order = json.loads(text[self._start:base + pos])
+        except ValueError as e:
+            self.error = f"invalid order JSON: {e}"
+        return self.order
+
+
+def extract_order(text: str):
+    """(order dict or None, error or None) from a complete reply."""
+    extractor = OrderExtractor()
+    extractor.feed(text)
+    return extractor.order, extractor.error
+
+
+# -------------------- Validation --------------------
+class PriceIndex:
+    def __init__(self, table):
+        self.by_id = {}
+        by_name = {}
+        for item_id, name, price in zip(table.item_id, table.name, table.price):
+            if price is None:
+                continue
+            self.by_id[item_id] = (name, price)
+            by_name.setdefault(name.strip().lower(), []).append(item_id)
+        self.by_name = {name: ids[0] for name, ids in by_name.items() if len(ids) == 1}
+
+    def resolve(self, item: dict):
+        item_id = item.get("item_id")
+        if item_id in self.by_id:
+            return item_id
+        return self.by_name.get(str(item.get("name") or "").strip().lower())
+
+
+def get_price_index(catalog) -> PriceIndex:
+    index = catalog.derived.get("price_index")
+    if index is None:
+        index = catalog.derived["price_index"] = PriceIndex(catalog.table)
+    return index
+
+
+def validate_order(payload, catalog):
+    """(clean order, errors): errors is empty only when the order can be persisted."""
+    order = payload.get("order") if isinstance(payload, dict) else None
+    if not isinstance(order, dict):
+        return None, ["missing \"order\" object"]
+    index = get_price_index(catalog)
+    errors, items = [], []
+    for raw in order.get("items") or []:
+        item_id = index.resolve(raw) if isinstance(raw, dict) else None
+        if item_id is None:
+            errors.append(f"unknown item {raw.get('item_id') if isinstance(raw, dict) else raw!r}")
+            continue
+        qty = raw.get("qty", 1)
+        if isinstance(qty, bool) or not isinstance(qty, (int, float)) or not float(qty).is_integer() \
+                or not 0 < qty <= MAX_QTY:
+            errors.append(f"bad qty {qty!r} for {item_id}")
+            continue
+        name, price = index.by_id[item_id]
+        qty = int(qty)
+        items.append({"item_id": item_id, "name": name, "qty": qty, "price": price,
+                      "line_total": round(price * qty, 2)})
+    if not items and not errors:
+        errors.append("order has no items")
+
+    fulfilment = str(order.get("pickup_or_delivery") or "").strip().lower()
+    if fulfilment not in FULFILMENT:
+        errors.append(f"pickup_or_delivery must be one of {FULFILMENT}")
+    if not str(order.get("customer_name") or "").strip():
+        errors.append("customer_name is required")
+    if fulfilment == "delivery" and not str(order.get("address") or "").strip():
+        errors.append("address is required for delivery")
+
+    total = round(sum(i["line_total"] for i in items), 2)
+    claimed = order.get("total")
+    clean = {
+        "items": items,
+        "total": total,
+        "pickup_or_delivery": fulfilment,
+        "customer_name": str(order.get("customer_name") or "").strip(),
+        "address": str(order.get("address") or "").strip(),
+        "notes": str(order.get("notes") or ""),
+        "model_total": claimed,
+        "total_mismatch": isinstance(claimed, (int, float)) and round(claimed, 2) != total,
+    }
+    return clean, errors
@@ -0,0 +1,165 @@
+# prompts.py
+"""
+System prompt compiler.
+
+Each (restaurant, mode) prompt is rendered once per catalog version with
+compact JSON and cached on the Catalog. Everything that varies per request
+(the retrieved menu items, the current time, ...) is appended after that
+byte-stable prefix so the provider's prompt-prefix cache keeps hitting across
+turns and sessions.
+"""
+import json
+
+from menu_index import MENU_TOP_K
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o family
+except Exception:  # optional dependency
+    _encoding = None
+
+LEGACY_MENU_LIMIT = 60  # the old fixed cutoff, kept for prompt_stats comparisons
+
+CHAT_TEMPLATE = """You are a super friendly, casual, human-like waiter at {display_name}.
+You talk like a real waiter at a relaxed restaurant — fun, warm, a little playful, NEVER formal.
+
+VIBE RULES:
+- Say “hey!” or “hey there!” instead of “hello”
+- Use natural speech (“oh nice!”, “haha yeah same”, “for sure!”, “got you!”)
+- Light emoji allowed 😊🔥🍕 (max 1 per message)
+- Small talk is encouraged (“how’s your day going?”, “my day’s been pretty chill haha”)
+- Sound HUMAN, not professional or robotic.
+
+WHAT YOU CAN DO:
+- answer greetings (“how are you?”, “sup?”, “how’s your day?”)
+- chat casually
+- recommend items
+- explain menu categories
+- tell user what’s popular
+
+WHAT YOU CANNOT DO (in chat mode):
+- start an order unless the user clearly wants to order
+- ask for pickup/delivery info
+- generate order JSON
+
+Menu categories: {categories}
+
+Policies: {policies}
+Deals: {deals}
+
+Keep messages short, warm, and super friendly."""
+
+ORDER_TEMPLATE = """You are now in ORDER MODE for {display_name}.
+The user is placing an order. Stay friendly and casual, but ensure accuracy.
+
+ORDER FLOW RULES (follow them strictly):
+
+1. Confirm the requested item
+2. Always Confirm size/flavor
+3. Confirm quantity
+After the user confirms they do NOT want anything else, your next message MUST ask:
+“Would this be for pickup or delivery?”
+Never end the conversation before asking this.
+4. Ask: "Would this be for pickup or delivery?"
+5. If it's for delivery, Always ask for address.
+6. Ask: "And can I get a name for the order?"
+7. Summarize the order clearly
+8. THEN output the order JSON ONLY between these markers:
+
+When you output the final JSON, it MUST match this structure EXACTLY:
+
+---ORDER_JSON_START---
+{{
+  "order": {{
+    "items": [
+      {{
+        "item_id": "string",
+        "name": "string",
+        "qty": 1,
+        "price": 0
+      }}
+    ],
+    "total": 0,
+    "pickup_or_delivery": "pickup or delivery",
+    "customer_name": "string",
+    "address": "string (required if delivery)",
+    "notes": ""
+  }}
+}}
+---ORDER_JSON_END---
+
+IMPORTANT:
+• Keys MUST be spelled exactly like this: item_id, name, qty, price, total, pickup_or_delivery, customer_name, address, notes
+• Do NOT invent new keys.
+• Do NOT rename keys.
+• Do NOT wrap numbers as strings.
+• Do NOT output JSON until ALL information is collected.
+
+Menu categories: {categories}"""
+
+TEMPLATES = {"chat": CHAT_TEMPLATE, "order": ORDER_TEMPLATE}
+
+MENU_HEADERS = {
+    "chat": "MENU REFERENCE — items relevant to this conversation (don’t list everything unless asked):",
+    "order": "Menu reference — items relevant to this order:",
+}
+
+
+def compact_json(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else a ~4 chars/token estimate."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def render_prompt(catalog, mode: str, dumps=compact_json) -> str:
+    raw = catalog.raw
+    return TEMPLATES[mode].format(
+        display_name=catalog.display_name,
+        categories=", ".join(catalog.table.categories),
+        policies=dumps(raw.get("policies", {})),
+        deals=dumps(raw.get("deals", [])),
+    )
+
+
+def compiled_prompt(catalog, mode: str) -> dict:
+    """The cached {"text", "tokens"} prefix for this catalog version and mode."""
+    prompts = catalog.derived.setdefault("prompts", {})
+    compiled = prompts.get(mode)
+    if compiled is None:
+        text = render_prompt(catalog, mode)
+        compiled = prompts[mode] = {"text": text, "tokens": count_tokens(text)}
+    return compiled
+
+
+def render_menu(mode: str, items: list) -> str:
+    return f"{MENU_HEADERS[mode]}\n{compact_json(items)}"
+
+
+def build_system_prompt(catalog, mode: str, now: str, menu_items: list) -> str:
+    """Stable compiled prefix followed by the per-turn menu selection and time."""
+    return f"{compiled_prompt(catalog, mode)['text']}\n\n{render_menu(mode, menu_items)}\n\nCurrent time: {now}"
+
+
+def prompt_stats(catalog, k: int = MENU_TOP_K) -> dict:
+    """
+    Token counts per mode: the cached prefix, the menu section at top-k, and
+    the old layout (pretty-printed JSON with the first 60 menu rows) for comparison.
+    """
+    pretty = lambda o: json.dumps(o, indent=2)
+    stats = {"version": catalog.version, "menu_items": len(catalog.menu), "k": k, "modes": {}}
+    for mode in TEMPLATES:
+        compiled = compiled_prompt(catalog, mode)
+        menu_tokens = count_tokens(render_menu(mode, catalog.menu[:k]))
+        legacy = count_tokens(render_prompt(catalog, mode, dumps=pretty) + pretty(catalog.menu[:LEGACY_MENU_LIMIT]))
+        stats["modes"][mode] = {
+            "prefix_tokens": compiled["tokens"],
+            "menu_tokens": menu_tokens,
+            "total_tokens": compiled["tokens"] + menu_tokens,
+            "legacy_tokens": legacy,
+        }
+    return stats
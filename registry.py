@@ -0,0 +1,108 @@
+# registry.py
+"""
+Lazy registry of the restaurant files in data/.
+
+Startup only needs the restaurant keys and display names, so those live in
+a compact on-disk index keyed by each file's (mtime, size). A warm start
+stats the directory and reads the index, and only new or changed files are
+parsed. Nothing keeps full payloads: get() parses one file when a caller
+(seed_db) asks for it, and the caller drops it when done.
+"""
+import json
+import logging
+import os
+import tempfile
+
+log = logging.getLogger("syntra.registry")
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.getcwd(), "data"))
+REGISTRY_INDEX_PATH = os.getenv("REGISTRY_INDEX_PATH", os.path.join(os.getcwd(), ".cache", "restaurant_index.json"))
+INDEX_FORMAT = 1
+
+
+def format_name(name: str) -> str:
+    return name.replace("_", " ").title()
+
+
+def display_name(key: str, data) -> str:
+    # Nested Dominos-type JSONs list under their brand name
+    if isinstance(data, dict) and "Dominos" in data:
+        return "Dominos Pizza"
+    return format_name(key)
+
+
+def load_file(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RestaurantRegistry:
+    def __init__(self, data_dir: str = DATA_DIR, index_path: str = REGISTRY_INDEX_PATH):
+        self.data_dir = data_dir
+        self.index_path = index_path
+        self.entries = {}   # key -> {"file", "display_name", "mtime_ns", "size"}
+        self.parsed_on_scan = 0
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            return index.get("files", {}) if index.get("format") == INDEX_FORMAT else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, files: dict):
+        tmp = None
+        try:
+            directory = os.path.dirname(self.index_path) or "."
+            os.makedirs(directory, exist_ok=True)
+            # A temp file per writer, so workers scanning at once never interleave
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False,
+                                             prefix=os.path.basename(self.index_path) + ".", suffix=".tmp") as f:
+                tmp = f.name
+                json.dump({"format": INDEX_FORMAT, "data_dir": self.data_dir, "files": files}, f, separators=(",", ":"))
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            log.warning("Could not write restaurant index %s: %s", self.index_path, e)
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def scan(self):
+        """Refresh keys and display names, parsing only files the index doesn't already describe."""
+        cached = self._read_index()
+        files, dirty = {}, False
+        with os.scandir(self.data_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                meta = cached.get(entry.name)
+                if meta is None or meta["mtime_ns"] != st.st_mtime_ns or meta["size"] != st.st_size:
+                    key = entry.name[:-len(".json")]
+                    try:
+                        data = load_file(entry.path)
+                    except Exception as e:
+                        print(f"⚠️ Error loading {entry.name}: {e}")
+                        continue
+                    meta = {"key": key, "display_name": display_name(key, data),
+                            "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+                    self.parsed_on_scan += 1
+                    dirty = True
+                files[entry.name] = meta
+        dirty = dirty or len(files) != len(cached)
+        if dirty:
+            self._write_index(files)
+        self.entries = {meta["key"]: dict(meta, file=name) for name, meta in sorted(files.items())}
+        return self
+
+    def keys(self) -> list:
+        return list(self.entries)
+
+    def display_names(self) -> list:
+        return [meta["display_name"] for meta in self.entries.values()]
+
+    def get(self, key: str):
+        """The parsed restaurant file, read from disk on each call; None for unknown keys."""
+        if key not in self.entries:
+            return None
+        return load_file(os.path.join(self.data_dir, self.entries[key]["file"]))
@@ -0,0 +1,155 @@
+# reservations.py
+"""
+Reservation capacity: seat counts per time slot, plus an in-memory index.
+
+A restaurant's day is cut into RESERVATION_SLOT_MINUTES slots. Each slot
+seats the restaurant doc's reservation_capacity, or RESERVATION_SLOT_CAPACITY
+if that field is missing. Mongo keeps one doc per slot that has bookings,
+in {restaurant}_reservation_slots:
+
+    {_id: "2025-11-02T19:00", date, time, capacity, remaining}
+
+A booking is a single conditional update:
+
+    {_id, remaining: {$gte: guests}}  ->  {$inc: {remaining: -guests}}
+
+so concurrent bookings from any number of processes can never push a slot
+below zero. Each process also keeps {(restaurant, date): {time: remaining}}.
+It is built with one find per date, refreshed from every update's returned
+doc, and reloaded after RESERVATION_INDEX_TTL seconds (as is the restaurant's
+capacity), so availability checks are dict lookups. The index is only a
+hint, because another process may have booked or released seats since. A
+booking is never rejected from it: Mongo has the final say, and a failed
+update refreshes the slot.
+"""
+import os
+import threading
+from datetime import datetime
+from functools import lru_cache
+from time import monotonic
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+RESERVATION_SLOT_CAPACITY = int(os.getenv("RESERVATION_SLOT_CAPACITY", "40"))  # seats per slot
+RESERVATION_SLOT_MINUTES = int(os.getenv("RESERVATION_SLOT_MINUTES", "30"))
+RESERVATION_INDEX_TTL = float(os.getenv("RESERVATION_INDEX_TTL", "30"))  # reload a date's slots after this many seconds
+
+
+class SlotFull(Exception):
+    def __init__(self, restaurant: str, date: str, time: str, guests: int, remaining: int):
+        super().__init__(f"{restaurant} {date} {time}: {remaining} seats left, {guests} requested")
+        self.restaurant = restaurant
+        self.date = date
+        self.time = time
+        self.guests = guests
+        self.remaining = remaining
+
+
+def slot_collection(restaurant: str) -> str:
+    return f"{restaurant}_reservation_slots"
+
+
+@lru_cache(maxsize=4096)
+def normalize_slot(date: str, time: str, slot_minutes: int) -> tuple:
+    day = datetime.strptime(date.strip(), "%Y-%m-%d")
+    at = datetime.strptime(time.strip(), "%H:%M")
+    minute = at.hour * 60 + at.minute
+    minute -= minute % slot_minutes
+    return day.strftime("%Y-%m-%d"), f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class CapacityIndex:
+    def __init__(self, db, default_capacity: int = RESERVATION_SLOT_CAPACITY,
+                 slot_minutes: int = RESERVATION_SLOT_MINUTES, ttl: float = RESERVATION_INDEX_TTL):
+        self.db = db
+        self.default_capacity = default_capacity
+        self.slot_minutes = slot_minutes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._days = {}      # (restaurant, date) -> (loaded_at, {time: remaining})
+        self._capacity = {}  # restaurant -> (loaded_at, seats per slot)
+        self.booked = 0
+        self.rejected = 0
+
+    def slot(self, date: str, time: str) -> tuple:
+        """Normalize to ("YYYY-MM-DD", "HH:MM") at the start of the slot; ValueError if unparseable."""
+        return normalize_slot(date, time, self.slot_minutes)
+
+    def capacity(self, restaurant: str) -> int:
+        entry = self._capacity.get(restaurant)
+        if entry is None or monotonic() - entry[0] > self.ttl:
+            doc = self.db.restaurants.find_one({"key": restaurant}, {"reservation_capacity": 1}) or {}
+            entry = (monotonic(), int(doc.get("reservation_capacity") or self.default_capacity))
+            with self._lock:
+                self._capacity[restaurant] = entry
+        return entry[1]
+
+    def _day(self, restaurant: str, date: str) -> dict:
+        entry = self._days.get((restaurant, date))
+        if entry is None or monotonic() - entry[0] > self.ttl:
+            slots = {d["time"]: d["remaining"]
+                     for d in self.db[slot_collection(restaurant)].find({"date": date}, {"time": 1, "remaining": 1})}
+            entry = (monotonic(), slots)
+            with self._lock:
+                self._days[(restaurant, date)] = entry
+        return entry[1]
+
+    def _set(self, restaurant: str, date: str, time: str, remaining: int):
+        with self._lock:
+            entry = self._days.get((restaurant, date))
+            if entry is not None:
+                entry[1][time] = remaining
+
+    def remaining(self, restaurant: str, date: str, time: str) -> int:
+        date, time = self.slot(date, time)
+        return self._day(restaurant, date).get(time, self.capacity(restaurant))
+
+    def available(self, restaurant: str, date: str, time: str, guests: int) -> bool:
+        return 0 < guests <= self.remaining(restaurant, date, time)
+
+    def book(self, restaurant: str, date: str, time: str, guests: int) -> tuple:
+        """
+        Take guests seats from the slot or raise SlotFull; returns the normalized (date, time).
+        Only a failed conditional update rejects: the index may be stale, e.g. after
+        another process released seats.
+        """
+        if guests < 1:
+            raise ValueError("guests must be at least 1")
+        date, time = self.slot(date, time)
+        cap = self.capacity(restaurant)
+        known = self._day(restaurant, date).get(time)
+
+        slots = self.db[slot_collection(restaurant)]
+        slot_id = f"{date}T{time}"
+        if known is None:
+            try:
+                slots.update_one({"_id": slot_id},
+                                 {"$setOnInsert": {"date": date, "time": time, "capacity": cap, "remaining": cap}},
+                                 upsert=True)
+            except DuplicateKeyError:
+                pass  # another booking created it first
+        doc = slots.find_one_and_update({"_id": slot_id, "remaining": {"$gte": guests}},
+                                        {"$inc": {"remaining": -guests}},
+                                        projection={"remaining": 1}, return_document=ReturnDocument.AFTER)
+        if doc is None:
+            current = slots.find_one({"_id": slot_id}, {"remaining": 1})
+            left = current["remaining"] if current else cap
+            self._set(restaurant, date, time, left)
+            self.rejected += 1
+            raise SlotFull(restaurant, date, time, guests, left)
+        self._set(restaurant, date, time, doc["remaining"])
+        self.booked += 1
+        return date, time
+
+    def release(self, restaurant: str, date: str, time: str, guests: int):
+        """Give seats back (a cancelled booking, or one whose reservation doc failed to save)."""
+        date, time = self.slot(date, time)
+        doc = self.db[slot_collection(restaurant)].find_one_and_update(
+            {"_id": f"{date}T{time}"}, {"$inc": {"remaining": guests}},
+            projection={"remaining": 1}, return_document=ReturnDocument.AFTER)
+        if doc is not None:
+            self._set(restaurant, date, time, doc["remaining"])
+
+    def stats(self) -> dict:
+        return {"dates": len(self._days), "booked": self.booked, "rejected": self.rejected}
@@ -0,0 +1,200 @@
+# response_cache.py
+"""
+Response cache for chat-mode questions that many customers ask.
+
+Entries are scoped to a restaurant and its catalog version (which hashes the
+menu, policies and deals), so any catalog change invalidates them. Lookups
+hit on an exact normalized message first and then on near-duplicates:
+MinHash signatures over character trigrams, bucketed with LSH bands, find
+candidates. A candidate is accepted only if its content terms are identical
+(numbers, days and times, menu item and category words), so "open on
+saturday" never answers "open on sunday", and if the two messages' word sets
+overlap above a Jaccard threshold. Order mode never goes through here, and
+short or context-dependent messages ("yes", "what about that one") are
+never cached.
+"""
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+
+from menu_index import STOPWORDS
+
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.8"))  # word-set Jaccard
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+# Fixed pseudo-random permutations so signatures are stable across processes
+_PERMS = [((i * 0x9E3779B1 + 0x7F4A7C15) % _PRIME | 1, (i * 0x85EBCA77 + 0xC2B2AE3D) % _PRIME)
+          for i in range(1, NUM_PERM + 1)]
+
+SHORTHAND = {"u": "you", "ur": "your", "r": "are", "ya": "you", "thx": "thanks", "wanna": "want to"}
+FILLER_WORDS = {"hey", "hi", "hello", "yo", "um", "uh", "so", "please", "pls", "thanks", "thank", "just", "like", "ok", "okay"}
+# Messages leaning on earlier turns can't be answered from another session's reply
+CONTEXT_WORDS = {"it", "that", "this", "those", "these", "them", "one", "ones", "same", "again", "yes", "no", "yeah", "nope"}
+MIN_WORDS = 2
+# Words that change the answer however similar the rest of the message is
+TIME_WORDS = {
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "mon", "tue", "tues", "wed",
+    "thu", "thur", "thurs", "fri", "sat", "sun", "weekday", "weekdays", "weekend", "weekends", "today", "tonight",
+    "tomorrow", "morning", "afternoon", "evening", "night", "lunch", "dinner", "breakfast", "late", "early",
+    "holiday", "holidays",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize(text: str) -> str:
+    words = (SHORTHAND.get(w, w) for w in _WORD_RE.findall((text or "").lower().replace("’", "'")))
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+
+def cacheable(norm: str) -> bool:
+    words = norm.split()
+    return len(words) >= MIN_WORDS and not CONTEXT_WORDS.intersection(words)
+
+
+def menu_terms(catalog) -> frozenset:
+    """Words of the catalog's item names and categories, built once per catalog version."""
+    terms = catalog.derived.get("cache_terms")
+    if terms is None:
+        words = set()
+        for item in catalog.menu:
+            for field in ("name", "category"):
+                words.update(_WORD_RE.findall(str(item.get(field) or "").lower()))
+        terms = catalog.derived["cache_terms"] = frozenset(w for w in words if len(w) > 2 and w not in STOPWORDS)
+    return terms
+
+
+def content_terms(norm: str, vocabulary: frozenset) -> frozenset:
+    """The terms a near-duplicate must share exactly: numbers, days and times, menu words."""
+    return frozenset(w for w in norm.split()
+                     if w in vocabulary or w in TIME_WORDS or any(c.isdigit() for c in w))
+
+
+def word_similarity(words_a: frozenset, words_b: frozenset) -> float:
+    union = len(words_a | words_b)
+    return len(words_a & words_b) / union if union else 1.0
+
+
+def signature(norm: str) -> tuple:
+    padded = f" {norm} "
+    shingles = {zlib.crc32(padded[i:i + 3].encode()) for i in range(len(padded) - 2)} or {0}
+    return tuple(min(((a * x + b) % _PRIME) & _MASK for x in shingles) for a, b in _PERMS)
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 threshold: float = RESPONSE_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries = OrderedDict()  # (restaurant_key, version, norm) -> entry
+        self._bands = {}               # (restaurant_key, version, band, hash) -> {entry keys}
+        self._versions = {}            # restaurant_key -> version currently cached
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _band_keys(self, restaurant_key, version, sig):
+        return [(restaurant_key, version, b, sig[b * ROWS:(b + 1) * ROWS]) for b in range(BANDS)]
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(key[0], key[1], entry["sig"]):
+            members = self._bands.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._bands[band_key]
+
+    def _check_version(self, restaurant_key, version):
+        """A new catalog version (menu/policies/deals changed) retires the old entries."""
+        cached = self._versions.get(restaurant_key)
+        if cached != version:
+            if cached is not None:
+                for key in [k for k in self._entries if k[0] == restaurant_key]:
+                    self._drop(key)
+            self._versions[restaurant_key] = version
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["stored_at"] > self.ttl:
+            self._drop(key)
+            return None
+        return entry
+
+    def get(self, catalog, message: str):
+        """Cached chat reply for this message (or a near-duplicate), else None."""
+        norm = normalize(message)
+        if not cacheable(norm):
+            return None
+        self._check_version(catalog.key, catalog.version)
+
+        key = (catalog.key, catalog.version, norm)
+        entry = self._live(key)
+        if entry is not None:
+            self.exact_hits += 1
+        else:
+            sig = signature(norm)
+            words = frozenset(norm.split())
+            terms = content_terms(norm, menu_terms(catalog))
+            candidates = set()
+            for band_key in self._band_keys(catalog.key, catalog.version, sig):
+                candidates |= self._bands.get(band_key, set())
+            best, best_sim = None, self.threshold
+            for cand in candidates:
+                cand_entry = self._live(cand)
+                if cand_entry is None or cand_entry["terms"] != terms:
+                    continue
+                sim = word_similarity(words, cand_entry["words"])
+                if sim >= best_sim:
+                    best, best_sim = cand, sim
+            if best is None:
+                self.misses += 1
+                return None
+            key, entry = best, self._entries[best]
+            self.near_hits += 1
+
+        self._entries.move_to_end(key)
+        self.saved_seconds += entry["latency"]
+        return entry["answer"]
+
+    def put(self, catalog, message: str, answer: str, latency: float = 0.0):
+        norm = normalize(message)
+        if not cacheable(norm) or not answer:
+            return
+        self._check_version(catalog.key, catalog.version)
+        key = (catalog.key, catalog.version, norm)
+        self._drop(key)
+        sig = signature(norm)
+        self._entries[key] = {"answer": answer, "sig": sig, "words": frozenset(norm.split()),
+                              "terms": content_terms(norm, menu_terms(catalog)), "latency": latency,
+                              "stored_at": time.monotonic()}
+        for band_key in self._band_keys(catalog.key, catalog.version, sig):
+            self._bands.setdefault(band_key, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "saved_latency_seconds": round(self.saved_seconds, 3),
+        }
@@ -1,10 +1,31 @@
 # seed_db.py
+"""
+Incremental restaurant/menu ingestion.
+
+Each normalized menu item is hashed and diffed against what is stored, and
+only the changes are written, with unordered bulk_write batches. Item docs
+are content-addressed and live for a range of menu versions [v_from, v_to):
+new or changed items are written under the next version, superseded ones
+get their v_to set, and a single conditional update of the restaurant's
+`menu_version` switches readers to the new menu atomically (see
+catalog.live_menu_filter). Items retired by the previous switch are
+garbage-collected afterwards, so in-flight readers never see a gap.
+
+    python seed_db.py                  # ingest every file in data/
+    python seed_db.py dominos_pizza    # just these restaurant keys
+"""
+import argparse
+import hashlib
+import json
 import os
+import time
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from helper import load_all_restaurant_data
+from pymongo import MongoClient, UpdateOne
+from menu_normalize import MenuTable, iter_items, unwrap_restaurant
 from datetime import datetime
-import pprint
+from registry import RestaurantRegistry
+
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", "1000"))
 
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
@@ -17,95 +38,152 @@ def normalize_key(name: str) -> str:
 
 def prepare_menu_items(key: str, data: dict):
     """
-    Normalize whatever menu structure appears in your JSON.
+    Normalize whatever menu structure appears in your JSON (see menu_normalize).
     Returns a list of item dicts ready for db.menus insertion.
     """
-    menu_candidates = []
-    # Common patterns: data["menu"], data["items"], data.get("menu_items")
-    if isinstance(data.get("menu"), list):
-        menu_candidates = data.get("menu")
-    elif isinstance(data.get("items"), list):
-        menu_candidates = data.get("items")
-    elif isinstance(data.get("menu_items"), list):
-        menu_candidates = data.get("menu_items")
-    # Some nested structures might use categories: {'Starters': [...], 'Mains': [...]}
-    elif isinstance(data.get("menu"), dict):
-        for cat, items in data["menu"].items():
-            if isinstance(items, list):
-                for it in items:
-                    it = dict(it)
-                    it.setdefault("category", cat)
-                    menu_candidates.append(it)
-    # Fallback: maybe top-level has keys that look like items; otherwise empty
-    return menu_candidates
-
-def seed():
-    print("Loading JSON restaurant data via helper.load_all_restaurant_data()...")
-    all_restaurants = load_all_restaurant_data()
-
-    print("Wiping restaurants & menus (dev only) ...")
-    db.restaurants.delete_many({})
-    db.menus.delete_many({})
-
-    inserted_restaurants = 0
-    inserted_items = 0
-
-    for key, raw in all_restaurants.items():
-        # handle nested like {"Dominos": {...}}
-        if isinstance(raw, dict) and len(raw) == 1:
-            # if the single key equals a brand name and contains details
-            single_key = list(raw.keys())[0]
-            if isinstance(raw[single_key], dict) and single_key.lower() in ["dominos", "domino's", "dominos pizza"]:
-                data = raw[single_key]
-            else:
-                # not a Dominos special-case; keep raw as data
-                data = raw
-        else:
-            data = raw
-
-        restaurant_key = key  # keep original key form e.g., "bombay_grill"
-        display_name = data.get("name") or restaurant_key.replace("_", " ").title()
-
-        restaurant_doc = {
-            "key": restaurant_key,
-            "display_name": display_name,
-            "name": display_name,
-            "timezone": data.get("timezone", "America/Chicago"),
-            "settings": data.get("settings", {"chat_enabled": True, "order_enabled": True}),
-            "meta": data.get("meta", {}),
-            "locations": data.get("locations", []),
-            "raw": data,  # keep original JSON in case you need it later
-            "created_at": datetime.utcnow()
-        }
-        db.restaurants.insert_one(restaurant_doc)
-        inserted_restaurants += 1
-
-        # menu items
+    raw_items = list(iter_items(data))
+    table = MenuTable.from_items(raw_items)
+    return [
+        dict(it, item_id=item_id, name=name, category=category, price=price)
+        for it, item_id, name, category, price in zip(raw_items, table.item_id, table.name, table.category, table.price)
+    ]
+
+def build_item_doc(restaurant_key: str, it: dict, idx: int) -> dict:
+    return {
+        "item_id": it.get("item_id") or f"{restaurant_key}_itm_{idx+1}",
+        "restaurant_key": restaurant_key,
+        "name": it.get("name") or it.get("title") or f"item_{idx+1}",
+        "category": it.get("category") or it.get("type") or "Uncategorized",
+        "price": float(it.get("price", 0.0)) if it.get("price") is not None else 0.0,
+        "description": it.get("description", ""),
+        "addons": it.get("addons", []),
+        "availability": bool(it.get("availability", True)),
+        "metadata": it.get("metadata") or {k: it[k] for k in ("variants", "options") if it.get(k)},
+    }
+
+def item_hash(doc: dict) -> str:
+    payload = json.dumps(doc, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def build_restaurant_doc(restaurant_key: str, data: dict) -> dict:
+    display_name = data.get("name") or restaurant_key.replace("_", " ").title()
+    return {
+        "key": restaurant_key,
+        "display_name": display_name,
+        "name": display_name,
+        "timezone": data.get("timezone", "America/Chicago"),
+        "settings": data.get("settings", {"chat_enabled": True, "order_enabled": True}),
+        "meta": data.get("meta", {}),
+        "locations": data.get("locations", []),
+        "raw": data,  # keep original JSON in case you need it later
+    }
+
+def _bulk(coll, ops: list, batch_size: int):
+    for i in range(0, len(ops), batch_size):
+        coll.bulk_write(ops[i:i + batch_size], ordered=False)
+
+# -------------------- Incremental Ingest --------------------
+def ingest_restaurant(db, restaurant_key: str, data: dict, items: list = None, batch_size: int = INGEST_BATCH) -> dict:
+    """
+    Diff one restaurant's normalized menu against db.menus and apply only
+    the changes, then switch its menu_version. Returns counts for reporting.
+    """
+    now = datetime.utcnow()
+    if items is None:
         items = prepare_menu_items(restaurant_key, data)
-        for idx, it in enumerate(items):
-            item_doc = {
-                "item_id": it.get("item_id") or f"{restaurant_key}_itm_{idx+1}",
-                "restaurant_key": restaurant_key,
-                "name": it.get("name") or it.get("title") or f"item_{idx+1}",
-                "category": it.get("category") or it.get("type") or "Uncategorized",
-                "price": float(it.get("price", 0.0)) if it.get("price") is not None else 0.0,
-                "description": it.get("description", ""),
-                "addons": it.get("addons", []),
-                "availability": bool(it.get("availability", True)),
-                "metadata": it.get("metadata", {}),
-                "created_at": datetime.utcnow()
-            }
-            db.menus.insert_one(item_doc)
-            inserted_items += 1
-
-    # create indexes
+    docs = {}
+    for idx, it in enumerate(items):
+        doc = build_item_doc(restaurant_key, it, idx)
+        doc["content_hash"] = item_hash(doc)
+        docs[doc["item_id"]] = doc  # last one wins on duplicate ids
+
+    current = db.restaurants.find_one({"key": restaurant_key}, {"menu_version": 1})
+    version = (current or {}).get("menu_version")
+    next_version = (version or 0) + 1
+
+    # Live docs only; legacy (pre-versioning) docs have no hash and are all replaced
+    stored = {}
+    for d in db.menus.find({"restaurant_key": restaurant_key, "v_to": None}, {"item_id": 1, "content_hash": 1, "v_from": 1}):
+        stored.setdefault(d.get("item_id"), []).append(d)
+    # Writes left behind by an ingest that died before its switch still need one
+    interrupted = any((d.get("v_from") or 0) > (version or 0) for live in stored.values() for d in live) \
+        or db.menus.find_one({"restaurant_key": restaurant_key, "v_to": next_version}, {"_id": 1}) is not None
+
+    writes, retires = [], []
+    for item_id, doc in docs.items():
+        live = stored.pop(item_id, [])
+        if len(live) == 1 and live[0].get("content_hash") == doc["content_hash"]:
+            continue
+        retires.extend(d["_id"] for d in live)
+        _id = f"{restaurant_key}:{item_id}:{doc['content_hash'][:16]}"
+        writes.append(UpdateOne(
+            {"_id": _id},
+            {"$set": dict(doc, v_from=next_version, v_to=None), "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        ))
+    for leftovers in stored.values():
+        retires.extend(d["_id"] for d in leftovers)
+    retire_ops = [UpdateOne({"_id": _id}, {"$set": {"v_to": next_version}}) for _id in retires]
+
+    # New docs are invisible (v_from > version) and retired ones stay visible
+    # (v_to > version) until the switch below
+    _bulk(db.menus, writes + retire_ops, batch_size)
+
+    changed = bool(writes or retires) or interrupted or version is None
+    switch = {"$set": dict(build_restaurant_doc(restaurant_key, data), updated_at=now),
+              "$setOnInsert": {"created_at": now}}
+    if changed:
+        switch["$set"]["menu_version"] = next_version
+    expected = {"$exists": False} if version is None else version
+    result = db.restaurants.update_one({"key": restaurant_key, "menu_version": expected}, switch, upsert=current is None)
+    if result.matched_count == 0 and result.upserted_id is None:
+        raise RuntimeError(f"{restaurant_key}: menu_version moved during ingest, re-run to pick up the other writer")
+
+    # Items retired at or before the previous switch are no longer readable by anyone
+    removed = 0
+    if version is not None:
+        removed = db.menus.delete_many({"restaurant_key": restaurant_key, "v_to": {"$lte": version}}).deleted_count
+    return {
+        "items": len(docs),
+        "written": len(writes),
+        "retired": len(retires),
+        "unchanged": len(docs) - len(writes),
+        "removed": removed,
+        "menu_version": next_version if changed else version,
+    }
+
+def ensure_menu_indexes(db):
     db.restaurants.create_index("key", unique=True)
+    db.menus.create_index([("restaurant_key", 1), ("availability", 1)])
+    db.menus.create_index([("restaurant_key", 1), ("v_to", 1)])
     db.menus.create_index([("restaurant_key", 1), ("name", 1)])
     db.menus.create_index("item_id", unique=False)
-    db.create_collection("test_index_collection", capped=False) if "test_index_collection" not in db.list_collection_names() else None
 
-    print(f"Inserted {inserted_restaurants} restaurants and {inserted_items} menu items.")
+def seed(keys: list = None):
+    # One payload in memory at a time, and only for the keys being ingested
+    registry = RestaurantRegistry().scan()
+    print(f"Found {len(registry.keys())} restaurant files in {registry.data_dir}")
+    ensure_menu_indexes(db)
+
+    total_items = 0
+    started = time.perf_counter()
+    for restaurant_key in registry.keys():  # keep original key form e.g., "bombay_grill"
+        if keys and restaurant_key not in keys:
+            continue
+        try:
+            raw = registry.get(restaurant_key)
+        except Exception as e:
+            print(f"⚠️ Error loading {restaurant_key}: {e}")
+            continue
+        stats = ingest_restaurant(db, restaurant_key, unwrap_restaurant(raw))
+        total_items += stats["items"]
+        print(f"{restaurant_key}: {stats}")
+
+    elapsed = time.perf_counter() - started
+    print(f"Ingested {total_items} menu items in {elapsed:.2f}s ({total_items / elapsed if elapsed else 0:.0f} items/s).")
     print("Done. Inspect the DB in MongoDB Compass or Atlas.")
 
 if __name__ == "__main__":
-    seed()
+    parser = argparse.ArgumentParser(description="Incremental restaurant/menu ingestion")
+    parser.add_argument("keys", nargs="*", help="restaurant keys to ingest (default: all of data/)")
+    seed(parser.parse_args().keys)
@@ -0,0 +1,313 @@
+# session_store.py
+"""
+Per-session chat state kept in memory, with write-behind persistence.
+
+Each (restaurant_key, session_id) gets a ring buffer of its most recent
+messages plus its current mode, so a warm chat turn reads nothing from Mongo.
+Sessions are LRU-bounded and expire after an idle period; a cold session is
+rebuilt from its chat collection (see chat_storage) with one query.
+
+Writes are queued and flushed in batches with insert_many on a short
+interval (or sooner when a batch fills up), so a turn costs a fraction of a
+round trip and a crash loses at most one flush interval.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+
+from pymongo.errors import BulkWriteError
+
+from chat_storage import chat_target
+from metrics import FLUSH_SECONDS, record_error
+
+SUMMARY_COLLECTION = "session_summaries"
+
+log = logging.getLogger("syntra.sessions")
+
+HISTORY_WINDOW = int(os.getenv("SESSION_HISTORY_WINDOW", "8"))
+BACKLOG_MAX = int(os.getenv("SESSION_BACKLOG_MAX", "32"))  # unfolded messages kept for the summarizer
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_FLUSH_INTERVAL_SECONDS", "1.0"))
+FLUSH_MAX_BATCH = int(os.getenv("CHAT_FLUSH_MAX_BATCH", "500"))
+FLUSH_MAX_PENDING = int(os.getenv("CHAT_FLUSH_MAX_PENDING", "100000"))
+DUPLICATE_KEY = 11000
+
+
+class SessionState:
+    def __init__(self, restaurant_key: str, session_id: str, history=(), keep_backlog: bool = True):
+        self.restaurant_key = restaurant_key
+        self.session_id = session_id
+        self.history = deque(history, maxlen=HISTORY_WINDOW)
+        self.mode = None
+        self.last_active = time.monotonic()
+        # Rolling memory of messages older than the prompt window (see summarizer)
+        self.summary = ""
+        self.order = None
+        self.folded_until = None
+        # Messages evicted from history before they were folded; only kept when a summarizer folds them
+        self.backlog = deque(maxlen=BACKLOG_MAX) if keep_backlog else None
+        # WebSocket resumption (see app.ws_chat): the last finished reply and any turn still running
+        self.turn_seq = 0
+        self.last_reply = None
+        self.running = None
+
+    def append(self, role: str, message: str, mode: str, timestamp):
+        if (self.backlog is not None and len(self.history) == self.history.maxlen
+                and not self.history[0].get("folded")):
+            self.backlog.append(self.history[0])
+        self.history.append({"role": role, "message": message, "mode": mode, "timestamp": timestamp})
+        self.mode = mode
+
+    def unfolded(self, window: int) -> list:
+        """Messages older than the last `window` that the summary doesn't cover yet."""
+        older = list(self.history)[:-window] if window > 0 else list(self.history)
+        return list(self.backlog or ()) + [h for h in older if not h.get("folded")]
+
+    def mark_folded(self, messages: list):
+        for h in messages:
+            h["folded"] = True
+            if h.get("timestamp") is not None:
+                self.folded_until = h["timestamp"]
+        if self.backlog:
+            folded = {id(h) for h in messages}
+            kept = [h for h in self.backlog if id(h) not in folded]
+            self.backlog.clear()
+            self.backlog.extend(kept)
+
+    def prompt_history(self, window: int) -> list:
+        """
+        What the prompt shows verbatim: not-yet-folded older messages, then the last `window`.
+        While the summary is behind, that is capped at HISTORY_WINDOW messages.
+        """
+        recent = list(self.history)[-window:] if window > 0 else []
+        return (self.unfolded(window) + recent)[-max(window, HISTORY_WINDOW):]
+
+    def last_bot_message(self):
+        for h in reversed(self.history):
+            if h.get("role") == "bot":
+                return h.get("message", "")
+        return None
+
+    def mid_order(self, matcher) -> bool:
+        """Whether any bot message in the window shows an order in progress."""
+        for h in reversed(self.history):
+            if h.get("role") != "bot":
+                continue
+            if "mid_order" not in h:  # classified once per message, then cached
+                h["mid_order"] = "bot_mid_order" in matcher.match(h.get("message", ""))
+            if h["mid_order"]:
+                return True
+        return False
+
+
+class WriteBehind:
+    """Batched insert_many queue, flushed every interval or when a batch fills."""
+
+    def __init__(self, db, interval: float = FLUSH_INTERVAL_SECONDS, max_batch: int = FLUSH_MAX_BATCH):
+        self.db = db
+        self.interval = interval
+        self.max_batch = max_batch
+        self.pending = OrderedDict()  # collection name -> [docs]
+        self.size = 0
+        self._wake = asyncio.Event()
+        self._task = None
+        self.flushed = 0
+
+    def enqueue(self, collection: str, docs: list):
+        self.pending.setdefault(collection, []).extend(docs)
+        self.size += len(docs)
+        if self.size >= self.max_batch:
+            self._wake.set()
+
+    def pending_for(self, collection: str, session_id: str) -> list:
+        return [d for d in self.pending.get(collection, ()) if d.get("session_id") == session_id]
+
+    def discard(self, collection: str, match: dict = None) -> int:
+        """Drop queued docs for a collection (all, or those matching every key in match), e.g. before a clear."""
+        queued = self.pending.get(collection, [])
+        keep = [d for d in queued if match and any(d.get(k) != v for k, v in match.items())]
+        dropped = len(queued) - len(keep)
+        if keep:
+            self.pending[collection] = keep
+        else:
+            self.pending.pop(collection, None)
+        self.size -= dropped
+        return dropped
+
+    async def flush(self):
+        batches, self.pending, self.size = self.pending, OrderedDict(), 0
+        for collection, docs in batches.items():
+            started = time.perf_counter()
+            try:
+                await self.db[collection].insert_many(docs, ordered=False)
+                self.flushed += len(docs)
+                FLUSH_SECONDS.observe(collection, value=time.perf_counter() - started)
+            except BulkWriteError as e:
+                # Unordered insert: every doc without a write error was stored, and a
+                # duplicate _id means an earlier attempt stored it. Retry only the rest.
+                retry = [docs[err["index"]] for err in e.details.get("writeErrors", ())
+                         if err.get("code") != DUPLICATE_KEY]
+                self.flushed += len(docs) - len(retry)
+                if retry:
+                    record_error("flush", None, e)
+                    log.warning("Chat write-behind flush to %s failed for %d of %d docs, will retry: %s",
+                                collection, len(retry), len(docs), e)
+                    self._requeue(collection, retry)
+            except Exception as e:
+                record_error("flush", None, e)
+                log.warning("Chat write-behind flush to %s failed, will retry: %s", collection, e)
+                self._requeue(collection, docs)
+
+    def _requeue(self, collection: str, docs: list):
+        queued = self.pending.setdefault(collection, [])
+        queued[:0] = docs
+        self.size += len(docs)
+        if self.size > FLUSH_MAX_PENDING:
+            dropped = queued[:self.size - FLUSH_MAX_PENDING]
+            del queued[:len(dropped)]
+            self.size -= len(dropped)
+            log.error("Chat write-behind queue full, dropped %d messages for %s", len(dropped), collection)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self.size:
+                await self.flush()
+
+
+class SessionStore:
+    def __init__(self, db, writer: WriteBehind, max_entries: int = SESSION_MAX_ENTRIES,
+                 idle_seconds: float = SESSION_IDLE_SECONDS, keep_backlog: bool = True):
+        self.db = db
+        self.writer = writer
+        self.keep_backlog = keep_backlog  # off when no summarizer will fold evicted messages
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self._sessions = OrderedDict()
+        self._loading = {}
+        self._sweep_task = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        self.writer.start()
+        if self._sweep_task is None:
+            self._sweep_task = asyncio.ensure_future(self._sweep())
+
+    async def stop(self):
+        """Stop background work and flush every queued message."""
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+            self._sweep_task = None
+        await self.writer.stop()
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(min(self.idle_seconds, 60))
+            self.expire_idle()
+
+    async def get(self, restaurant_key: str, session_id: str) -> SessionState:
+        key = (restaurant_key, session_id)
+        now = time.monotonic()
+        state = self._sessions.get(key)
+        if state is not None and now - state.last_active < self.idle_seconds:
+            self._sessions.move_to_end(key)
+            state.last_active = now
+            self.hits += 1
+            return state
+
+        self.misses += 1
+        # Single-flight: concurrent misses for the same session share one load
+        pending = self._loading.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(restaurant_key, session_id))
+            self._loading[key] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(key, None))
+        state = await asyncio.shield(pending)
+        self._sessions[key] = state
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+        return state
+
+    async def _load(self, restaurant_key: str, session_id: str) -> SessionState:
+        collection, scope = chat_target(restaurant_key)
+        recent = await (self.db[collection].find(dict(scope, session_id=session_id))
+                        .sort("timestamp", -1).limit(HISTORY_WINDOW)).to_list(length=HISTORY_WINDOW)
+        recent.reverse()
+        stored = {d.pop("_id", None) for d in recent}
+        # Messages still waiting in the write-behind queue are newer than anything stored;
+        # a failed flush may have stored some of them already (same _id)
+        pending = [d for d in self.writer.pending_for(collection, session_id)
+                   if d.get("_id") not in stored and all(d.get(k) == v for k, v in scope.items())]
+        recent.extend({k: v for k, v in d.items() if k != "_id"} for d in pending)
+        state = SessionState(restaurant_key, session_id, recent, keep_backlog=self.keep_backlog)
+        if recent:
+            state.mode = recent[-1].get("mode")
+        memory = await self.db[SUMMARY_COLLECTION].find_one(
+            {"restaurant_key": restaurant_key, "session_id": session_id}, {"_id": 0})
+        if memory:
+            state.summary, state.order = memory.get("summary", ""), memory.get("order")
+            state.folded_until = memory.get("folded_until")
+            for h in state.history:
+                if state.folded_until is not None and h.get("timestamp") is not None and h["timestamp"] <= state.folded_until:
+                    h["folded"] = True
+        return state
+
+    def record(self, state: SessionState, docs: list, extra: dict = None):
+        """
+        Append a turn's messages to the session window and queue them for Mongo,
+        along with any extra {collection: docs} (e.g. the turn's order) in the same batch.
+        """
+        collection, scope = chat_target(state.restaurant_key)
+        for d in docs:
+            state.append(d["role"], d["message"], d.get("mode"), d.get("timestamp"))
+        self.writer.enqueue(collection, [dict(d, **scope) for d in docs])
+        for name, extra_docs in (extra or {}).items():
+            self.writer.enqueue(name, extra_docs)
+
+    def forget(self, restaurant_key: str):
+        """Drop a restaurant's cached sessions and queued chat writes (its history is being cleared)."""
+        for key in [k for k in self._sessions if k[0] == restaurant_key]:
+            del self._sessions[key]
+        collection, scope = chat_target(restaurant_key)
+        self.writer.discard(collection, scope)
+
+    def expire_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        for key in [k for k, s in self._sessions.items() if s.last_active < cutoff]:
+            del self._sessions[key]
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending_writes": self.writer.size,
+            "flushed_writes": self.writer.flushed,
+        }
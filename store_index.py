@@ -0,0 +1,140 @@
+# store_index.py
+"""
+Per-restaurant spatial index over store locations.
+
+Stores are bucketed into a lat/lon grid sized so each cell holds a few
+stores. Queries walk rings of cells outward from the user, prefilter with
+the haversine formula and only run the exact (ellipsoidal) geodesic for the
+final candidates. Supports k-nearest and within-radius lookups; built by the
+Catalog when it loads, never on a request.
+"""
+import math
+
+from geopy.distance import geodesic
+
+EARTH_RADIUS_MI = 3958.7613
+MILES_PER_DEG_LAT = 69.0
+# Haversine (sphere) vs geodesic (WGS-84) differ by < 0.5%; keep borderline candidates
+SPHERE_SLACK = 1.006
+MIN_CELL_DEG = 0.01
+STORES_PER_CELL = 4
+
+
+def haversine_miles(lat1, lon1, lat2, lon2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_MI * math.asin(min(1.0, math.sqrt(a)))
+
+
+class StoreIndex:
+    def __init__(self, locations: list):
+        self.stores = []
+        for loc in locations or []:
+            try:
+                self.stores.append((float(loc["latitude"]), float(loc["longitude"]), loc))
+            except (KeyError, TypeError, ValueError):
+                continue  # skip stores without usable coordinates
+
+        self.cells = {}
+        if not self.stores:
+            self.cell_deg = 1.0
+            self.bounds = (0, 0, 0, 0)
+            return
+
+        lats = [s[0] for s in self.stores]
+        lons = [s[1] for s in self.stores]
+        area = max(max(lats) - min(lats), MIN_CELL_DEG) * max(max(lons) - min(lons), MIN_CELL_DEG)
+        self.cell_deg = max(math.sqrt(area * STORES_PER_CELL / len(self.stores)), MIN_CELL_DEG)
+
+        for store in self.stores:
+            self.cells.setdefault(self._cell(store[0], store[1]), []).append(store)
+        rows = [c[0] for c in self.cells]
+        cols = [c[1] for c in self.cells]
+        self.bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self):
+        return len(self.stores)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def _ring(self, ci, cj, r):
+        """Occupied cells at Chebyshev distance r from (ci, cj), clipped to the grid bounds."""
+        r_lo, r_hi, c_lo, c_hi = self.bounds
+        for i in range(max(ci - r, r_lo), min(ci + r, r_hi) + 1):
+            if abs(i - ci) == r:
+                cols = range(max(cj - r, c_lo), min(cj + r, c_hi) + 1)
+            else:
+                cols = [j for j in (cj - r, cj + r) if c_lo <= j <= c_hi]
+            for j in cols:
+                bucket = self.cells.get((i, j))
+                if bucket:
+                    yield bucket
+
+    def _unvisited_bound(self, lat, lon, ci, cj, r) -> float:
+        """Lower bound (miles) on the distance to any cell outside rings 0..r."""
+        d = self.cell_deg
+        lat_gap = min(lat - (ci - r) * d, (ci + r + 1) * d - lat)
+        lon_gap = min(lon - (cj - r) * d, (cj + r + 1) * d - lon)
+        max_lat = min(90.0, max(abs((ci - r) * d), abs((ci + r + 1) * d)))
+        return min(lat_gap * MILES_PER_DEG_LAT,
+                   lon_gap * MILES_PER_DEG_LAT * math.cos(math.radians(max_lat)))
+
+    def _exact(self, lat, lon, candidates):
+        out = [(geodesic((lat, lon), (s[0], s[1])).miles, s[2]) for _, s in candidates]
+        out.sort(key=lambda x: x[0])
+        return out
+
+    def nearest(self, lat, lon, k: int = 1) -> list:
+        """The k closest stores as [(miles, location), ...], closest first."""
+        if not self.stores or k <= 0:
+            return []
+        lat, lon = float(lat), float(lon)
+        ci, cj = self._cell(lat, lon)
+        r_lo, r_hi, c_lo, c_hi = self.bounds
+        # Jump straight to the first ring that can touch an occupied cell
+        r = max(r_lo - ci, ci - r_hi, c_lo - cj, cj - c_hi, 0)
+        r_max = max(abs(ci - r_lo), abs(ci - r_hi), abs(cj - c_lo), abs(cj - c_hi))
+
+        found = []
+        while r <= r_max:
+            for bucket in self._ring(ci, cj, r):
+                found.extend((haversine_miles(lat, lon, s[0], s[1]), s) for s in bucket)
+            if len(found) >= k:
+                found.sort(key=lambda x: x[0])
+                if found[k - 1][0] * SPHERE_SLACK <= self._unvisited_bound(lat, lon, ci, cj, r):
+                    break
+            r += 1
+
+        found.sort(key=lambda x: x[0])
+        if len(found) > k:
+            cutoff = found[k - 1][0] * SPHERE_SLACK
+            found = [f for f in found if f[0] <= cutoff]
+        return self._exact(lat, lon, found)[:k]
+
+    def within(self, lat, lon, radius_miles: float) -> list:
+        """All stores within radius_miles as [(miles, location), ...], closest first."""
+        if not self.stores or radius_miles < 0:
+            return []
+        lat, lon = float(lat), float(lon)
+        reach = radius_miles * SPHERE_SLACK
+        dlat = reach / MILES_PER_DEG_LAT
+        cos_lat = math.cos(math.radians(min(89.9, abs(lat) + dlat)))
+        dlon = min(180.0, reach / (MILES_PER_DEG_LAT * max(cos_lat, 1e-6)))
+
+        r_lo, r_hi, c_lo, c_hi = self.bounds
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+        candidates = []
+        for i in range(max(i0, r_lo), min(i1, r_hi) + 1):
+            for j in range(max(j0, c_lo), min(j1, c_hi) + 1):
+                for s in self.cells.get((i, j), ()):
+                    d = haversine_miles(lat, lon, s[0], s[1])
+                    if d <= reach:
+                        candidates.append((d, s))
+        return [hit for hit in self._exact(lat, lon, candidates) if hit[0] <= radius_miles]
+
+
+def get_store_index(catalog) -> StoreIndex:
+    return catalog.derived["store_index"]
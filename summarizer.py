@@ -0,0 +1,136 @@
+# summarizer.py
+"""
+Rolling conversation summaries, folded in the background.
+
+Only the last SUMMARY_WINDOW messages of a session go into the prompt
+verbatim. Older ones are folded by a background worker into a short running
+summary plus a structured "order so far" (items, pickup/delivery, name,
+address), so an item confirmed twenty turns ago is still known while prompt
+size stays flat however long the conversation runs. Folding happens off the
+request path: turns only enqueue their session, and the worker makes the
+summarization call after the reply has gone out. Summaries are persisted
+to `session_summaries` so a cold session picks them back up.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+from metrics import record_error
+from session_store import SUMMARY_COLLECTION
+
+log = logging.getLogger("syntra.summarizer")
+
+SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "1") not in ("0", "false", "False", "")
+SUMMARY_WINDOW = int(os.getenv("SUMMARY_WINDOW", "4"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+
+SUMMARY_PROMPT = """You keep the running memory of a restaurant chat between a customer and a waiter bot.
+Fold the new messages into the previous memory. Keep what matters for serving the customer:
+preferences, questions still open, and every order detail they confirmed or changed.
+Reply with JSON only:
+{{"summary": "<= {max_words} words",
+  "order": {{"items": [{{"item_id": "", "name": "", "qty": 1, "notes": ""}}],
+            "pickup_or_delivery": "", "customer_name": "", "address": ""}}}}
+Drop items the customer removed. Leave fields empty when unknown."""
+
+EMPTY_ORDER = {"items": [], "pickup_or_delivery": "", "customer_name": "", "address": ""}
+
+
+def render_memory(state) -> str:
+    """System message carrying the folded summary and order so far, or "" when there is none."""
+    parts = []
+    if state.summary:
+        parts.append(f"Conversation so far (summary): {state.summary}")
+    if state.order and any(state.order.get(k) for k in EMPTY_ORDER):
+        parts.append("Order so far: " + json.dumps(state.order, separators=(",", ":"), ensure_ascii=False))
+    return "\n".join(parts)
+
+
+def clip(text: str, max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    limit = max_tokens * 4  # ~4 chars/token; keeps the summary bounded whatever the model returns
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+class Summarizer:
+    """Queue of sessions with messages to fold, drained by one background worker."""
+
+    def __init__(self, db, gateway, window: int = SUMMARY_WINDOW, model: str = SUMMARY_MODEL):
+        self.db = db
+        self.gateway = gateway  # llm_gateway.LLMGateway: same per-restaurant limits as chat turns
+        self.window = window
+        self.model = model
+        self._queue = asyncio.Queue()
+        self._queued = set()
+        self._task = None
+        self.folds = 0
+        self.failures = 0
+
+    def enqueue(self, state):
+        key = (state.restaurant_key, state.session_id)
+        if key not in self._queued and state.unfolded(self.window):
+            self._queued.add(key)
+            self._queue.put_nowait(state)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            state = await self._queue.get()
+            self._queued.discard((state.restaurant_key, state.session_id))
+            try:
+                await self.fold(state)
+            except Exception as e:
+                self.failures += 1
+                record_error("summary", state.restaurant_key, e)
+                log.warning("Summarizing %s/%s failed: %s", state.restaurant_key, state.session_id, e)
+
+    async def summarize(self, summary: str, order: dict, messages: list, restaurant_key: str = None) -> dict:
+        transcript = "\n".join(f"{m.get('role')}: {m.get('message')}" for m in messages)
+        resp = await self.gateway.complete(
+            restaurant_key, "summary",
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT.format(max_words=SUMMARY_MAX_TOKENS * 3 // 4)},
+                {"role": "user", "content": f"Previous memory:\n{json.dumps({'summary': summary, 'order': order})}"
+                                            f"\n\nNew messages:\n{transcript}"},
+            ],
+            temperature=0,
+            max_tokens=SUMMARY_MAX_TOKENS * 2,
+            response_format={"type": "json_object"},
+        )
+        return json.loads(resp.choices[0].message.content)
+
+    async def fold(self, state):
+        """Fold every message older than the prompt window into the session's summary."""
+        pending = state.unfolded(self.window)
+        if not pending:
+            return
+        result = await self.summarize(state.summary, state.order or EMPTY_ORDER, pending, state.restaurant_key)
+        order = result.get("order")
+        state.summary = clip(str(result.get("summary") or state.summary))
+        state.order = {k: order.get(k, v) for k, v in EMPTY_ORDER.items()} if isinstance(order, dict) else state.order
+        state.mark_folded(pending)
+        self.folds += 1
+        await self.db[SUMMARY_COLLECTION].update_one(
+            {"restaurant_key": state.restaurant_key, "session_id": state.session_id},
+            {"$set": {"summary": state.summary, "order": state.order, "folded_until": state.folded_until,
+                      "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "folds": self.folds, "failures": self.failures}
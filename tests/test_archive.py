@@ -0,0 +1,62 @@
+import asyncio
+import functools
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+import archive
+
+
+class ResumesDuringCheck:
+    """A chat collection where a customer comes back right after the active-session check."""
+
+    def __init__(self, coll, session_id, at):
+        self._coll = coll
+        self._session_id = session_id
+        self._at = at
+
+    def __getattr__(self, name):
+        return getattr(self._coll, name)
+
+    async def distinct(self, *args, **kwargs):
+        result = await self._coll.distinct(*args, **kwargs)
+        await self._coll.insert_one({"session_id": self._session_id, "role": "user",
+                                     "message": "back again", "timestamp": self._at})
+        return result
+
+
+def archived_messages(root):
+    messages = []
+    for folder, _, files in os.walk(root):
+        for name in files:
+            with gzip.open(os.path.join(folder, name), "rt", encoding="utf-8") as f:
+                messages += [json.loads(line)["message"] for line in f]
+    return messages
+
+
+def test_message_arriving_mid_pass_stays_hot(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_THROTTLE_SECONDS", 0)
+    monkeypatch.setattr(archive, "write_partitions", functools.partial(archive.write_partitions, root=str(tmp_path)))
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = now - timedelta(days=30)
+
+    async def run():
+        coll = AsyncMongoMockClient()["archive_test"]["test_chat"]
+        old = now - timedelta(days=40)
+        await coll.insert_many([
+            {"session_id": "idle", "role": "user", "message": "old question", "timestamp": old},
+            {"session_id": "idle", "role": "bot", "message": "old answer", "timestamp": old + timedelta(minutes=1)},
+            {"session_id": "active", "role": "user", "message": "older turn", "timestamp": old},
+            {"session_id": "active", "role": "user", "message": "recent turn", "timestamp": now},
+        ])
+        moved = await archive.archive_collection(ResumesDuringCheck(coll, "idle", now), {}, cutoff, "test")
+        left = await coll.find({}, {"_id": 0, "message": 1}).to_list(length=None)
+        return moved, sorted(d["message"] for d in left)
+
+    moved, left = asyncio.run(run())
+    assert moved == 2
+    assert left == ["back again", "older turn", "recent turn"]
+    assert sorted(archived_messages(tmp_path)) == ["old answer", "old question"]
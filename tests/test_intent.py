@@ -0,0 +1,20 @@
+from intent import IntentMatcher, build_rules
+
+
+def matcher():
+    return IntentMatcher(build_rules(["Pizza", "Breads & Sides", "Wings"]))
+
+
+def test_short_words_get_no_plural_forms():
+    m = matcher()
+    assert "i want a" in m.match("I want a large pizza")["order_phrase"]
+    assert "order_phrase" not in m.match("is want a large pizza")
+    assert "order_phrase" not in m.match("ies want a large pizza")
+    assert "i want a" not in m.match("i want as many as you have")["order_phrase"]
+
+
+def test_plural_forms_still_match():
+    m = matcher()
+    assert "side" in m.match("we have great sides")["bot_order_context"]
+    assert "wing" in m.match("do you have boxes of wings")["menu_item"]
+    assert "pickup" in m.match("are pickups available")["bot_mid_order"]
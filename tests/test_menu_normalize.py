@@ -0,0 +1,16 @@
+import glob
+import os
+
+import pytest
+
+from menu_normalize import check_file
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MENU_FILES = sorted(glob.glob(os.path.join(ROOT, "data", "*.json"))) + [os.path.join(ROOT, "dominos_menu.json")]
+
+
+@pytest.mark.parametrize("path", MENU_FILES, ids=lambda p: os.path.relpath(p, ROOT))
+def test_menu_file_normalizes_cleanly(path):
+    result = check_file(path)
+    assert result["problems"] == []
+    assert result["items"] > 0 and result["categories"] > 0
@@ -0,0 +1,58 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import chat_storage
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = "SyntraAI_query_plan_test"
+RESTAURANT = "plan_test"
+
+
+def mongod_reachable() -> bool:
+    try:
+        with MongoClient(MONGO_URI, serverSelectionTimeoutMS=500) as client:
+            client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not mongod_reachable(), reason=f"no mongod reachable at {MONGO_URI}")
+
+
+async def seed_and_explain():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    await client.drop_database(DB_NAME)
+    db = client[DB_NAME]
+    try:
+        await db.restaurants.insert_one({"key": RESTAURANT})
+        name, scope = chat_storage.chat_target(RESTAURANT)
+        start = datetime.now(timezone.utc) - timedelta(days=3)
+        await db[name].insert_many([
+            dict(scope, session_id=f"s{i % 20}", role="user", message=f"message {i}",
+                 timestamp=start + timedelta(minutes=i))
+            for i in range(2000)
+        ])
+        await chat_storage.bootstrap(db, [RESTAURANT])
+        return await chat_storage.hot_query_stages(db, RESTAURANT)
+    finally:
+        await client.drop_database(DB_NAME)
+        client.close()
+
+
+@pytest.mark.parametrize("mode", ["per_restaurant", "consolidated"])
+def test_hot_queries_are_index_backed(monkeypatch, mode):
+    monkeypatch.setattr(chat_storage, "CHAT_STORAGE_MODE", mode)
+    stages = asyncio.run(seed_and_explain())
+
+    assert {"session_window", "history_keyset", "export"} <= set(stages)
+    for label, plan in stages.items():
+        assert "IXSCAN" in plan, f"{label}: {plan}"
+        assert "COLLSCAN" not in plan, f"{label}: {plan}"
@@ -0,0 +1,42 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from registry import RestaurantRegistry
+
+
+def write_files(data_dir, count):
+    os.makedirs(data_dir, exist_ok=True)
+    for i in range(count):
+        with open(os.path.join(data_dir, f"tenant_{i:03d}.json"), "w", encoding="utf-8") as f:
+            json.dump({"name": f"Tenant {i}", "menu": []}, f)
+
+
+def test_concurrent_scans_write_one_valid_index(tmp_path, caplog):
+    data_dir, index_path = str(tmp_path / "data"), str(tmp_path / "cache" / "index.json")
+    write_files(data_dir, 50)
+
+    # Every scanner sees a cold index, so all of them write it at once
+    with ThreadPoolExecutor(8) as pool:
+        registries = list(pool.map(lambda _: RestaurantRegistry(data_dir, index_path).scan(), range(16)))
+
+    assert all(len(r.keys()) == 50 for r in registries)
+    assert not [r for r in caplog.records if "Could not write" in r.getMessage()]
+    assert os.listdir(tmp_path / "cache") == ["index.json"]
+    with open(index_path, encoding="utf-8") as f:
+        assert len(json.load(f)["files"]) == 50
+
+    warm = RestaurantRegistry(data_dir, index_path).scan()
+    assert warm.parsed_on_scan == 0
+    assert warm.get("tenant_007") == {"name": "Tenant 7", "menu": []}
+    assert warm.get("missing") is None
+
+
+def test_scan_keeps_no_payloads(tmp_path):
+    data_dir = str(tmp_path / "data")
+    write_files(data_dir, 3)
+    registry = RestaurantRegistry(data_dir, str(tmp_path / "index.json")).scan()
+    assert registry.parsed_on_scan == 3
+    held = [v for attr in vars(registry).values() if isinstance(attr, dict)
+            for v in attr.values() if isinstance(v, dict) and "menu" in v]
+    assert not held
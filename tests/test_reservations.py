@@ -0,0 +1,98 @@
+import random
+import threading
+from collections import defaultdict
+
+import mongomock
+import pytest
+
+from reservations import CapacityIndex, SlotFull, slot_collection
+
+RESTAURANT = "test_bistro"
+DATE = "2025-11-02"
+TIMES = ["19:00", "19:30", "20:00"]
+CAPACITY = 12
+
+
+class AtomicCollection:
+    """
+    mongomock runs find_one_and_update and upserts as separate find/write
+    steps, so threads can interleave inside one call. mongod applies each
+    single-document operation atomically; this does the same by running each
+    call under one lock. Threads still interleave between calls.
+    """
+
+    def __init__(self, collection, lock):
+        self._collection = collection
+        self._lock = lock
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        def call(*args, **kwargs):
+            with self._lock:
+                result = method(*args, **kwargs)
+                return list(result) if name == "find" else result
+        return call
+
+
+class AtomicDatabase:
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        return AtomicCollection(self._db[name], self._lock)
+
+    __getattr__ = __getitem__
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient()["reservations_test"]
+    db.restaurants.insert_one({"key": RESTAURANT, "reservation_capacity": CAPACITY})
+    return AtomicDatabase(db)
+
+
+def test_concurrent_bookings_never_exceed_capacity(db):
+    # Several indexes stand in for several processes sharing one database
+    indexes = [CapacityIndex(db) for _ in range(4)]
+    booked = defaultdict(int)
+    lock = threading.Lock()
+
+    def run(seed):
+        rng = random.Random(seed)
+        index = indexes[seed % len(indexes)]
+        for _ in range(40):
+            time, guests = rng.choice(TIMES), rng.randint(1, 5)
+            try:
+                _, slot = index.book(RESTAURANT, DATE, time, guests)
+            except SlotFull:
+                continue
+            with lock:
+                booked[slot] += guests
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    slots = {d["time"]: d for d in db[slot_collection(RESTAURANT)].find({})}
+    assert set(slots) == set(TIMES)
+    for time, doc in slots.items():
+        assert booked[time] <= CAPACITY
+        assert doc["remaining"] == CAPACITY - booked[time]
+    # 640 attempts for 36 seats: every slot fills up
+    assert sum(booked.values()) > 3 * (CAPACITY - 5)
+
+
+def test_stale_index_does_not_reject(db):
+    first, second = CapacityIndex(db), CapacityIndex(db)
+    first.book(RESTAURANT, DATE, "19:00", CAPACITY)
+    assert not second.available(RESTAURANT, DATE, "19:00", 2)  # second now caches a full slot
+
+    first.release(RESTAURANT, DATE, "19:00", 4)
+    assert second.book(RESTAURANT, DATE, "19:10", 2) == (DATE, "19:00")
+    assert second.remaining(RESTAURANT, DATE, "19:00") == 2
+    with pytest.raises(SlotFull):
+        second.book(RESTAURANT, DATE, "19:00", 3)
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+
+from response_cache import ResponseCache
+
+MENU = [
+    {"name": "Gluten Free Crust Pizza", "category": "Pizza"},
+    {"name": "Garlic Bread", "category": "Sides"},
+    {"name": "Buffalo Wings", "category": "Wings"},
+]
+
+
+def catalog():
+    return SimpleNamespace(key="test_pizza", version="v1", menu=MENU, derived={})
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("are you open on saturday night", "are you open on sunday night"),
+    ("do you deliver to zip 60601", "do you deliver to zip 60614"),
+    ("do you have gluten free crust", "do you have gluten free bread"),
+    ("how much are the buffalo wings", "how much is the garlic bread"),
+])
+def test_different_questions_do_not_share_answers(cached, asked):
+    cache, cat = ResponseCache(), catalog()
+    cache.put(cat, cached, "cached answer")
+    assert cache.get(cat, asked) is None
+    assert cache.get(cat, cached) == "cached answer"
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("what are your hours today", "hey what r ur hours today?"),
+    ("what are your opening hours today", "what are your hours today"),
+    ("do you have gluten free crust", "do you guys have gluten free crust"),
+])
+def test_rephrasings_hit(cached, asked):
+    cache, cat = ResponseCache(), catalog()
+    cache.put(cat, cached, "cached answer")
+    assert cache.get(cat, asked) == "cached answer"
+
+
+def test_new_catalog_version_drops_entries():
+    cache, cat = ResponseCache(), catalog()
+    cache.put(cat, "do you have gluten free crust", "yes")
+    cat.version = "v2"
+    assert cache.get(cat, "do you have gluten free crust") is None
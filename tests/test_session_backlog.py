@@ -0,0 +1,55 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from session_store import BACKLOG_MAX, HISTORY_WINDOW, SessionState
+from summarizer import Summarizer
+
+WINDOW = 4
+
+
+class FailingGateway:
+    """Every summarization call fails, as when the gateway sheds load or the LLM errors."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, *args, **kwargs):
+        self.calls += 1
+        raise RuntimeError("Overloaded")
+
+
+def chat(state, first, count, summarizer=None):
+    for i in range(first, first + count):
+        state.append("user" if i % 2 == 0 else "bot", f"message {i}", "chat", i)
+        if summarizer:
+            summarizer.enqueue(state)
+
+
+def test_prompt_stays_bounded_when_folding_fails():
+    async def run():
+        gateway = FailingGateway()
+        summarizer = Summarizer(AsyncMongoMockClient()["backlog_test"], gateway, window=WINDOW)
+        summarizer.start()
+        state = SessionState("r", "s")
+        for turn in range(30):
+            chat(state, 2 * turn, 2, summarizer)
+            await asyncio.sleep(0)  # let the worker try (and fail) to fold
+        await summarizer.stop()
+        return state, gateway, summarizer
+
+    state, gateway, summarizer = asyncio.run(run())
+    assert gateway.calls > 0 and summarizer.failures == gateway.calls and summarizer.folds == 0
+
+    prompt = state.prompt_history(WINDOW)
+    assert len(prompt) == HISTORY_WINDOW
+    assert [h["message"] for h in prompt][-WINDOW:] == [f"message {i}" for i in range(56, 60)]
+    assert len(state.backlog) <= BACKLOG_MAX
+
+
+def test_no_backlog_without_a_summarizer():
+    state = SessionState("r", "s", keep_backlog=False)
+    chat(state, 0, 60)
+    assert state.backlog is None
+    assert len(state.prompt_history(WINDOW)) == HISTORY_WINDOW
+    assert state.unfolded(WINDOW) == list(state.history)[:-WINDOW]